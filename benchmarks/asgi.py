@@ -0,0 +1,210 @@
+"""
+Benchmark: many concurrent keep-alive clients against the sync and the async validate endpoint.
+
+Starts gunicorn with the sync workers of config/gunicorn/gunicorn.conf.py serving /api/validate/, then
+uvicorn serving /api/validate/async/ from core.asgi, and drives both with the same --clients keep-alive
+connections for --seconds each. Every client posts national IDs from a pool, back to back or every
+--interval seconds to model mostly idle connections.
+Reports requests per second, latency percentiles, failed requests and the memory of the server processes.
+
+    python -m benchmarks.asgi
+    python -m benchmarks.asgi --clients 1000 --interval 5 --sync-workers 4 --async-workers 1
+
+Needs Redis on the CACHES location of core/settings/base.py.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from rest_framework_simplejwt.tokens import RefreshToken
+
+POOL_SIZE = 5000
+
+BENCHMARK_SETTINGS = """
+from core.settings import *
+
+DEBUG = False
+ALLOWED_HOSTS = ["*"]
+DATABASES["default"]["NAME"] = {database!r}
+VALIDATION_RATE_LIMITS = ["1000000/s"]
+API_CALL_LOG_BACKEND = "database"
+"""
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def process_tree_rss(pid):
+    """Resident memory in MB of ``pid`` and its children, from /proc."""
+    pids = [pid]
+    try:
+        pids += [int(child) for child in open(f"/proc/{pid}/task/{pid}/children").read().split()]
+    except OSError:
+        pass
+
+    total = 0
+    for process in pids:
+        try:
+            for line in open(f"/proc/{process}/status"):
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1])
+        except OSError:
+            pass
+    return total / 1024
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+    await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers.get("connection", "").lower() == "close"
+
+
+async def client(port, path, token, national_ids, deadline, interval, results):
+    reader = writer = None
+    # spread the first requests of idle clients over one interval
+    await asyncio.sleep(random.uniform(0, interval))
+    while time.monotonic() < deadline:
+        body = json.dumps({"national_id": random.choice(national_ids)}).encode()
+        request = (
+            f"POST {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Bearer {token}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+        ).encode() + body
+
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(request)
+            status, close = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError):
+            results["errors"] += 1
+            writer = None
+            continue
+
+        results["latencies"].append(time.perf_counter() - start)
+        if status != 200:
+            results["errors"] += 1
+        if close:
+            # gunicorn's sync workers close the connection after every response
+            writer.close()
+            writer = None
+        await asyncio.sleep(interval)
+
+    if writer is not None:
+        writer.close()
+
+
+async def drive(port, path, token, national_ids, options):
+    results = {"latencies": [], "errors": 0}
+    deadline = time.monotonic() + options.seconds
+    await asyncio.gather(*(client(port, path, token, national_ids, deadline, options.interval, results) for _ in range(options.clients)))
+    return results
+
+
+def run(name, command, port, path, token, environment, options):
+    # a fresh pool per server, so neither starts with the other's cached results
+    national_ids = [f"{random.choice('23')}{random.randrange(10**13):013d}" for _ in range(POOL_SIZE)]
+
+    server = subprocess.Popen(command, env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    try:
+        wait_for_port(port)
+        # warm up: imports, validator tables, connections
+        asyncio.run(drive(port, path, token, national_ids, argparse.Namespace(clients=10, seconds=1, interval=0)))
+        results = asyncio.run(drive(port, path, token, national_ids, options))
+        memory = process_tree_rss(server.pid)
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait()
+
+    latencies = sorted(results["latencies"])
+
+    def percentile(value):
+        return latencies[min(int(len(latencies) * value), len(latencies) - 1)] * 1000
+
+    print(
+        f"{name}: {len(latencies) / options.seconds:,.0f} req/s, p50 {percentile(0.5):.1f}ms p99 {percentile(0.99):.1f}ms,"
+        f" errors {results['errors']}, server memory {memory:.0f}MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=200, help="Concurrent keep-alive connections")
+    parser.add_argument("--seconds", type=int, default=10)
+    parser.add_argument("--interval", type=float, default=0, help="Seconds a client waits between its requests, keeping the connection open")
+    parser.add_argument("--sync-workers", type=int, default=4, help="gunicorn sync workers")
+    parser.add_argument("--async-workers", type=int, default=1, help="uvicorn workers")
+    options = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    database = os.path.join(directory, "benchmark.sqlite3")
+    with open(os.path.join(directory, "benchmark_settings.py"), "w") as file:
+        file.write(BENCHMARK_SETTINGS.format(database=database))
+
+    settings.DATABASES["default"]["NAME"] = database
+    call_command("migrate", verbosity=0)
+    token = str(RefreshToken.for_user(User.objects.create_user(username="benchmark", password="benchmark")).access_token)
+
+    environment = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": "benchmark_settings",
+        "PYTHONPATH": os.pathsep.join([directory, str(settings.BASE_DIR)]),
+    }
+    print(f"{options.clients} keep-alive clients, {options.interval}s between requests, for {options.seconds}s each")
+
+    port = free_port()
+    run(
+        f"gunicorn, {options.sync_workers} sync workers, /api/validate/",
+        [sys.executable, "-m", "gunicorn", "core.wsgi:application", "--workers", str(options.sync_workers), "--bind", f"127.0.0.1:{port}", "--preload"],
+        port, "/api/validate/", token, environment, options,
+    )
+
+    port = free_port()
+    run(
+        f"uvicorn, {options.async_workers} ASGI worker(s), /api/validate/async/",
+        [sys.executable, "-m", "uvicorn", "core.asgi:application", "--workers", str(options.async_workers), "--port", str(port), "--timeout-keep-alive", "75", "--no-access-log"],
+        port, "/api/validate/async/", token, environment, options,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: validation cache hit ratio with the old one hour TTL against the 30 day TTL of date free facts.
+
+Replays a traffic sample through the LocalLRUCache of validatorApi/result_cache.py on a simulated clock,
+standing in for Redis under an LRU eviction policy: every request is a lookup, every miss a write with
+the TTL. Without --sample a synthetic one is generated: --requests lookups spread over --days, IDs
+drawn from a pool of --ids with Zipf popularity ( a few IDs very often, most once or twice ).
+--capacity caps the entries like maxmemory would, 0 for no cap.
+
+    python -m benchmarks.cache_ttl
+    python -m benchmarks.cache_ttl --sample traffic.csv --capacity 100000
+
+A sample is a CSV of ``timestamp,national_id`` rows, timestamps in epoch seconds or ISO 8601.
+"""
+
+import argparse
+import csv
+import os
+import random
+from datetime import datetime
+from unittest import mock
+
+import django
+import numpy as np
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+django.setup()
+
+from validatorApi.constants import VALIDATION_CACHE_TIMEOUT
+from validatorApi.result_cache import LocalLRUCache
+
+OLD_TIMEOUT = 3600
+
+
+def read_sample(path):
+    requests = []
+    with open(path, newline="") as file:
+        for timestamp, national_id in csv.reader(file):
+            try:
+                seconds = float(timestamp)
+            except ValueError:
+                seconds = datetime.fromisoformat(timestamp).timestamp()
+            requests.append((seconds, national_id))
+    requests.sort()
+    return requests
+
+
+def synthetic_sample(requests, days, ids, zipf):
+    rng = np.random.default_rng(0)
+    pool = [f"{random.choice('23')}{random.randrange(10**13):013d}" for _ in range(ids)]
+    ranks = (rng.zipf(zipf, requests) - 1) % ids
+    times = np.sort(rng.uniform(0, days * 86400, requests))
+    return [(float(seconds), pool[rank]) for seconds, rank in zip(times, ranks)]
+
+
+def replay(requests, timeout, capacity):
+    now = [0.0]
+    cache = LocalLRUCache(capacity or len(requests), timeout)
+    hits = 0
+
+    with mock.patch("validatorApi.result_cache.monotonic", lambda: now[0]):
+        for now[0], national_id in requests:
+            if cache.get(national_id) is not None:
+                hits += 1
+            else:
+                cache.set(national_id, True)
+
+    return hits / len(requests), len(requests) - hits
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sample", help="CSV of timestamp,national_id rows")
+    parser.add_argument("--requests", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--ids", type=int, default=500_000, help="Distinct IDs in the synthetic pool")
+    parser.add_argument("--zipf", type=float, default=1.2, help="Zipf exponent of ID popularity")
+    parser.add_argument("--capacity", type=int, default=0, help="Most entries kept, 0 for no cap")
+    options = parser.parse_args()
+
+    if options.sample:
+        requests = read_sample(options.sample)
+        source = options.sample
+    else:
+        requests = synthetic_sample(options.requests, options.days, options.ids, options.zipf)
+        source = f"synthetic, {options.ids:,} IDs, zipf {options.zipf}"
+
+    span = (requests[-1][0] - requests[0][0]) / 86400
+    distinct = len({national_id for _seconds, national_id in requests})
+    print(f"{len(requests):,} requests over {span:.1f} days, {distinct:,} distinct IDs ( {source} ), capacity {options.capacity or 'unbounded'}")
+
+    for name, timeout in (("results with age, 1 hour TTL", OLD_TIMEOUT), ("date free facts, 30 day TTL", VALIDATION_CACHE_TIMEOUT)):
+        hit_ratio, writes = replay(requests, timeout, options.capacity)
+        print(f"  {name:<30} hit ratio {hit_ratio:6.1%}  cache writes {writes:>9,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark: per request cost of /api/validate/ ( ValidateNationalIDView ) against the /api/validate/fast/ lane.
+
+Both endpoints get the same authenticated JSON posts through django's test client and the full middleware
+stack, with warm caches so the numbers are the request handling overhead rather than decoding. Runs with
+the response bytes cache off and on ( VALIDATION_CACHE_RESPONSE_BYTES ).
+
+    python -m benchmarks.fast_lane
+
+Needs Redis on the CACHES location of core/settings/base.py.
+"""
+
+import os
+import random
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+REQUESTS = 5000
+POOL_SIZE = 500
+ENDPOINTS = {"ValidateNationalIDView": "/api/validate/", "fast lane": "/api/validate/fast/"}
+
+
+def measure(client, url, bodies):
+    for body in bodies:
+        client.post(url, body, content_type="application/json")
+
+    timings = []
+    for index in range(REQUESTS):
+        start = time.perf_counter()
+        response = client.post(url, bodies[index % len(bodies)], content_type="application/json")
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.content
+
+    timings.sort()
+    return sum(timings) / len(timings) * 1e6, timings[len(timings) // 2] * 1e6
+
+
+def main():
+    settings.DATABASES["default"]["NAME"] = os.path.join(tempfile.mkdtemp(), "benchmark.sqlite3")
+    call_command("migrate", verbosity=0)
+    user = User.objects.create_user(username="benchmark", password="benchmark")
+    client = Client(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+    bodies = [f'{{"national_id": "{random.choice("23")}{random.randrange(10**13):013d}"}}' for _ in range(POOL_SIZE)]
+
+    print(f"{REQUESTS} requests per endpoint, {POOL_SIZE} national IDs, warm caches")
+    for cache_bytes in (False, True):
+        with override_settings(TESTING=False, VALIDATION_CACHE_RESPONSE_BYTES=cache_bytes, VALIDATION_RATE_LIMITS=["1000000/s"]):
+            results = {name: measure(client, url, bodies) for name, url in ENDPOINTS.items()}
+
+        print(f"VALIDATION_CACHE_RESPONSE_BYTES = {cache_bytes}")
+        baseline = results["ValidateNationalIDView"][0]
+        for name, (mean, median) in results.items():
+            saved = f"  {baseline - mean:.0f}us / {1 - mean / baseline:.0%} less" if mean != baseline else ""
+            print(f"  {name:<24} mean {mean:6.0f}us  p50 {median:6.0f}us{saved}")
+
+
+if __name__ == "__main__":
+    main()
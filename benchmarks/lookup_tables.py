@@ -0,0 +1,71 @@
+"""
+Micro-benchmark: governorate / generation resolution.
+
+Compares the old codes.json dict + generations.json linear scan against the
+dense lookup tables built by NationalIDValidator at load time.
+
+    python -m benchmarks.lookup_tables
+"""
+
+import os
+import random
+import timeit
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+django.setup()
+
+from validatorApi.id_validator import NationalIDValidator
+
+ROUNDS = 20
+SAMPLE_SIZE = 100_000
+
+validator = NationalIDValidator()
+governorates = validator.governorates
+generations = validator.generations
+
+codes = random.choices(list(governorates), k=SAMPLE_SIZE)
+years = [random.randint(1900, 2025) for _ in range(SAMPLE_SIZE)]
+
+
+def legacy_governorate(code):
+    return governorates.get(code)
+
+
+def legacy_generation(year):
+    for generation in generations:
+        if generation["start_year"] <= year <= generation["end_year"]:
+            return {"name": generation["name"], "year_range": f"{generation['start_year']}-{generation['end_year']}"}
+    return {"name": "Unknown", "year_range": "N/A"}
+
+
+def dict_governorate():
+    for code in codes:
+        legacy_governorate(code)
+
+
+def table_governorate():
+    for code in codes:
+        validator._get_governorate(code)
+
+
+def list_generation():
+    for year in years:
+        legacy_generation(year)
+
+
+def table_generation():
+    for year in years:
+        validator._get_generation(year)
+
+
+def report(label, before, after):
+    best_before = min(timeit.repeat(before, number=1, repeat=ROUNDS))
+    best_after = min(timeit.repeat(after, number=1, repeat=ROUNDS))
+    print(f"{label:<12} dict/list: {best_before * 1e9 / SAMPLE_SIZE:7.1f} ns/op  " f"table: {best_after * 1e9 / SAMPLE_SIZE:7.1f} ns/op  " f"speedup: {best_before / best_after:4.1f}x")
+
+
+if __name__ == "__main__":
+    report("governorate", dict_governorate, table_governorate)
+    report("generation", list_generation, table_generation)
@@ -0,0 +1,113 @@
+"""
+Benchmark: what each middleware costs an /api/ request under MIDDLEWARE, and what API_MIDDLEWARE saves.
+
+Builds WSGI handlers from both lists with a timing probe between every two entries and sends them
+the same authenticated JSON posts, with warm caches. An entry's time is the time spent in its probe
+minus the time spent in the next one, so the view's own jitter cancels out. ``process_view`` hooks
+run inside the innermost probe and count as view time.
+
+    python -m benchmarks.middleware
+    python -m benchmarks.middleware --path /api/validate/fast/ --requests 5000
+
+Needs Redis on the CACHES location of core/settings/base.py.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.handlers import MiddlewareListWSGIHandler
+
+POOL_SIZE = 500
+PROBE = f"{__name__}.Probe"
+
+# time spent inside each probe of the current request, innermost first
+probe_times = []
+
+
+class Probe:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        probe_times.append(time.perf_counter() - start)
+        return response
+
+
+def start_response(status, headers):
+    assert status.startswith("200"), status
+
+
+def measure(middleware, requests):
+    """Median microseconds per request spent in each entry of ``middleware`` and in the view."""
+    handler = MiddlewareListWSGIHandler([entry for name in middleware for entry in (PROBE, name)] + [PROBE])
+    samples = [[] for _ in range(len(middleware) + 1)]
+
+    for request in requests:
+        probe_times.clear()
+        response = handler(request.environ, start_response)
+        b"".join(response)
+        response.close()
+
+        outermost_first = probe_times[::-1]
+        for index, outer in enumerate(outermost_first[:-1]):
+            samples[index].append(outer - outermost_first[index + 1])
+        samples[-1].append(outermost_first[-1])
+
+    return [statistics.median(values) * 1e6 for values in samples]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default="/api/validate/")
+    parser.add_argument("--requests", type=int, default=3000)
+    options = parser.parse_args()
+
+    settings.DATABASES["default"]["NAME"] = os.path.join(tempfile.mkdtemp(), "benchmark.sqlite3")
+    call_command("migrate", verbosity=0)
+    user = User.objects.create_user(username="benchmark", password="benchmark")
+    token = f"Bearer {RefreshToken.for_user(user).access_token}"
+    bodies = [{"national_id": f"{random.choice('23')}{random.randrange(10**13):013d}"} for _ in range(POOL_SIZE)]
+    factory = RequestFactory()
+
+    def requests(count):
+        # a WSGI request body is read once, build fresh environs outside the timed part
+        return [factory.post(options.path, bodies[index % POOL_SIZE], content_type="application/json", HTTP_AUTHORIZATION=token) for index in range(count)]
+
+    print(f"POST {options.path}, {options.requests} requests per chain, warm caches, median per request")
+    with override_settings(TESTING=False, ALLOWED_HOSTS=["*"], VALIDATION_RATE_LIMITS=["1000000/s"]):
+        totals = {}
+        for name in ("MIDDLEWARE", "API_MIDDLEWARE"):
+            middleware = getattr(settings, name)
+            measure(middleware, requests(POOL_SIZE))
+            *costs, view = measure(middleware, requests(options.requests))
+            totals[name] = sum(costs)
+
+            print(f"  {name}")
+            for entry, cost in zip(middleware, costs):
+                print(f"    {entry.rsplit('.', 1)[1]:<28} {cost:6.1f}us")
+            print(f"    {'total':<28} {sum(costs):6.1f}us  ( view {view:.0f}us )")
+
+    saved = totals["MIDDLEWARE"] - totals["API_MIDDLEWARE"]
+    print(f"  saved {saved:.1f}us per request, {saved / totals['MIDDLEWARE']:.0%} of the middleware time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark: Redis memory of validation facts keyed per national ID against keyed per 9 digit prefix
+( VALIDATION_CACHE_BY_PREFIX ).
+
+Decodes a corpus of IDs and writes the facts into a scratch Redis database the way ValidationResultCache
+does in each mode: ``to_facts()`` under the full ID, or ``prefix_facts()`` under the century, birth date
+and governorate digits. Reports entries, the growth of Redis ``used_memory``, bytes per ID and the hit
+ratio of replaying the corpus once against an empty cache. Without --sample the corpus is --ids synthetic
+IDs, birth dates spread over the last --years years and governorates of governorates.json.
+
+    python -m benchmarks.prefix_cache
+    python -m benchmarks.prefix_cache --ids 1000000 --years 5
+    python -m benchmarks.prefix_cache --sample national_ids.txt
+
+A sample is a text file with one national ID per line. The scratch database ( --db ) is flushed.
+"""
+
+import argparse
+import os
+import random
+from datetime import date, timedelta
+
+import django
+import redis
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+django.setup()
+
+from django.conf import settings
+from django.core.cache.backends.redis import RedisCache
+
+from validatorApi.constants import VALIDATION_CACHE_TIMEOUT, get_prefix_cache_id, get_validation_cache_key
+from validatorApi.id_validator import NationalIDValidator, id_prefix, prefix_facts
+
+BATCH_SIZE = 1000
+
+
+def synthetic_corpus(ids, years, governorates):
+    today = date.today()
+    national_ids = []
+    for _ in range(ids):
+        birth_date = today - timedelta(days=random.randrange(years * 365))
+        century = 2 if birth_date.year < 2000 else 3
+        national_ids.append(
+            f"{century}{birth_date:%y%m%d}{random.choice(governorates)}{random.randrange(10**4):04d}{random.randrange(10)}"
+        )
+    return national_ids
+
+
+def read_sample(path):
+    with open(path) as file:
+        return [line.strip() for line in file if line.strip()]
+
+
+def cache_entries(national_ids, results, by_prefix):
+    entries = {}
+    for national_id, result in zip(national_ids, results):
+        prefix = id_prefix(national_id) if by_prefix else None
+        if prefix is None:
+            entries[get_validation_cache_key(national_id)] = result.to_facts()
+        else:
+            entries[get_validation_cache_key(get_prefix_cache_id(prefix))] = prefix_facts(result.to_facts())
+    return entries
+
+
+def measure(location, entries):
+    client = redis.Redis.from_url(location)
+    client.flushdb()
+    before = client.info("memory")["used_memory"]
+
+    cache = RedisCache(location, {})
+    items = list(entries.items())
+    for start in range(0, len(items), BATCH_SIZE):
+        cache.set_many(dict(items[start : start + BATCH_SIZE]), timeout=VALIDATION_CACHE_TIMEOUT)
+
+    used = client.info("memory")["used_memory"] - before
+    client.flushdb()
+    return used
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sample", help="Text file with one national ID per line")
+    parser.add_argument("--ids", type=int, default=1_000_000, help="Synthetic corpus size")
+    parser.add_argument("--years", type=int, default=80, help="Birth dates of the synthetic corpus fall in the last this many years")
+    parser.add_argument("--db", type=int, default=15, help="Scratch Redis database, flushed")
+    options = parser.parse_args()
+
+    validator = NationalIDValidator()
+    if options.sample:
+        national_ids = read_sample(options.sample)
+        source = options.sample
+    else:
+        national_ids = synthetic_corpus(options.ids, options.years, sorted(validator.governorates))
+        source = f"synthetic, birth dates over {options.years} years"
+
+    location = f"{settings.CACHES['default']['LOCATION']}/{options.db}"
+    results = validator.decode_many(national_ids)
+    prefixes = len({national_id[:9] for national_id in national_ids})
+    print(f"{len(national_ids):,} IDs ( {source} ), {prefixes:,} distinct prefixes, {len(national_ids) / prefixes:.2f} IDs per prefix")
+
+    baseline = None
+    for name, by_prefix in (("keyed per ID", False), ("keyed per prefix", True)):
+        entries = cache_entries(national_ids, results, by_prefix)
+        used = measure(location, entries)
+        hit_ratio = 1 - len(entries) / len(national_ids)
+        saved = f"  {1 - used / baseline:.0%} less" if baseline else ""
+        baseline = baseline or used
+        print(
+            f"  {name:<18} {len(entries):>10,} entries  {used / 2**20:8.1f}MB  {used / len(national_ids):6.1f} bytes per ID"
+            f"  cold hit ratio {hit_ratio:6.1%}{saved}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark: rate limiting cost per request.
+
+Compares the three stacked django-ratelimit checks ( 300/s, 3000/m, 30000/h ) the validation
+views used to run with one MultiWindowRateLimiter call over the same windows. Redis round-trips
+are counted on the connection, each pipeline or EVALSHA counts once.
+
+    python -m benchmarks.rate_limit
+"""
+
+import os
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+django.setup()
+
+from django.test import RequestFactory
+from django_ratelimit.core import is_ratelimited
+from redis.connection import AbstractConnection
+
+from validatorApi.rate_limit import MultiWindowRateLimiter
+
+REQUESTS = 5000
+RATES = ["300/s", "3000/m", "30000/h"]
+# high enough that no request of the benchmark is denied
+LIMITS = ["1000000/s", "1000000/m", "1000000/h"]
+
+request = RequestFactory().post("/api/validate/")
+request.user = SimpleNamespace(pk=1, is_authenticated=True)
+limiter = MultiWindowRateLimiter()
+
+
+def stacked_decorators(index):
+    for rate, limit in zip(RATES, LIMITS):
+        is_ratelimited(request, group=f"benchmark.{rate}", key="user", rate=limit, increment=True)
+
+
+def lua_limiter(index):
+    limiter.hit("benchmark:lua:1", LIMITS)
+
+
+def measure(check):
+    round_trips = 0
+    send = AbstractConnection.send_packed_command
+
+    def counting_send(self, command, check_health=True):
+        nonlocal round_trips
+        round_trips += 1
+        return send(self, command, check_health)
+
+    check(-1)  # connect and load the script outside the measurement
+    with mock.patch.object(AbstractConnection, "send_packed_command", counting_send):
+        start = time.perf_counter()
+        for index in range(REQUESTS):
+            check(index)
+        elapsed = time.perf_counter() - start
+
+    return round_trips / REQUESTS, elapsed / REQUESTS * 1_000_000
+
+
+if __name__ == "__main__":
+    print(f"{REQUESTS} requests, windows {', '.join(RATES)}")
+    for name, check in (("django-ratelimit x3", stacked_decorators), ("Lua multi-window", lua_limiter)):
+        round_trips, micros = measure(check)
+        print(f"{name:<22} {round_trips:5.2f} Redis round-trips / request  {micros:8.1f} us / request")
@@ -0,0 +1,152 @@
+"""
+Load test: concurrent SQLite writes from several worker processes.
+
+Runs --workers processes ( like the gunicorn workers ) that together serve --rps requests per second
+from --threads request threads each, for --seconds. Every request reads its user and logs one
+APICallLog row the way an uncached /api/validate/ call does, every 50th request also writes a token
+row like a token refresh. Reports "database is locked" errors, lost log rows and request latency.
+
+    python -m benchmarks.sqlite_load                # DATABASES of core/settings/base.py, buffered log sink
+    python -m benchmarks.sqlite_load --baseline     # default SQLite options, one executor task per log row
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import OperationalError, close_old_connections, connections
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from validatorApi.log_sink import api_call_log_sink
+from validatorApi.models import APICallLog
+
+TOKEN_WRITE_EVERY = 50
+
+
+def _is_lock_error(error):
+    return "locked" in str(error) or "busy" in str(error)
+
+
+def run_worker(worker, options, results):
+    lock_errors = 0
+    log_errors = 0
+    latencies = []
+    lock = threading.Lock()
+    executor = ThreadPoolExecutor(max_workers=10) if options.baseline else None
+
+    def log_row(user):
+        nonlocal log_errors
+        try:
+            APICallLog.objects.create(user=user, national_id="29801011401891", is_valid=True, ip_address="127.0.0.1", user_agent="load")
+        except OperationalError as e:
+            # the old log_in_background printed and dropped the row
+            with lock:
+                log_errors += _is_lock_error(e)
+
+    def serve(thread):
+        nonlocal lock_errors
+        rate = options.rps / (options.workers * options.threads)
+        next_at = time.monotonic()
+        deadline = next_at + options.seconds
+        request = 0
+        timings = []
+
+        while next_at < deadline:
+            time.sleep(max(next_at - time.monotonic(), 0))
+            start = time.perf_counter()
+            try:
+                user = User.objects.get(username="load")
+                if request % TOKEN_WRITE_EVERY == 0:
+                    OutstandingToken.objects.create(
+                        user=user, jti=f"{worker}-{thread}-{request}", token="x", expires_at=timezone.now() + timedelta(days=1)
+                    )
+                if options.baseline:
+                    executor.submit(log_row, user)
+                else:
+                    api_call_log_sink.add(user, "29801011401891", True, "127.0.0.1", "load")
+            except OperationalError as e:
+                with lock:
+                    lock_errors += _is_lock_error(e)
+            finally:
+                close_old_connections()
+            timings.append(time.perf_counter() - start)
+            request += 1
+            next_at += 1 / rate
+
+        with lock:
+            latencies.extend(timings)
+
+    threads = [threading.Thread(target=serve, args=(thread,)) for thread in range(options.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if executor is not None:
+        executor.shutdown(wait=True)
+    else:
+        api_call_log_sink.close()
+
+    results.put((len(latencies), lock_errors, log_errors, latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--baseline", action="store_true", help="Default SQLite options and a thread pool insert per log row")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--rps", type=int, default=1000)
+    parser.add_argument("--seconds", type=int, default=10)
+    options = parser.parse_args()
+
+    database = settings.DATABASES["default"]
+    database["NAME"] = os.path.join(tempfile.mkdtemp(), "load.sqlite3")
+    if options.baseline:
+        database["OPTIONS"] = {}
+        database["CONN_MAX_AGE"] = 0
+
+    call_command("migrate", verbosity=0)
+    User.objects.create_user(username="load", password="load")
+    connections.close_all()
+
+    results = multiprocessing.get_context("fork").Queue()
+    with override_settings(TESTING=False, API_CALL_LOG_BACKEND="database"):
+        workers = [multiprocessing.get_context("fork").Process(target=run_worker, args=(worker, options, results)) for worker in range(options.workers)]
+        for worker in workers:
+            worker.start()
+        collected = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+
+    requests = sum(result[0] for result in collected)
+    lock_errors = sum(result[1] for result in collected)
+    log_errors = sum(result[2] for result in collected)
+    latencies = sorted(latency for result in collected for latency in result[3])
+    rows = APICallLog.objects.count()
+
+    def percentile(value):
+        return latencies[min(int(len(latencies) * value), len(latencies) - 1)] * 1000
+
+    print(f"{'baseline' if options.baseline else 'tuned'}: {options.workers} workers x {options.threads} threads, target {options.rps} req/s for {options.seconds}s")
+    print(f"requests {requests} ({requests / options.seconds:,.0f} req/s), lock errors in requests {lock_errors}, in log writes {log_errors}")
+    print(f"log rows written {rows} / {requests}, lost {requests - rows}")
+    print(f"request latency p50 {percentile(0.5):.2f}ms p99 {percentile(0.99):.2f}ms max {latencies[-1] * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
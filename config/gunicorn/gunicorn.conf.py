@@ -17,3 +17,10 @@ reload = True
 errorlog = "/app/logs/gunicorn/error.log"
 
 loglevel = "error"
+
+
+def worker_exit(server, worker):
+    # write API call logs still buffered in this worker
+    from validatorApi.log_sink import api_call_log_sink
+
+    api_call_log_sink.close()
@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+from django.conf import settings
+
+from core.handlers import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
+# the ORM runs in sync_to_async threads here, connections opened there are never closed at the end of a
+# request, so persistent connections ( CONN_MAX_AGE of the sync workers ) would pile up per thread
+for database in settings.DATABASES.values():
+    database["CONN_MAX_AGE"] = 0
+
 application = get_asgi_application()
@@ -0,0 +1,73 @@
+"""
+WSGI and ASGI applications that give the JSON API its own, shorter middleware chain.
+
+Django builds a single chain from ``settings.MIDDLEWARE`` per handler. The applications here hold
+a second handler built from ``settings.API_MIDDLEWARE`` and send every path under
+``settings.API_PATH_PREFIX`` to it, the admin, the home page and the rest keep the full chain.
+"""
+
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+
+
+class MiddlewareListMixin:
+    """Handler whose chain is built from ``middleware`` instead of ``settings.MIDDLEWARE``."""
+
+    def __init__(self, middleware):
+        self.middleware = middleware
+        super().__init__()
+
+    def load_middleware(self, is_async=False):
+        # BaseHandler only reads settings.MIDDLEWARE, handlers are built once at startup
+        full = settings.MIDDLEWARE
+        settings.MIDDLEWARE = self.middleware
+        try:
+            super().load_middleware(is_async)
+        finally:
+            settings.MIDDLEWARE = full
+
+
+class MiddlewareListWSGIHandler(MiddlewareListMixin, WSGIHandler):
+    pass
+
+
+class MiddlewareListASGIHandler(MiddlewareListMixin, ASGIHandler):
+    pass
+
+
+def is_api_path(path):
+    return path.startswith(settings.API_PATH_PREFIX)
+
+
+class RouteScopedWSGIHandler:
+    def __init__(self):
+        self.site = WSGIHandler()
+        self.api = MiddlewareListWSGIHandler(settings.API_MIDDLEWARE)
+
+    def __call__(self, environ, start_response):
+        handler = self.api if is_api_path(environ.get("PATH_INFO", "")) else self.site
+        return handler(environ, start_response)
+
+
+class RouteScopedASGIHandler:
+    def __init__(self):
+        self.site = ASGIHandler()
+        self.api = MiddlewareListASGIHandler(settings.API_MIDDLEWARE)
+
+    async def __call__(self, scope, receive, send):
+        handler = self.api if scope["type"] == "http" and is_api_path(scope["path"]) else self.site
+        await handler(scope, receive, send)
+
+
+def get_wsgi_application():
+    """``django.core.wsgi.get_wsgi_application`` with the API middleware chain."""
+    django.setup(set_prefix=False)
+    return RouteScopedWSGIHandler()
+
+
+def get_asgi_application():
+    """``django.core.asgi.get_asgi_application`` with the API middleware chain."""
+    django.setup(set_prefix=False)
+    return RouteScopedASGIHandler()
@@ -66,6 +66,17 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# The API is stateless JSON with JWT authentication done by DRF, requests under API_PATH_PREFIX
+# run this chain instead of MIDDLEWARE ( no sessions, CSRF or messages ), see core/handlers.py.
+# Frame options stay, the schema docs and DRF's browsable API are HTML pages under the prefix
+API_PATH_PREFIX = "/api/"
+API_MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+    "validatorApi.middleware.AcceptLanguageMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+
 ROOT_URLCONF = "core.urls"
 
 TEMPLATES = [
@@ -91,10 +102,20 @@ WSGI_APPLICATION = "core.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite tuned for several gunicorn workers writing at once: WAL lets reads run next to the writer,
+# IMMEDIATE transactions take the write lock up front so a busy database is waited on ( timeout )
+# instead of failing with "database is locked" when a read transaction upgrades to a write
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL; PRAGMA temp_store=MEMORY",
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+        },
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
@@ -153,7 +174,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "validatorApi.authentication.CachedJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -177,6 +198,74 @@ CACHES = {
     }
 }
 
+# Seconds between pushes of per-process counters ( cache hits, log sink ) to the shared cache
+STATS_FLUSH_INTERVAL = 10
+
+# Per-process LRU in front of Redis for validation results, entries are dropped
+# cluster-wide through the invalidation channel when the cache is cleared
+VALIDATION_LOCAL_CACHE_SIZE = 10000
+VALIDATION_LOCAL_CACHE_TIMEOUT = 60
+VALIDATION_CACHE_INVALIDATION_URL = CACHES["default"]["LOCATION"]
+VALIDATION_CACHE_INVALIDATION_CHANNEL = "national_id_validation:invalidate"
+
+# Shared tier writes are buffered and flushed in pipelined batches by a background thread,
+# a full buffer drops the "newest" ( incoming ) or "oldest" pending write
+VALIDATION_CACHE_WRITER_CAPACITY = 10000
+VALIDATION_CACHE_WRITER_BATCH_SIZE = 500
+VALIDATION_CACHE_WRITER_FLUSH_INTERVAL = 0.05
+VALIDATION_CACHE_WRITER_DROP_POLICY = "newest"
+
+# Cache the rendered JSON body of /api/validate/ per language and serve hits
+# without running the response serializer and renderer
+VALIDATION_CACHE_RESPONSE_BYTES = False
+
+# Key cached validation facts on the first 9 digits ( century, birth date, governorate ) so IDs
+# that differ only in serial and gender share one entry, see benchmarks/prefix_cache.py
+VALIDATION_CACHE_BY_PREFIX = False
+
+# Redis holding the per-user usage counters behind /api/usage/, None turns counting off. The lifetime
+# totals only live there, so they get their own database, clearing the validation cache flushes the cache's
+USAGE_COUNTERS_URL = f"{CACHES['default']['LOCATION']}/3"
+
+# Limits per user on each validation endpoint, all windows are checked in one Redis Lua call.
+# Without Redis every worker counts locally for RATE_LIMIT_FALLBACK_SECONDS before retrying
+VALIDATION_RATE_LIMITS = ["300/s", "3000/m", "30000/h"]
+RATE_LIMIT_URL = CACHES["default"]["LOCATION"]
+RATE_LIMIT_SOCKET_TIMEOUT = 0.25
+RATE_LIMIT_FALLBACK_SECONDS = 5
+
+# Token authentication reads users from a per-process LRU ( AUTH_USER_LOCAL_CACHE_TIMEOUT ) in front of
+# the shared cache, revoked users are reloaded from Redis every TOKEN_REVOCATION_REFRESH_SECONDS.
+# Revocations get their own Redis database, clearing the validation cache flushes the cache's
+AUTH_USER_LOCAL_CACHE_SIZE = 10000
+AUTH_USER_LOCAL_CACHE_TIMEOUT = 30
+AUTH_USER_CACHE_TIMEOUT = 300
+TOKEN_REVOCATION_URL = f"{CACHES['default']['LOCATION']}/1"
+TOKEN_REVOCATION_REFRESH_SECONDS = 5
+
+# Maximum national IDs accepted by /api/validate/batch/ in one request. Every ID is one hit against
+# VALIDATION_RATE_LIMITS, so this stays at or below the smallest limit or a full batch is never allowed
+VALIDATION_BATCH_MAX_SIZE = 300
+
+# APICallLog rows are buffered per worker and inserted with bulk_create every
+# API_CALL_LOG_BATCH_SIZE rows or API_CALL_LOG_FLUSH_INTERVAL seconds, rows past
+# API_CALL_LOG_BUFFER_CAPACITY are dropped and counted
+API_CALL_LOG_BUFFER_CAPACITY = 50000
+API_CALL_LOG_BATCH_SIZE = 500
+API_CALL_LOG_FLUSH_INTERVAL = 1.0
+
+# "database" inserts buffered rows from the web workers, "stream" appends them to a Redis
+# Stream and leaves the inserts to the consume_call_logs command ( consumer group, acked after commit ).
+# The stream gets its own Redis database, clearing the validation cache flushes the cache's
+API_CALL_LOG_BACKEND = "database"
+API_CALL_LOG_STREAM_URL = f"{CACHES['default']['LOCATION']}/2"
+API_CALL_LOG_STREAM = "api_call_logs"
+API_CALL_LOG_STREAM_GROUP = "api_call_log_writers"
+API_CALL_LOG_STREAM_MAXLEN = 1000000
+
+# Raw API call logs older than this are deleted by prune_call_logs, once folded into the daily rollup
+API_CALL_LOG_RETENTION_DAYS = 90
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=15),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
@@ -7,6 +7,12 @@ DEBUG = False
 
 ALLOWED_HOSTS = ["127.0.0.1", "localhost", "0.0.0.0"]
 
+VALIDATION_CACHE_RESPONSE_BYTES = True
+VALIDATION_CACHE_BY_PREFIX = True
+
+# call logs are written by the consume_call_logs supervisor program
+API_CALL_LOG_BACKEND = "stream"
+
 
 logging.config.dictConfig(LOGGING)
 
@@ -1,7 +1,7 @@
 # views.py
 from django.shortcuts import render
 
-from validatorApi.id_validator import NationalIDValidator
+from validatorApi.views import ValidateNationalIDView
 
 
 def home(request):
@@ -14,13 +14,7 @@ def home(request):
 
         if national_id:
             # Use validator directly (no authentication needed for testing)
-            validator = NationalIDValidator()
-            validation_result = validator.validate(national_id)
-
-            if validation_result["is_valid"]:
-                result = validator.extract_info(national_id)
-            else:
-                result = {"national_id": national_id, "is_valid": False, "errors": validation_result["errors"]}
+            result = ValidateNationalIDView.get_validator().decode(national_id).localize()
 
     context = {
         "result": result,
@@ -4,6 +4,11 @@ set -e
 
 service redis-server start
 
+# cached validation results carry a TTL, under memory pressure Redis evicts the least recently used
+# keys with a TTL and never the call log stream or the usage totals
+redis-cli config set maxmemory "${REDIS_MAXMEMORY:-256mb}" >/dev/null
+redis-cli config set maxmemory-policy volatile-lru >/dev/null
+
 DJANGO_DEVELOPMENT="${DJANGO_DEVELOPMENT:-False}"
 
 ENV_FILE="./core/settings/.env"
@@ -60,12 +65,25 @@ if [ "$DJANGO_DEVELOPMENT" = "False" ]; then
 
 fi
 
-# Start a background job for cleaning expired tokens
+# Start a background job for cleaning expired tokens, small chunks with pauses so API writes aren't blocked
+(
+  while true; do
+    python manage.py prune_expired_tokens --continuous || echo "Cleanup failed at $(date)"
+    sleep 60
+  done
+) &
+
+# Fold new API call logs into the daily rollup and save usage counters every hour, prune expired raw logs once a day
 (
+  runs=0
   while true; do
-    echo "Running flushexpiredtokens cleanup at $(date)"
-    python manage.py flushexpiredtokens || echo "Cleanup failed at $(date)"
-    sleep 86400  # 24 hours
+    python manage.py rollup_call_logs || echo "Rollup failed at $(date)"
+    python manage.py flush_usage_counters || echo "Usage flush failed at $(date)"
+    if [ $((runs % 24)) -eq 0 ]; then
+      python manage.py prune_call_logs || echo "Pruning failed at $(date)"
+    fi
+    runs=$((runs + 1))
+    sleep 3600  # 1 hour
   done
 ) &
 
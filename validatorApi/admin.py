@@ -1,6 +1,124 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db.models import Max, Min, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
 
-from .models import APICallLog
+from .models import APICallDailyRollup, APICallLog, APIUsageDaily
+
+CURSOR_VAR = "cursor"
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for very large tables, never counts every row.
+
+    Without filters the count is estimated from the primary key range ( two index lookups ),
+    with filters counting stops at ``count_limit``. Pages past that are reached with the
+    keyset "Older entries" link of ``KeysetChangeList``.
+    """
+
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            bounds = queryset.model._default_manager.aggregate(low=Min("pk"), high=Max("pk"))
+            if bounds["high"] is None:
+                return 0
+            return bounds["high"] - bounds["low"] + 1
+
+        return queryset[: self.count_limit].count()
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Changelist with ``?cursor=<timestamp>|<id>`` keyset navigation on the ``-timestamp`` index.
+
+    Deep pages are reached by walking from the last row of the current page instead of an
+    OFFSET that reads and throws away every row before it.
+    """
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+
+        cursor = self._parse_cursor(request.GET.get(CURSOR_VAR))
+        if cursor is not None:
+            timestamp, pk = cursor
+            queryset = queryset.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, pk__lt=pk))
+
+        return queryset
+
+    def get_results(self, request):
+        super().get_results(request)
+
+        self.next_cursor_url = None
+        # the cursor only follows the default -timestamp, -id ordering
+        if "o" in request.GET:
+            return
+
+        page = list(self.result_list)
+        if len(page) == self.list_per_page:
+            last = page[-1]
+            self.next_cursor_url = self.get_query_string({CURSOR_VAR: f"{last.timestamp.isoformat()}|{last.pk}"}, remove=["p"])
+
+    def _parse_cursor(self, value):
+        if not value:
+            return None
+
+        timestamp, _, pk = value.rpartition("|")
+        timestamp = parse_datetime(timestamp.replace(" ", "+"))
+        if timestamp is None or not pk.isdigit():
+            return None
+        return timestamp, int(pk)
+
+
+class UserAutocompleteFilter(admin.SimpleListFilter):
+    """User filter backed by the admin autocomplete view, users are searched as you type instead of listed."""
+
+    title = "user"
+    parameter_name = "user__id__exact"
+    template = "admin/autocomplete_filter.html"
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        self.field = forms.ModelChoiceField(
+            queryset=User.objects.all(),
+            required=False,
+            widget=AutocompleteSelect(model._meta.get_field("user"), model_admin.admin_site),
+        )
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value and value.isdigit():
+            return queryset.filter(user_id=value)
+        return queryset
+
+    def choices(self, changelist):
+        value = self.value() if self.value() and self.value().isdigit() else None
+        yield {
+            "selected": value is not None,
+            "query_string": changelist.get_query_string(remove=[self.parameter_name, "p", CURSOR_VAR]),
+            "hidden": [(key, values[-1]) for key, values in changelist.params.items() if key not in (self.parameter_name, "p", CURSOR_VAR)],
+            "parameter_name": self.parameter_name,
+            "widget": self.field.widget.render(self.parameter_name, value, attrs={"id": "id_user_filter", "style": "width: 100%"}),
+        }
 
 
 class APICallLogAdmin(admin.ModelAdmin):
@@ -13,8 +131,11 @@ class APICallLogAdmin(admin.ModelAdmin):
         "is_valid",
         "ip_address",
     ]
-    list_filter = ["is_valid", "timestamp", "user"]
-    search_fields = ["national_id", "ip_address", "user__username"]
+    # date_hierarchy and a plain user filter both scan the whole table on every page load
+    list_filter = ["is_valid", "timestamp", UserAutocompleteFilter]
+    list_select_related = ["user"]
+    search_fields = ["=national_id", "=ip_address"]
+    search_help_text = "Exact national ID or IP address"
     readonly_fields = [
         "user",
         "national_id",
@@ -23,7 +144,16 @@ class APICallLogAdmin(admin.ModelAdmin):
         "user_agent",
         "timestamp",
     ]
-    date_hierarchy = "timestamp"
+    ordering = ["-timestamp", "-id"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        return super().media + AutocompleteSelect(APICallLog._meta.get_field("user"), self.admin_site).media
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
 
     def has_add_permission(self, request):
         return False
@@ -32,4 +162,32 @@ class APICallLogAdmin(admin.ModelAdmin):
         return False
 
 
+class APICallDailyRollupAdmin(admin.ModelAdmin):
+    """Admin interface for the per-user daily API call counts"""
+
+    list_display = [
+        "date",
+        "user",
+        "valid_count",
+        "invalid_count",
+        "total_count",
+    ]
+    list_filter = ["date"]
+    search_fields = ["user__username"]
+    list_select_related = ["user"]
+    date_hierarchy = "date"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class APIUsageDailyAdmin(APICallDailyRollupAdmin):
+    """Admin interface for the per-user daily usage copied from the Redis counters"""
+
+
 admin.site.register(APICallLog, APICallLogAdmin)
+admin.site.register(APICallDailyRollup, APICallDailyRollupAdmin)
+admin.site.register(APIUsageDaily, APIUsageDailyAdmin)
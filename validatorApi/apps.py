@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ValidatorConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "validatorApi"
+
+    def ready(self):
+        from . import schema, signals  # noqa: F401
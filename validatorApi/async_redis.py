@@ -0,0 +1,21 @@
+import asyncio
+import weakref
+
+import redis.asyncio
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client(url, **kwargs):
+    """
+    ``redis.asyncio`` client for ``url`` on the running event loop.
+
+    Connections belong to the loop that opened them, so every loop ( one per ASGI worker, a new one
+    per async test ) gets its own client, dropped together with the loop.
+    """
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    key = (url, tuple(sorted(kwargs.items())))
+    client = clients.get(key)
+    if client is None:
+        client = clients[key] = redis.asyncio.Redis.from_url(url, **kwargs)
+    return client
@@ -0,0 +1,209 @@
+import copy
+import threading
+import time
+from time import monotonic
+
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .constants import CACHE_KEY_REVOKED_USERS, get_auth_user_key
+from .result_cache import LocalLRUCache
+
+
+class UserCache:
+    """
+    Users for token authentication, a short lived per-process LRU in front of the shared cache.
+
+    Saving or deleting a user drops both copies in this worker and the shared one once the transaction
+    commits, other workers see the change once their local entry expires ( ``AUTH_USER_LOCAL_CACHE_TIMEOUT`` ).
+    ``QuerySet.update()`` sends no signal, users changed that way stay cached for up to
+    ``AUTH_USER_CACHE_TIMEOUT`` unless ``delete`` is called for them.
+    """
+
+    def __init__(self):
+        self._local = None
+
+    @property
+    def local(self):
+        if self._local is None:
+            self._local = LocalLRUCache(settings.AUTH_USER_LOCAL_CACHE_SIZE, settings.AUTH_USER_LOCAL_CACHE_TIMEOUT)
+        return self._local
+
+    def get(self, user_id):
+        # token claims carry the id as a string, signals as the primary key
+        user_id = str(user_id)
+        user = self.local.get(user_id)
+        if user is None:
+            user = cache.get(get_auth_user_key(user_id))
+            if user is None:
+                user = get_user_model().objects.get(**{api_settings.USER_ID_FIELD: user_id})
+                cache.set(get_auth_user_key(user_id), user, timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+            self.local.set(user_id, user)
+
+        # requests must not share ( and mutate ) one instance
+        return copy.copy(user)
+
+    async def aget(self, user_id):
+        """``get`` for async views, through ``cache.aget`` and the async ORM."""
+        user_id = str(user_id)
+        user = self.local.get(user_id)
+        if user is None:
+            user = await cache.aget(get_auth_user_key(user_id))
+            if user is None:
+                user = await get_user_model().objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+                await cache.aset(get_auth_user_key(user_id), user, timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+            self.local.set(user_id, user)
+
+        return copy.copy(user)
+
+    def delete(self, user_id):
+        user_id = str(user_id)
+        self.local.delete(user_id)
+        try:
+            cache.delete(get_auth_user_key(user_id))
+        except redis.RedisError as e:
+            # user saves ( admin, login ) must not fail with Redis, the shared copy expires on its own
+            print(f"Error dropping cached user {user_id}: {e}")
+
+
+class TokenRevocations:
+    """
+    Users whose tokens issued before a point in time are rejected, a Redis sorted set of user id -> revoked at.
+
+    Every worker keeps a snapshot of the set and reloads it every ``TOKEN_REVOCATION_REFRESH_SECONDS``,
+    which bounds how long a revoked access token keeps working. Entries older than the access token
+    lifetime are dropped, every token they could match has expired.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._revoked = {}
+        self._refresh_at = 0
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = redis.Redis.from_url(settings.TOKEN_REVOCATION_URL)
+        return self._client
+
+    def revoke(self, user_ids):
+        now = time.time()
+        revoked = {str(user_id): now for user_id in user_ids}
+        if not revoked:
+            return
+
+        pipe = self.client.pipeline()
+        pipe.zadd(CACHE_KEY_REVOKED_USERS, revoked)
+        pipe.zremrangebyscore(CACHE_KEY_REVOKED_USERS, "-inf", now - settings.SIMPLE_JWT["ACCESS_TOKEN_LIFETIME"].total_seconds())
+        pipe.execute()
+
+        with self._lock:
+            self._revoked.update(revoked)
+
+    def is_revoked(self, user_id, issued_at):
+        if monotonic() >= self._refresh_at:
+            self._refresh()
+        return self._in_snapshot(user_id, issued_at)
+
+    async def ais_revoked(self, user_id, issued_at):
+        """``is_revoked`` for async views, a due refresh runs in a thread instead of on the event loop."""
+        if monotonic() >= self._refresh_at:
+            await sync_to_async(self._refresh, thread_sensitive=False)()
+        return self._in_snapshot(user_id, issued_at)
+
+    def _in_snapshot(self, user_id, issued_at):
+        revoked_at = self._revoked.get(str(user_id))
+        return revoked_at is not None and (issued_at is None or issued_at <= revoked_at)
+
+    def _refresh(self):
+        with self._lock:
+            if monotonic() < self._refresh_at:
+                return
+            self._refresh_at = monotonic() + settings.TOKEN_REVOCATION_REFRESH_SECONDS
+
+            oldest = time.time() - settings.SIMPLE_JWT["ACCESS_TOKEN_LIFETIME"].total_seconds()
+            try:
+                entries = self.client.zrangebyscore(CACHE_KEY_REVOKED_USERS, oldest, "+inf", withscores=True)
+            except redis.RedisError as e:
+                # keep the last snapshot, revocations made meanwhile show up on the next refresh
+                print(f"Error refreshing token revocations: {e}")
+                return
+
+            self._revoked = {user_id.decode(): revoked_at for user_id, revoked_at in entries}
+
+
+user_cache = UserCache()
+token_revocations = TokenRevocations()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` without a database query per request.
+
+    Users come from ``user_cache`` and tokens of users revoked with ``revoke_user_tokens`` are
+    rejected through ``token_revocations``. Active / password checks match ``JWTAuthentication``.
+    """
+
+    def get_user(self, validated_token):
+        user_id = self._get_user_id(validated_token)
+
+        if token_revocations.is_revoked(user_id, validated_token.get("iat")):
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+
+        try:
+            user = user_cache.get(user_id)
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+        self._check_user(user, validated_token)
+        return user
+
+    async def aauthenticate(self, request):
+        """``authenticate`` for async views on a plain django request, ``(user, token)`` or ``None`` without a token."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self._get_user_id(validated_token)
+
+        if await token_revocations.ais_revoked(user_id, validated_token.get("iat")):
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+
+        try:
+            user = await user_cache.aget(user_id)
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+        self._check_user(user, validated_token)
+        return user
+
+    def _get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+    def _check_user(self, user, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
@@ -0,0 +1,132 @@
+import atexit
+import threading
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+DROP_NEWEST = "newest"
+DROP_OLDEST = "oldest"
+
+
+class WriteBehindCacheWriter:
+    """
+    Buffers cache writes and flushes them from a background thread in batches.
+
+    Each batch goes out through ``cache.set_many`` which the Redis backend sends as one
+    pipeline ( MSET + EXPIREs ). Writes to a key that is still pending are coalesced. When
+    the buffer is full the ``drop_policy`` decides whether the incoming ( ``newest`` ) or the
+    oldest pending write is dropped, request threads never wait on Redis.
+    """
+
+    def __init__(self, capacity, batch_size, flush_interval, drop_policy=DROP_NEWEST, on_stats=None):
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self.on_stats = on_stats or (lambda counter, amount: None)
+        self._pending = OrderedDict()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = None
+        self._in_flight = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="cache_writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def set(self, key, value, timeout):
+        dropped = False
+
+        with self._condition:
+            if key not in self._pending and len(self._pending) >= self.capacity:
+                dropped = True
+                if self.drop_policy == DROP_OLDEST:
+                    self._pending.popitem(last=False)
+
+            if not dropped or self.drop_policy == DROP_OLDEST:
+                self._pending[key] = (value, timeout)
+
+            if len(self._pending) == 1 or len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+        if dropped:
+            self.on_stats("writes_dropped", 1)
+
+    def set_many(self, data, timeout):
+        for key, value in data.items():
+            self.set(key, value, timeout)
+
+    def discard(self, keys):
+        with self._condition:
+            for key in keys:
+                self._pending.pop(key, None)
+
+    def clear(self):
+        with self._condition:
+            self._pending.clear()
+
+    def flush(self):
+        """Write everything pending from the calling thread, then wait for a batch the background thread is writing."""
+        while True:
+            with self._condition:
+                batch = self._take_batch()
+                if not batch:
+                    while self._in_flight:
+                        self._condition.wait()
+                    return
+            self._write(batch)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def _take_batch(self):
+        batch = []
+        while self._pending and len(batch) < self.batch_size:
+            batch.append(self._pending.popitem(last=False))
+        return batch
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+
+                # give a batch the chance to fill up before paying a round-trip
+                if len(self._pending) < self.batch_size and not self._closed:
+                    self._condition.wait(self.flush_interval)
+
+                if self._closed:
+                    return
+
+                batch = self._take_batch()
+                self._in_flight += 1
+
+            try:
+                self._write(batch)
+            finally:
+                with self._condition:
+                    self._in_flight -= 1
+                    self._condition.notify_all()
+
+    def _write(self, batch):
+        by_timeout = {}
+        for key, (value, timeout) in batch:
+            by_timeout.setdefault(timeout, {})[key] = value
+
+        for timeout, data in by_timeout.items():
+            try:
+                cache.set_many(data, timeout=timeout)
+                self.on_stats("writes_flushed", len(data))
+            except Exception as e:
+                self.on_stats("writes_dropped", len(data))
+                print(f"Error flushing cache writes: {e}")
@@ -1,5 +1,70 @@
-CACHE_KEY_NATIONAL_ID_VALIDATION = "national_id_validation:{national_id}"
+# entries are NationalIDResult.to_facts(), language neutral codes ( see id_validator.MESSAGES ) and nothing date dependent
+CACHE_KEY_NATIONAL_ID_VALIDATION = "national_id_validation:facts:v2:{national_id}"
+
+# ( is_valid, rendered body ) pairs
+RESPONSE_CACHE_ID = "{national_id}:response:v2:{language}"
+
+# prefix_facts() shared by every well formed ID starting with these digits, see VALIDATION_CACHE_BY_PREFIX
+PREFIX_CACHE_ID = "prefix:{prefix}"
+
+# results hold no date dependent fields, Redis evicts the least recently used ones under memory pressure
+VALIDATION_CACHE_TIMEOUT = 30 * 24 * 3600
+
+# rendered responses hold the age, they are also dropped at midnight
+VALIDATION_RESPONSE_CACHE_TIMEOUT = 3600
+
+CACHE_KEY_VALIDATION_CACHE_STATS = "national_id_validation_stats:{counter}"
+
+# local / shared count facts lookups per tier, response lookups ( either tier ) have their own pair
+CACHE_STATS_COUNTERS = (
+    "local_hits",
+    "local_misses",
+    "shared_hits",
+    "shared_misses",
+    "response_hits",
+    "response_misses",
+    "writes_flushed",
+    "writes_dropped",
+)
+
+CACHE_KEY_API_CALL_LOG_STATS = "api_call_log_stats:{counter}"
+
+API_CALL_LOG_STATS_COUNTERS = ("rows_added", "rows_flushed", "rows_dropped", "flushes", "flush_milliseconds")
 
 
 def get_validation_cache_key(national_id):
     return CACHE_KEY_NATIONAL_ID_VALIDATION.format(national_id=national_id)
+
+
+def get_response_cache_id(national_id, language):
+    return RESPONSE_CACHE_ID.format(national_id=national_id, language=language)
+
+
+def get_prefix_cache_id(prefix):
+    return PREFIX_CACHE_ID.format(prefix=prefix)
+
+ROLLUP_API_CALL_DAILY = "api_call_daily"
+
+CACHE_KEY_USAGE = "usage:{user_id}:{window}:{bucket}"
+
+USAGE_WINDOWS = ("minute", "hour", "day", "total")
+
+
+def get_usage_key(user_id, window, bucket):
+    return CACHE_KEY_USAGE.format(user_id=user_id, window=window, bucket=bucket)
+
+CACHE_KEY_RATE_LIMIT = "ratelimit:{scope}:{ident}"
+
+
+def get_rate_limit_key(scope, ident):
+    return CACHE_KEY_RATE_LIMIT.format(scope=scope, ident=ident)
+
+CACHE_KEY_AUTH_USER = "auth_user:{user_id}"
+
+CACHE_KEY_REVOKED_USERS = "revoked_users"
+
+
+def get_auth_user_key(user_id):
+    return CACHE_KEY_AUTH_USER.format(user_id=user_id)
+
+CHECKPOINT_EXPIRED_TOKENS = "expired_tokens"
@@ -1,15 +1,248 @@
 import json
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from pathlib import Path
+from time import monotonic
 
+import numpy as np
+from django.utils import translation
 from django.utils.translation import gettext_lazy as _
 
 
+NATIONAL_ID_LENGTH = 14
+
+GOVERNORATE_SLOTS = 100
+
+GOVERNORATE_SLOT_INDEX = {f"{slot:02d}": slot for slot in range(GOVERNORATE_SLOTS)}
+
+FIRST_BIRTH_YEAR = 1900
+LAST_BIRTH_YEAR = 2099
+
+# two digit month field, so 00-99 all get a slot and invalid ones hold zero days
+MONTH_SLOTS = 100
+
+UNKNOWN_GENERATION = {"name": "Unknown", "year_range": "N/A"}
+
+# the one error that depends on today's date, see NationalIDResult.to_facts
+FUTURE_BIRTH_DATE = "future_birth_date"
+
+# century, birth date and governorate, the serial and gender digits come after
+PREFIX_LENGTH = 9
+
+# facts that come from the digits after PREFIX_LENGTH, NationalIDValidator.derive fills them in again.
+# The national_id stays, it tells the views whether an entry was cached for the requested ID
+SUFFIX_FACTS = ("serial_number", "gender")
+
+
+def id_prefix(national_id):
+    """
+    First ``PREFIX_LENGTH`` digits of a well formed ID, or ``None``: a short or non digit ID is
+    invalid because of its later characters, so its facts can't be shared with its prefix.
+    """
+    if len(national_id) == NATIONAL_ID_LENGTH and national_id.isascii() and national_id.isdigit():
+        return national_id[:PREFIX_LENGTH]
+    return None
+
+
+def prefix_facts(facts):
+    """``to_facts`` output shared by every ID with the same first ``PREFIX_LENGTH`` digits."""
+    return {field: value for field, value in facts.items() if field not in SUFFIX_FACTS}
+
+
+# Decoded results hold these codes instead of translated text, so one cached result serves every
+# language. Errors are ``(code, params)`` pairs, the message is ``MESSAGES[code] % params``.
+MESSAGES = {
+    "century_20": _("20th century (1900-1999)"),
+    "century_21": _("21st century (2000+)"),
+    "male": _("Male"),
+    "female": _("Female"),
+    "non_digit": _("National ID must contain only digits"),
+    "length": _("National ID must be exactly 14 digits (got %(length)s)"),
+    "century": _("Invalid century digit: %(digit)s (must be 2 or 3)"),
+    "day_out_of_range": _("Invalid date of birth: day is out of range for month"),
+    "month_out_of_range": _("Invalid date of birth: month must be in 1..12"),
+    FUTURE_BIRTH_DATE: _("Birth date cannot be in the future: %(date)s"),
+    "governorate": _("Invalid governorate code: %(code)s"),
+}
+
+
+class MessageTable:
+    """``MESSAGES`` translated once per language, localizing a result is then a few dict lookups."""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self._tables = {}
+
+    def get(self, language=None):
+        language = language or translation.get_language()
+        table = self._tables.get(language)
+        if table is None:
+            with translation.override(language):
+                table = {code: str(message) for code, message in self.messages.items()}
+            self._tables[language] = table
+        return table
+
+
+message_table = MessageTable(MESSAGES)
+
+
+def localize_errors(errors, language=None):
+    table = message_table.get(language)
+    return [table[code] % params for code, params in errors]
+
+
+def localize_result(result, language=None):
+    """``NationalIDResult.to_dict()`` with its codes turned into text in ``language`` ( default: the active one )."""
+    localized = dict(result)
+    if result["is_valid"]:
+        table = message_table.get(language)
+        localized["century"] = table[result["century"]]
+        localized["gender"] = table[result["gender"]]
+    else:
+        localized["errors"] = localize_errors(result["errors"], language)
+    return localized
+
+
+class TodaySnapshot:
+    """Today's date read from ``clock`` once per day instead of once per ID."""
+
+    def __init__(self, clock=None):
+        self.clock = clock or datetime.now
+        self.refresh()
+
+    def refresh(self):
+        now = self.clock()
+        next_midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=now.tzinfo)
+        # one tuple so readers never see a half updated day
+        self._today = (now.year, now.month * 100 + now.day, now.toordinal())
+        self._expires_at = monotonic() + (next_midnight - now).total_seconds()
+
+    def current(self):
+        """Return ``(year, month * 100 + day, ordinal)`` for today."""
+        if monotonic() >= self._expires_at:
+            self.refresh()
+        return self._today
+
+    def seconds_left(self):
+        """Seconds until the next midnight."""
+        if monotonic() >= self._expires_at:
+            self.refresh()
+        return self._expires_at - monotonic()
+
+
+class NationalIDResult:
+    """
+    Outcome of a single ``decode``, kept slotted so batch jobs can hold millions of them.
+    ``century``, ``gender`` and ``errors`` are ``MESSAGES`` codes, see ``localize``.
+    """
+
+    __slots__ = (
+        "national_id",
+        "is_valid",
+        "errors",
+        "birth_year",
+        "birth_month",
+        "birth_day",
+        "age",
+        "century",
+        "generation",
+        "governorate",
+        "gender",
+        "serial_number",
+    )
+
+    def __init__(
+        self,
+        national_id,
+        is_valid,
+        errors=None,
+        birth_year=None,
+        birth_month=None,
+        birth_day=None,
+        age=None,
+        century=None,
+        generation=None,
+        governorate=None,
+        gender=None,
+        serial_number=None,
+    ):
+        self.national_id = national_id
+        self.is_valid = is_valid
+        self.errors = errors
+        self.birth_year = birth_year
+        self.birth_month = birth_month
+        self.birth_day = birth_day
+        self.age = age
+        self.century = century
+        self.generation = generation
+        self.governorate = governorate
+        self.gender = gender
+        self.serial_number = serial_number
+
+    @property
+    def birth_date(self):
+        if self.birth_year is None:
+            return None
+        return f"{self.birth_year:04d}-{self.birth_month:02d}-{self.birth_day:02d}"
+
+    def to_dict(self):
+        if not self.is_valid:
+            return {"national_id": self.national_id, "is_valid": False, "errors": self.errors}
+
+        return {
+            "national_id": self.national_id,
+            "is_valid": True,
+            "birth_date": self.birth_date,
+            "birth_year": self.birth_year,
+            "birth_month": self.birth_month,
+            "birth_day": self.birth_day,
+            "age": self.age,
+            "century": self.century,
+            "generation": self.generation,
+            "governorate": self.governorate,
+            "gender": self.gender,
+            "serial_number": self.serial_number,
+        }
+
+    def localize(self, language=None):
+        return localize_result(self.to_dict(), language)
+
+    def to_facts(self):
+        """
+        ``to_dict`` without what changes with today's date: no ``is_valid``, no ``age`` and no future
+        birth date error, but the birth date whenever it is a real date. Facts never go stale,
+        ``NationalIDValidator.derive`` turns them into today's ``to_dict``.
+        """
+        errors = [error for error in self.errors or () if error[0] != FUTURE_BIRTH_DATE]
+        facts = {"national_id": self.national_id, "errors": errors}
+
+        if self.birth_year is not None:
+            facts["birth_date"] = self.birth_date
+            facts["birth_year"] = self.birth_year
+            facts["birth_month"] = self.birth_month
+            facts["birth_day"] = self.birth_day
+
+        if not errors:
+            facts["century"] = self.century
+            facts["generation"] = self.generation
+            facts["governorate"] = self.governorate
+            facts["gender"] = self.gender
+            facts["serial_number"] = self.serial_number
+
+        return facts
+
+
 class NationalIDValidator:
 
-    def __init__(self):
+    def __init__(self, clock=None):
+        self.today = TodaySnapshot(clock)
+        self.month_days, self.month_ordinals = self._build_date_tables()
+        self.month_days_array = np.array(self.month_days, dtype=np.int32)
+        self.month_ordinals_array = np.array(self.month_ordinals, dtype=np.int32)
         self.governorates = self._load_governorates()
         self.generations = self._load_generations()
+        self.governorate_table = self._build_governorate_table()
+        self.governorate_mask = np.array([info is not None for info in self.governorate_table], dtype=bool)
+        self.generation_table = self._build_generation_table()
 
     def _load_governorates(self):
         base_dir = Path(__file__).resolve().parent.parent
@@ -29,6 +262,45 @@ class NationalIDValidator:
 
         return data["generations"]
 
+    def _build_date_tables(self):
+        # slot = (year - 1900) * 100 + month, day validity is then a 1..month_days range check
+        # and the date's ordinal is month_ordinals[slot] + day
+        month_days = [0] * ((LAST_BIRTH_YEAR - FIRST_BIRTH_YEAR + 1) * MONTH_SLOTS)
+        month_ordinals = [0] * len(month_days)
+
+        for year in range(FIRST_BIRTH_YEAR, LAST_BIRTH_YEAR + 1):
+            for month in range(1, 13):
+                first_day = date(year, month, 1)
+                next_month = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+                slot = self._date_slot(year, month)
+                month_days[slot] = (next_month - first_day).days
+                month_ordinals[slot] = first_day.toordinal() - 1
+
+        return month_days, month_ordinals
+
+    def _build_governorate_table(self):
+        table = [None] * GOVERNORATE_SLOTS
+        for code, info in self.governorates.items():
+            table[int(code)] = {
+                "code": code,
+                "name_english": info.get("english", "Unknown"),
+                "name_arabic": info.get("arabic", "غير معروف"),
+            }
+        return table
+
+    def _build_generation_table(self):
+        table = [None] * (LAST_BIRTH_YEAR - FIRST_BIRTH_YEAR + 1)
+        # first match wins on overlapping ranges, same as the old linear scan
+        for generation in self.generations:
+            entry = {"name": generation["name"], "year_range": f"{generation['start_year']}-{generation['end_year']}"}
+            first = max(generation["start_year"], FIRST_BIRTH_YEAR)
+            last = min(generation["end_year"], LAST_BIRTH_YEAR)
+            for year in range(first, last + 1):
+                index = year - FIRST_BIRTH_YEAR
+                if table[index] is None:
+                    table[index] = entry
+        return [entry or UNKNOWN_GENERATION for entry in table]
+
     def _normalize_id(self, national_id):
         return str(national_id).strip()
 
@@ -36,10 +308,10 @@ class NationalIDValidator:
         errors = []
 
         if not national_id.isdigit():
-            errors.append(_("National ID must contain only digits"))
+            errors.append(("non_digit", {}))
 
         if len(national_id) != 14:
-            errors.append(_(f"National ID must be exactly 14 digits (got {len(national_id)})"))
+            errors.append(("length", {"length": len(national_id)}))
 
         return errors
 
@@ -48,11 +320,11 @@ class NationalIDValidator:
 
     def _validate_century(self, century):
         if century not in ["2", "3"]:
-            return _(f"Invalid century digit: {century} (must be 2 or 3)")
+            return ("century", {"digit": century})
         return None
 
     def _get_century_text(self, century):
-        return _("20th century (1900-1999)") if century == "2" else _("21st century (2000+)")
+        return "century_20" if century == "2" else "century_21"
 
     def _extract_date_parts(self, national_id):
         year = int(national_id[1:3])
@@ -66,24 +338,38 @@ class NationalIDValidator:
         else:
             return 2000 + year
 
+    def _date_slot(self, full_year, month):
+        return (full_year - FIRST_BIRTH_YEAR) * MONTH_SLOTS + month
+
     def _validate_date(self, century, year, month, day):
-        try:
-            full_year = self._calculate_full_year(century, year)
-            birth_date = datetime(full_year, month, day)
+        full_year = self._calculate_full_year(century, year)
+        slot = self._date_slot(full_year, month)
 
-            if birth_date > datetime.now():
-                return _(f"Birth date cannot be in the future: {birth_date.strftime('%Y-%m-%d')}")
+        if not 1 <= day <= self.month_days[slot]:
+            # same wording datetime() used to raise with
+            return ("day_out_of_range", {}) if 1 <= month <= 12 else ("month_out_of_range", {})
 
-            return None
-        except ValueError as e:
-            return _(f"Invalid date of birth: {str(e)}")
+        if self.month_ordinals[slot] + day > self.today.current()[2]:
+            return self._future_birth_date_error(full_year, month, day)
+
+        return None
+
+    def _future_birth_date_error(self, full_year, month, day):
+        return (FUTURE_BIRTH_DATE, {"date": f"{full_year:04d}-{month:02d}-{day:02d}"})
 
     def _extract_governorate_code(self, national_id):
         return national_id[7:9]
 
+    def _get_governorate(self, governorate_code):
+        # non ascii digit codes have no slot so they can't alias a real governorate
+        slot = GOVERNORATE_SLOT_INDEX.get(governorate_code)
+        if slot is None:
+            return None
+        return self.governorate_table[slot]
+
     def _validate_governorate(self, governorate_code):
-        if governorate_code not in self.governorates:
-            return _(f"Invalid governorate code: {governorate_code}")
+        if self._get_governorate(governorate_code) is None:
+            return ("governorate", {"code": governorate_code})
         return None
 
     def _extract_serial_number(self, national_id):
@@ -93,26 +379,25 @@ class NationalIDValidator:
         return int(national_id[12])
 
     def _determine_gender(self, gender_digit):
-        return _("Male") if gender_digit % 2 == 1 else _("Female")
+        return "male" if gender_digit % 2 == 1 else "female"
 
-    def _calculate_age(self, birth_date):
-        today = datetime.now()
-        return today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
+    def _calculate_age(self, birth_year, birth_month, birth_day):
+        today_year, today_month_day, _ordinal = self.today.current()
+        return today_year - birth_year - (today_month_day < birth_month * 100 + birth_day)
 
     def _get_generation(self, birth_year):
-        for generation in self.generations:
-            if generation["start_year"] <= birth_year <= generation["end_year"]:
-                return {"name": generation["name"], "year_range": f"{generation['start_year']}-{generation['end_year']}"}
-        return {"name": "Unknown", "year_range": "N/A"}
-
-    def validate(self, national_id):
-        errors = []
+        index = birth_year - FIRST_BIRTH_YEAR
+        if 0 <= index < len(self.generation_table):
+            return self.generation_table[index]
+        return UNKNOWN_GENERATION
 
+    def decode(self, national_id):
+        """Validate and extract in one pass over the digits."""
         national_id = self._normalize_id(national_id)
-        errors.extend(self._validate_basic_format(national_id))
+        errors = self._validate_basic_format(national_id)
 
         if errors:
-            return {"is_valid": False, "errors": errors}
+            return NationalIDResult(national_id, False, errors)
 
         century = self._extract_century(national_id)
         century_error = self._validate_century(century)
@@ -125,53 +410,191 @@ class NationalIDValidator:
             errors.append(date_error)
 
         governorate_code = self._extract_governorate_code(national_id)
-        governorate_error = self._validate_governorate(governorate_code)
-        if governorate_error:
-            errors.append(governorate_error)
+        governorate = self._get_governorate(governorate_code)
+        if governorate is None:
+            errors.append(self._validate_governorate(governorate_code))
 
-        return {"is_valid": len(errors) == 0, "errors": errors if errors else None}
+        full_year = self._calculate_full_year(century, year)
+        is_date = date_error is None or date_error[0] == FUTURE_BIRTH_DATE
+        if errors and not (is_date and errors == [date_error]):
+            return self._invalid_result(national_id, errors, full_year, month, day, is_date)
+
+        age = None if errors else self._calculate_age(full_year, month, day)
+        return self._full_result(national_id, errors, full_year, month, day, age, governorate, self._extract_gender_digit(national_id))
+
+    def _full_result(self, national_id, errors, birth_year, birth_month, birth_day, age, governorate, gender_digit):
+        # also for IDs whose only error is a birth date in the future, they turn valid with time
+        return NationalIDResult(
+            national_id,
+            not errors,
+            errors or None,
+            birth_year=birth_year,
+            birth_month=birth_month,
+            birth_day=birth_day,
+            age=age,
+            century=self._get_century_text(self._extract_century(national_id)),
+            generation=self._get_generation(birth_year),
+            governorate=governorate,
+            gender=self._determine_gender(gender_digit),
+            serial_number=self._extract_serial_number(national_id),
+        )
+
+    def _invalid_result(self, national_id, errors, birth_year, birth_month, birth_day, is_date):
+        # invalid on any day, only a real birth date is kept for the future date check of ``derive``
+        if not is_date:
+            return NationalIDResult(national_id, False, errors)
+        return NationalIDResult(national_id, False, errors, birth_year=birth_year, birth_month=birth_month, birth_day=birth_day)
+
+    def derive(self, facts, national_id=None):
+        """
+        Today's ``NationalIDResult.to_dict()`` for ``to_facts`` output: adds the age and redoes the future
+        birth date check. With ``national_id`` the facts may be ``prefix_facts`` of any ID sharing its prefix.
+        """
+        if national_id is not None:
+            national_id = self._normalize_id(national_id)
+            facts = dict(facts, national_id=national_id)
+            if not facts["errors"]:
+                facts["serial_number"] = self._extract_serial_number(national_id)
+                facts["gender"] = self._determine_gender(self._extract_gender_digit(national_id))
+
+        errors = facts["errors"]
+        birth_year = facts.get("birth_year")
+
+        if birth_year is not None:
+            birth_month = facts["birth_month"]
+            birth_day = facts["birth_day"]
+            if self.month_ordinals[self._date_slot(birth_year, birth_month)] + birth_day > self.today.current()[2]:
+                # same place in the list as decode, right after a century error
+                index = 1 if errors and errors[0][0] == "century" else 0
+                errors = [*errors[:index], self._future_birth_date_error(birth_year, birth_month, birth_day), *errors[index:]]
 
-    def extract_info(self, national_id):
+        if errors:
+            return {"national_id": facts["national_id"], "is_valid": False, "errors": errors}
 
-        validation_result = self.validate(national_id)
+        result = dict(facts, is_valid=True, age=self._calculate_age(birth_year, birth_month, birth_day))
+        del result["errors"]
+        return result
 
-        if not validation_result["is_valid"]:
-            return None
+    def validate(self, national_id):
+        decoded = self.decode(national_id)
+        return {"is_valid": decoded.is_valid, "errors": localize_errors(decoded.errors) if decoded.errors else None}
 
-        national_id = self._normalize_id(national_id)
+    def extract_info(self, national_id):
+        decoded = self.decode(national_id)
+        return decoded.localize() if decoded.is_valid else None
 
-        century = self._extract_century(national_id)
-        century_text = self._get_century_text(century)
-        year, month, day = self._extract_date_parts(national_id)
-        full_year = self._calculate_full_year(century, year)
-        birth_date = datetime(full_year, month, day)
+    def _is_bulk_candidate(self, national_id):
+        # non ascii digits (e.g. arabic-indic) pass isdigit() but can't be decoded as bytes
+        return len(national_id) == NATIONAL_ID_LENGTH and national_id.isascii() and national_id.isdigit()
 
-        age = self._calculate_age(birth_date)
+    def _to_digit_matrix(self, national_ids):
+        buffer = "".join(national_ids).encode("ascii")
+        digits = np.frombuffer(buffer, dtype=np.uint8).reshape(-1, NATIONAL_ID_LENGTH)
+        return digits.astype(np.int32) - ord("0")
 
-        governorate_code = self._extract_governorate_code(national_id)
-        governorate_info = self.governorates.get(governorate_code, {})
+    def _check_columns(self, national_ids):
+        digits = self._to_digit_matrix(national_ids)
 
-        gender_digit = self._extract_gender_digit(national_id)
-        gender = self._determine_gender(gender_digit)
+        century = digits[:, 0]
+        year = digits[:, 1] * 10 + digits[:, 2]
+        month = digits[:, 3] * 10 + digits[:, 4]
+        day = digits[:, 5] * 10 + digits[:, 6]
+        governorate = digits[:, 7] * 10 + digits[:, 8]
 
-        serial_number = self._extract_serial_number(national_id)
-        generation = self._get_generation(full_year)
+        century_ok = (century == 2) | (century == 3)
+        full_year = np.where(century == 2, 1900, 2000) + year
+
+        slot = self._date_slot(full_year, month)
+        today = self.today.current()
+        is_date = (day >= 1) & (day <= self.month_days_array[slot])
+        date_ok = is_date & (self.month_ordinals_array[slot] + day <= today[2])
+
+        governorate_ok = self.governorate_mask[governorate]
 
         return {
-            "national_id": national_id,
-            "is_valid": True,
-            "birth_date": birth_date.strftime("%Y-%m-%d"),
-            "birth_year": full_year,
-            "birth_month": month,
-            "birth_day": day,
-            "age": age,
-            "century": century_text,
-            "generation": generation,
-            "governorate": {
-                "code": governorate_code,
-                "name_english": governorate_info.get("english", "Unknown"),
-                "name_arabic": governorate_info.get("arabic", "غير معروف"),
-            },
-            "gender": gender,
-            "serial_number": serial_number,
+            "digits": digits,
+            "full_year": full_year,
+            "month": month,
+            "day": day,
+            "governorate": governorate,
+            "century_ok": century_ok,
+            "is_date": is_date,
+            "date_ok": date_ok,
+            "governorate_ok": governorate_ok,
+            "is_valid": century_ok & date_ok & governorate_ok,
+            "today": today,
         }
+
+    def _collect_errors(self, national_id, century_ok, date_ok, governorate_ok):
+        errors = []
+        century = self._extract_century(national_id)
+
+        if not century_ok:
+            errors.append(self._validate_century(century))
+
+        if not date_ok:
+            year, month, day = self._extract_date_parts(national_id)
+            errors.append(self._validate_date(century, year, month, day))
+
+        if not governorate_ok:
+            errors.append(self._validate_governorate(self._extract_governorate_code(national_id)))
+
+        return errors
+
+    def decode_many(self, national_ids):
+        """Vectorized ``decode`` over a sequence of IDs, results are returned in input order."""
+        national_ids = [self._normalize_id(national_id) for national_id in national_ids]
+        results = [None] * len(national_ids)
+        rows = []
+
+        for index, national_id in enumerate(national_ids):
+            if self._is_bulk_candidate(national_id):
+                rows.append(index)
+            else:
+                results[index] = self.decode(national_id)
+
+        if not rows:
+            return results
+
+        columns = self._check_columns([national_ids[index] for index in rows])
+
+        today_year, today_month_day, _ordinal = columns["today"]
+        full_year = columns["full_year"]
+        month = columns["month"]
+        day = columns["day"]
+        age = today_year - full_year - (today_month_day < month * 100 + day)
+
+        row_values = zip(
+            rows,
+            columns["is_valid"].tolist(),
+            columns["century_ok"].tolist(),
+            columns["is_date"].tolist(),
+            columns["date_ok"].tolist(),
+            columns["governorate_ok"].tolist(),
+            full_year.tolist(),
+            month.tolist(),
+            day.tolist(),
+            age.tolist(),
+            columns["governorate"].tolist(),
+            columns["digits"][:, 12].tolist(),
+        )
+
+        for index, is_valid, century_ok, is_date, date_ok, governorate_ok, birth_year, birth_month, birth_day, birth_age, governorate, gender_digit in row_values:
+            national_id = national_ids[index]
+            errors = None if is_valid else self._collect_errors(national_id, century_ok, date_ok, governorate_ok)
+
+            if is_valid or (century_ok and is_date and governorate_ok):
+                age = birth_age if is_valid else None
+                results[index] = self._full_result(national_id, errors, birth_year, birth_month, birth_day, age, self.governorate_table[governorate], gender_digit)
+            else:
+                results[index] = self._invalid_result(national_id, errors, birth_year, birth_month, birth_day, is_date)
+
+        return results
+
+    def validate_many(self, national_ids):
+        """Vectorized ``validate``, see ``decode_many``."""
+        return [{"is_valid": decoded.is_valid, "errors": localize_errors(decoded.errors) if decoded.errors else None} for decoded in self.decode_many(national_ids)]
+
+    def extract_info_many(self, national_ids):
+        """Vectorized ``extract_info``, invalid IDs map to ``None`` like the per-ID path."""
+        return [decoded.localize() if decoded.is_valid else None for decoded in self.decode_many(national_ids)]
@@ -0,0 +1,162 @@
+import atexit
+import os
+import threading
+from time import monotonic, perf_counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from .constants import API_CALL_LOG_STATS_COUNTERS, CACHE_KEY_API_CALL_LOG_STATS
+from .log_stream import publish_rows
+from .metrics import SharedCounters
+from .models import APICallLog
+
+
+class APICallLogSink:
+    """
+    Buffers ``APICallLog`` rows in memory and inserts them with ``bulk_create`` from a background thread.
+    With ``API_CALL_LOG_BACKEND = "stream"`` batches are appended to a Redis Stream instead and the
+    ``consume_call_logs`` command writes them to the database, keeping database I/O off the web workers.
+
+    A batch is written once ``API_CALL_LOG_BATCH_SIZE`` rows are pending or ``API_CALL_LOG_FLUSH_INTERVAL``
+    seconds passed since the first one arrived. The buffer holds at most ``API_CALL_LOG_BUFFER_CAPACITY``
+    rows, past that new rows are dropped and counted so a slow database never grows the worker's memory.
+    Pending rows are written when the worker exits.
+    """
+
+    def __init__(self):
+        self._pid = None
+        self._lock = threading.Lock()
+        self._rows = []
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = None
+        self.stats = SharedCounters(CACHE_KEY_API_CALL_LOG_STATS, API_CALL_LOG_STATS_COUNTERS)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _ensure_process(self):
+        # gunicorn forks workers after preload, the flush thread must belong to this process
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._rows = []
+                    self._closed = False
+                    self._thread = threading.Thread(target=self._run, name="api_call_log_sink", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)
+                    self._pid = os.getpid()
+
+    def add(self, user, national_id, is_valid, ip_address, user_agent):
+        self.add_many(user, [(national_id, is_valid)], ip_address, user_agent)
+
+    async def aadd(self, user, national_id, is_valid, ip_address, user_agent):
+        """``add`` for async views, buffering never waits on I/O, only the synchronous test mode write runs in a thread."""
+        if settings.TESTING:
+            await sync_to_async(self.add)(user, national_id, is_valid, ip_address, user_agent)
+        else:
+            self.add(user, national_id, is_valid, ip_address, user_agent)
+
+    def add_many(self, user, results, ip_address, user_agent):
+        """Buffer one row per ``(national_id, is_valid)`` pair, all made by the same client."""
+        timestamp = timezone.now()
+        rows = [
+            {
+                "user_id": user.pk if user is not None else None,
+                "national_id": national_id,
+                "is_valid": is_valid,
+                "ip_address": ip_address,
+                "user_agent": user_agent,
+                "timestamp": timestamp,
+            }
+            for national_id, is_valid in results
+        ]
+
+        # just for run  tests, rows must be in the database when the response is returned
+        if settings.TESTING:
+            self.stats.add("rows_added", len(rows))
+            self._write(rows)
+            return
+
+        self._ensure_process()
+        with self._condition:
+            room = max(settings.API_CALL_LOG_BUFFER_CAPACITY - len(self._rows), 0)
+            accepted = rows[:room]
+            self._rows.extend(accepted)
+            if accepted and (len(self._rows) == len(accepted) or len(self._rows) >= settings.API_CALL_LOG_BATCH_SIZE):
+                self._condition.notify()
+
+        self.stats.add("rows_added", len(rows))
+        if len(accepted) < len(rows):
+            self.stats.add("rows_dropped", len(rows) - len(accepted))
+
+    def flush(self):
+        """Write everything pending from the calling thread."""
+        while True:
+            with self._condition:
+                batch = self._take_batch()
+            if not batch:
+                return
+            self._write(batch)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+        self.stats.flush()
+
+    def _take_batch(self):
+        batch = self._rows[: settings.API_CALL_LOG_BATCH_SIZE]
+        del self._rows[: settings.API_CALL_LOG_BATCH_SIZE]
+        return batch
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._rows and not self._closed:
+                    self._condition.wait()
+
+                # give a batch the chance to fill up before paying for a transaction
+                deadline = monotonic() + settings.API_CALL_LOG_FLUSH_INTERVAL
+                while len(self._rows) < settings.API_CALL_LOG_BATCH_SIZE and not self._closed:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+                if self._closed:
+                    return
+
+                batch = self._take_batch()
+
+            close_old_connections()
+            self._write(batch)
+
+    def _write(self, batch):
+        start = perf_counter()
+        try:
+            if settings.API_CALL_LOG_BACKEND == "stream":
+                publish_rows(batch)
+            else:
+                APICallLog.objects.bulk_create(APICallLog(**row) for row in batch)
+        except Exception as e:
+            self.stats.add("rows_dropped", len(batch))
+            print(f"Error logging API calls: {e}")
+            if not settings.TESTING:
+                # a broken connection must not poison the next batch
+                connection.close()
+            return
+
+        self.stats.add("rows_flushed", len(batch))
+        self.stats.add("flushes")
+        self.stats.add("flush_milliseconds", round((perf_counter() - start) * 1000))
+
+
+api_call_log_sink = APICallLogSink()
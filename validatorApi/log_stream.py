@@ -0,0 +1,43 @@
+import redis
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+_client = None
+
+
+def get_stream_client():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.API_CALL_LOG_STREAM_URL)
+    return _client
+
+
+def encode_row(row):
+    return {
+        "user_id": "" if row["user_id"] is None else str(row["user_id"]),
+        "national_id": row["national_id"],
+        "is_valid": "1" if row["is_valid"] else "0",
+        "ip_address": row["ip_address"] or "",
+        "user_agent": row["user_agent"],
+        "timestamp": row["timestamp"].isoformat(),
+    }
+
+
+def decode_row(fields):
+    fields = {key.decode(): value.decode() for key, value in fields.items()}
+    return {
+        "user_id": int(fields["user_id"]) if fields["user_id"] else None,
+        "national_id": fields["national_id"],
+        "is_valid": fields["is_valid"] == "1",
+        "ip_address": fields["ip_address"] or None,
+        "user_agent": fields["user_agent"],
+        "timestamp": parse_datetime(fields["timestamp"]),
+    }
+
+
+def publish_rows(rows):
+    """Append rows to the call log stream in one pipelined round-trip."""
+    pipe = get_stream_client().pipeline(transaction=False)
+    for row in rows:
+        pipe.xadd(settings.API_CALL_LOG_STREAM, encode_row(row), maxlen=settings.API_CALL_LOG_STREAM_MAXLEN, approximate=True)
+    pipe.execute()
@@ -0,0 +1,47 @@
+import redis
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from validatorApi.log_sink import api_call_log_sink
+from validatorApi.log_stream import get_stream_client
+
+
+class Command(BaseCommand):
+    help = "Show buffer, flush and drop counters of the API call log writer"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Reset the counters after printing them")
+
+    def handle(self, *args, **options):
+        stats = api_call_log_sink.stats.read()
+
+        pending = stats["rows_added"] - stats["rows_flushed"] - stats["rows_dropped"]
+        latency = stats["flush_milliseconds"] / stats["flushes"] if stats["flushes"] else 0
+        batch = stats["rows_flushed"] / stats["flushes"] if stats["flushes"] else 0
+
+        self.stdout.write(f"Buffered: {pending} row(s) waiting in worker buffers")
+        self.stdout.write(f"Flushed: {stats['rows_flushed']} row(s) in {stats['flushes']} batch(es), {batch:.0f} row(s) per batch, {latency:.1f}ms per batch")
+        self.stdout.write(f"Dropped: {stats['rows_dropped']} row(s)")
+
+        if settings.API_CALL_LOG_BACKEND == "stream":
+            self._write_stream_stats()
+
+        if options["reset"]:
+            api_call_log_sink.stats.reset()
+            self.stdout.write(self.style.SUCCESS("Successfully reset API call log counters"))
+
+    def _write_stream_stats(self):
+        client = get_stream_client()
+        try:
+            length = client.xlen(settings.API_CALL_LOG_STREAM)
+            groups = {group["name"].decode(): group for group in client.xinfo_groups(settings.API_CALL_LOG_STREAM)}
+        except redis.ResponseError:
+            length, groups = 0, {}
+
+        group = groups.get(settings.API_CALL_LOG_STREAM_GROUP)
+        if group is None:
+            self.stdout.write(f"Stream: {length} event(s), no consumer group yet")
+            return
+
+        lag = group.get("lag")
+        self.stdout.write(f"Stream: {length} event(s), {group['pending']} pending, {'unknown' if lag is None else lag} not yet read by consume_call_logs")
@@ -1,7 +1,6 @@
-from django.core.cache import cache
 from django.core.management.base import BaseCommand
 
-from validatorApi.constants import get_validation_cache_key
+from validatorApi.result_cache import validation_cache
 
 
 class Command(BaseCommand):
@@ -14,9 +13,8 @@ class Command(BaseCommand):
         national_id = options.get("national_id")
 
         if national_id:
-            # Clear specific national ID
-            cache_key = get_validation_cache_key(national_id)
-            result = cache.delete(cache_key)
+            # Clear specific national ID, every worker drops its local copy too
+            result = validation_cache.delete(national_id)
 
             if result:
                 self.stdout.write(self.style.SUCCESS(f"Successfully cleared cache for national ID: {national_id}"))
@@ -24,5 +22,5 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.WARNING(f"No cache found for national ID: {national_id}"))
         else:
             # Clear all cache
-            cache.clear()
+            validation_cache.clear()
             self.stdout.write(self.style.SUCCESS("Successfully cleared all validation cache"))
@@ -0,0 +1,98 @@
+import os
+import socket
+import time
+
+import redis
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from validatorApi.log_stream import decode_row, get_stream_client
+from validatorApi.models import APICallLog
+
+
+class Command(BaseCommand):
+    help = "Read API call log events from the Redis Stream in batches and write them to the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--consumer", type=str, default=f"{socket.gethostname()}-{os.getpid()}", help="Consumer name inside the consumer group")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Events read and inserted at once")
+        parser.add_argument("--block", type=int, default=5000, help="Milliseconds to wait for new events")
+        parser.add_argument("--claim-idle", type=int, default=60000, help="Take over events left unacknowledged by another consumer for this many milliseconds")
+        parser.add_argument("--once", action="store_true", help="Exit once the stream is drained")
+
+    def handle(self, *args, **options):
+        self.client = get_stream_client()
+        self.stream = settings.API_CALL_LOG_STREAM
+        self.group = settings.API_CALL_LOG_STREAM_GROUP
+        self.consumer = options["consumer"]
+        self.batch_size = options["batch_size"]
+        self.saved = 0
+
+        self._create_group()
+
+        # events this consumer read but never acknowledged ( crash before commit ) come first
+        while self._read("0"):
+            pass
+
+        next_claim = 0
+        while True:
+            if time.monotonic() >= next_claim:
+                self._claim_stale(options["claim_idle"])
+                next_claim = time.monotonic() + options["claim_idle"] / 1000
+
+            read = self._read(">", block=None if options["once"] else options["block"])
+            if options["once"] and not read:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f"Saved {self.saved} API call log(s)"))
+
+    def _create_group(self):
+        try:
+            self.client.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def _read(self, stream_id, block=None):
+        response = self.client.xreadgroup(self.group, self.consumer, {self.stream: stream_id}, count=self.batch_size, block=block)
+        entries = response[0][1] if response else []
+        if entries:
+            self._save(entries)
+        return len(entries)
+
+    def _claim_stale(self, min_idle_time):
+        start_id = "0-0"
+        while True:
+            # Redis 7 appends the ids of deleted entries to the reply, 6.2 does not
+            start_id, entries = self.client.xautoclaim(self.stream, self.group, self.consumer, min_idle_time, start_id=start_id, count=self.batch_size)[:2]
+            if entries:
+                self._save(entries)
+            if start_id in (b"0-0", "0-0"):
+                return
+
+    def _save(self, entries):
+        logs = []
+        for entry_id, fields in entries:
+            # pending events trimmed by MAXLEN come back without fields, they are only acknowledged
+            if not fields:
+                continue
+            try:
+                logs.append(APICallLog(**decode_row(fields)))
+            except (KeyError, ValueError, TypeError) as e:
+                self.stderr.write(f"Skipping malformed API call log event {entry_id}: {e}")
+
+        # an exception leaves the events pending, they are retried by this consumer or claimed by another one
+        close_old_connections()
+
+        # users deleted since the event was published, same as on_delete=SET_NULL
+        user_ids = {log.user_id for log in logs if log.user_id is not None}
+        existing_ids = set(User.objects.filter(pk__in=user_ids).values_list("pk", flat=True)) if user_ids else set()
+        for log in logs:
+            if log.user_id not in existing_ids:
+                log.user_id = None
+
+        APICallLog.objects.bulk_create(logs)
+        self.client.xack(self.stream, self.group, *[entry_id for entry_id, _fields in entries])
+        self.saved += len(logs)
@@ -0,0 +1,42 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from validatorApi.models import APIUsageDaily
+from validatorApi.usage import usage_counters
+
+
+class Command(BaseCommand):
+    help = "Copy the per-user daily usage counters from Redis to the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Counters written per query")
+
+    def handle(self, *args, **options):
+        saved = 0
+        batch = []
+
+        for row in usage_counters.iter_days(options["batch_size"]):
+            batch.append(row)
+            if len(batch) >= options["batch_size"]:
+                saved += self._save(batch)
+                batch = []
+        if batch:
+            saved += self._save(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Saved {saved} daily usage counter(s)"))
+
+    def _save(self, batch):
+        # Redis holds the whole day so rows are overwritten, running the command twice changes nothing
+        user_ids = set(User.objects.filter(pk__in={user_id for user_id, *_counts in batch}).values_list("pk", flat=True))
+        rows = [
+            APIUsageDaily(user_id=user_id, date=date, valid_count=valid, invalid_count=invalid)
+            for user_id, date, valid, invalid in batch
+            if user_id in user_ids
+        ]
+        APIUsageDaily.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["user", "date"],
+            update_fields=["valid_count", "invalid_count"],
+        )
+        return len(rows)
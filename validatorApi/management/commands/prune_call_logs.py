@@ -0,0 +1,36 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from validatorApi.constants import ROLLUP_API_CALL_DAILY
+from validatorApi.models import APICallLog, RollupCheckpoint
+
+
+class Command(BaseCommand):
+    help = "Delete API call logs older than the retention period in small chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.API_CALL_LOG_RETENTION_DAYS, help="Keep logs newer than this many days")
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Rows deleted per statement")
+        parser.add_argument("--pause", type=float, default=0.1, help="Seconds to sleep between chunks so writers get the lock")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+
+        # rows not folded into the daily rollup yet are kept, run rollup_call_logs first
+        checkpoint = RollupCheckpoint.objects.filter(name=ROLLUP_API_CALL_DAILY).first()
+        last_id = checkpoint.last_id if checkpoint else 0
+
+        expired = APICallLog.objects.filter(timestamp__lt=cutoff, id__lte=last_id).order_by("id")
+        deleted = 0
+
+        while ids := list(expired.values_list("id", flat=True)[: options["chunk_size"]]):
+            # each chunk is its own short transaction
+            deleted += APICallLog.objects.filter(id__in=ids).delete()[0]
+            self.stdout.write(f"Deleted {deleted} API call log(s) so far")
+            time.sleep(options["pause"])
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} API call log(s) older than {options['days']} day(s)"))
@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from validatorApi.constants import CHECKPOINT_EXPIRED_TOKENS
+from validatorApi.models import RollupCheckpoint
+
+
+class Command(BaseCommand):
+    help = "Delete expired JWT tokens in small primary key ordered chunks, resuming where the last run stopped"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500, help="Tokens deleted per transaction")
+        parser.add_argument("--pause", type=float, default=0.2, help="Seconds to sleep between chunks so API writes get the lock")
+        parser.add_argument("--report-every", type=int, default=20, help="Print progress every this many chunks")
+        parser.add_argument("--restart", action="store_true", help="Ignore the saved position and start from the first token")
+        parser.add_argument("--continuous", action="store_true", help="Keep running, one pass every --interval seconds")
+        parser.add_argument("--interval", type=float, default=3600, help="Seconds between passes with --continuous")
+
+    def handle(self, *args, **options):
+        self.checkpoint, _ = RollupCheckpoint.objects.get_or_create(name=CHECKPOINT_EXPIRED_TOKENS)
+        if options["restart"]:
+            self._save_position(0)
+
+        while True:
+            self._run_pass(options)
+            if not options["continuous"]:
+                return
+            time.sleep(options["interval"])
+
+    def _run_pass(self, options):
+        now = timezone.now()
+        position = self.checkpoint.last_id
+        deleted = chunks = 0
+        start = time.perf_counter()
+
+        if position:
+            self.stdout.write(f"Resuming after token id {position}")
+
+        while True:
+            # walks the primary key index from the saved position, expires_at has no index
+            ids = list(
+                OutstandingToken.objects.filter(pk__gt=position, expires_at__lte=now)
+                .order_by("pk")
+                .values_list("pk", flat=True)[: options["chunk_size"]]
+            )
+            if not ids:
+                break
+
+            # one short transaction per chunk, blacklist rows go with their token
+            deleted += OutstandingToken.objects.filter(pk__in=ids).delete()[1].get(OutstandingToken._meta.label, 0)
+            position = ids[-1]
+            self._save_position(position)
+            chunks += 1
+
+            if chunks % options["report_every"] == 0:
+                self.stdout.write(f"Deleted {deleted} expired token(s) so far, up to id {position} ({self._rate(deleted, start):,.0f} rows/s)")
+            time.sleep(options["pause"])
+
+        # the pass reached the end, the next one starts from the first token again
+        self._save_position(0)
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired token(s) in {time.perf_counter() - start:.2f}s ({self._rate(deleted, start):,.0f} rows/s)"))
+
+    def _save_position(self, position):
+        self.checkpoint.last_id = position
+        RollupCheckpoint.objects.filter(pk=self.checkpoint.pk).update(last_id=position)
+
+    def _rate(self, deleted, start):
+        elapsed = time.perf_counter() - start
+        return deleted / elapsed if elapsed else 0
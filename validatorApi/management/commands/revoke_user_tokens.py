@@ -1,34 +1,54 @@
+from collections import Counter
+
 from django.contrib.auth.models import User
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
 
+from validatorApi.authentication import token_revocations
+
 
 class Command(BaseCommand):
-    help = "Revoke all JWT tokens for a specific user"
+    help = "Revoke all JWT tokens for one or more users or whole groups"
 
     def add_arguments(self, parser):
-        parser.add_argument("username", type=str, help="Username to revoke tokens for")
+        parser.add_argument("usernames", nargs="*", type=str, help="Usernames to revoke tokens for")
+        parser.add_argument("--group", action="append", default=[], help="Revoke tokens for every member of this group (repeatable)")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Blacklist rows inserted per query")
 
     def handle(self, *args, **options):
-        username = options["username"]
+        usernames = options["usernames"]
+        groups = options["group"]
+        if not usernames and not groups:
+            raise CommandError("Give at least one username or --group")
 
-        try:
-            user = User.objects.get(username=username)
-        except User.DoesNotExist:
+        users = dict(User.objects.filter(username__in=usernames).values_list("pk", "username"))
+        for username in sorted(set(usernames) - set(users.values())):
             self.stdout.write(self.style.ERROR(f'User "{username}" does not exist'))
-            return
 
-        # Get all outstanding tokens for the user
-        tokens = OutstandingToken.objects.filter(user=user)
-        count = 0
+        if groups:
+            users.update(User.objects.filter(groups__name__in=groups).values_list("pk", "username"))
 
-        for token in tokens:
-            # Check if not already blacklisted
-            _, created = BlacklistedToken.objects.get_or_create(token=token)
-            if created:
-                count += 1
+        if not users:
+            return
 
-        if count > 0:
-            self.stdout.write(self.style.SUCCESS(f'Successfully revoked {count} token(s) for user "{username}"'))
-        else:
-            self.stdout.write(self.style.WARNING(f'No active tokens found for user "{username}"'))
+        # Get every outstanding token of these users that isn't blacklisted yet in one query
+        tokens = list(OutstandingToken.objects.filter(user_id__in=users, blacklistedtoken__isnull=True).values_list("pk", "user_id"))
+
+        with transaction.atomic():
+            BlacklistedToken.objects.bulk_create(
+                (BlacklistedToken(token_id=token_id) for token_id, _user_id in tokens),
+                batch_size=options["batch_size"],
+                ignore_conflicts=True,
+            )
+
+        # access tokens are not blacklisted, reject the ones already issued within TOKEN_REVOCATION_REFRESH_SECONDS
+        token_revocations.revoke(users)
+
+        counts = Counter(user_id for _token_id, user_id in tokens)
+        for user_id, username in sorted(users.items(), key=lambda item: item[1]):
+            count = counts[user_id]
+            if count > 0:
+                self.stdout.write(self.style.SUCCESS(f'Successfully revoked {count} token(s) for user "{username}"'))
+            else:
+                self.stdout.write(self.style.WARNING(f'No active tokens found for user "{username}"'))
@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.db.models.functions import TruncDate
+
+from validatorApi.constants import ROLLUP_API_CALL_DAILY
+from validatorApi.models import APICallDailyRollup, APICallLog, RollupCheckpoint
+
+
+class Command(BaseCommand):
+    help = "Fold API call logs added since the last run into the per-user daily rollup"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=10000, help="Log ids aggregated per transaction")
+
+    def handle(self, *args, **options):
+        checkpoint, _ = RollupCheckpoint.objects.get_or_create(name=ROLLUP_API_CALL_DAILY)
+        last_id = checkpoint.last_id
+        max_id = APICallLog.objects.aggregate(max_id=Max("id"))["max_id"] or 0
+        processed = 0
+
+        while last_id < max_id:
+            upper_id = min(last_id + options["chunk_size"], max_id)
+
+            # the counts and the checkpoint move together, an interrupted run never counts a row twice
+            with transaction.atomic():
+                counts = (
+                    APICallLog.objects.filter(id__gt=last_id, id__lte=upper_id)
+                    .annotate(date=TruncDate("timestamp"))
+                    .values("user_id", "date")
+                    .annotate(valid=Count("id", filter=Q(is_valid=True)), invalid=Count("id", filter=Q(is_valid=False)))
+                    .order_by()
+                )
+                processed += self._merge(counts)
+                RollupCheckpoint.objects.filter(pk=checkpoint.pk).update(last_id=upper_id)
+
+            last_id = upper_id
+
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {processed} API call log(s), checkpoint at id {last_id}"))
+
+    def _merge(self, counts):
+        counts = {(row["user_id"], row["date"]): row for row in counts}
+        if not counts:
+            return 0
+
+        user_ids = {user_id for user_id, _date in counts if user_id is not None}
+        dates = {date for _user_id, date in counts}
+        rollups = APICallDailyRollup.objects.filter(Q(user_id__in=user_ids) | Q(user__isnull=True), date__in=dates)
+        existing = {(rollup.user_id, rollup.date): rollup for rollup in rollups}
+
+        changed = []
+        created = []
+        for key, row in counts.items():
+            rollup = existing.get(key)
+            if rollup is None:
+                created.append(APICallDailyRollup(user_id=key[0], date=key[1], valid_count=row["valid"], invalid_count=row["invalid"]))
+            else:
+                rollup.valid_count += row["valid"]
+                rollup.invalid_count += row["invalid"]
+                changed.append(rollup)
+
+        APICallDailyRollup.objects.bulk_update(changed, ["valid_count", "invalid_count"])
+        APICallDailyRollup.objects.bulk_create(created)
+
+        return sum(row["valid"] + row["invalid"] for row in counts.values())
@@ -0,0 +1,136 @@
+import csv
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import translation
+
+from validatorApi.id_validator import NationalIDValidator
+
+FORMATS_BY_SUFFIX = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+_validator = None
+
+
+def _init_worker():
+    # spawn / forkserver workers start from a fresh interpreter
+    if not apps.ready:
+        django.setup()
+
+
+def _validate_chunk(national_ids, language):
+    global _validator
+    if _validator is None:
+        _validator = NationalIDValidator()
+
+    valid = 0
+    lines = []
+
+    with translation.override(language):
+        for result in _validator.decode_many(national_ids):
+            valid += result.is_valid
+            lines.append(json.dumps(result.localize(), cls=DjangoJSONEncoder, ensure_ascii=False))
+
+    return "\n".join(lines) + "\n", valid, len(national_ids) - valid
+
+
+class Command(BaseCommand):
+    help = "Validate a CSV / JSONL / plain text file of national IDs and stream the results to a JSONL file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", type=str, help="File with national IDs")
+        parser.add_argument("output", type=str, help="JSONL file to write results to")
+        parser.add_argument("--format", choices=["auto", "csv", "jsonl", "txt"], default="auto", help="Input format (default: detect from file extension)")
+        parser.add_argument("--column", type=str, default="national_id", help="CSV column / JSONL key holding the national ID")
+        parser.add_argument("--chunk-size", type=int, default=10000, help="National IDs sent to a worker at once")
+        parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (1 runs in this process)")
+        parser.add_argument("--language", type=str, default=settings.LANGUAGE_CODE, help="Language for error messages and labels")
+
+    def handle(self, *args, **options):
+        input_path = Path(options["input"])
+        if not input_path.is_file():
+            raise CommandError(f'Input file "{input_path}" does not exist')
+
+        file_format = options["format"]
+        if file_format == "auto":
+            file_format = FORMATS_BY_SUFFIX.get(input_path.suffix.lower(), "txt")
+
+        self.column = options["column"]
+        self.skipped = 0
+        total = valid = invalid = 0
+        start = time.perf_counter()
+
+        with open(input_path, "r", encoding="utf-8-sig", newline="") as source, open(options["output"], "w", encoding="utf-8") as target:
+            national_ids = getattr(self, f"_read_{file_format}")(source)
+            chunks = self._chunked(national_ids, options["chunk_size"])
+
+            for lines, chunk_valid, chunk_invalid in self._validate_chunks(chunks, options["workers"], options["language"]):
+                target.write(lines)
+                valid += chunk_valid
+                invalid += chunk_invalid
+                total += chunk_valid + chunk_invalid
+
+        elapsed = time.perf_counter() - start
+        rate = total / elapsed if elapsed else 0
+
+        self.stdout.write(self.style.SUCCESS(f"Validated {total} national ID(s) in {elapsed:.2f}s ({rate:,.0f} IDs/s)"))
+        self.stdout.write(f"Valid: {valid}, Invalid: {invalid}, Skipped rows: {self.skipped}")
+
+    def _read_txt(self, source):
+        for line in source:
+            line = line.strip()
+            if line:
+                yield line
+
+    def _read_csv(self, source):
+        reader = csv.DictReader(source)
+        if reader.fieldnames is None or self.column not in reader.fieldnames:
+            raise CommandError(f'Column "{self.column}" not found in CSV header')
+
+        for row in reader:
+            national_id = row.get(self.column)
+            if national_id:
+                yield national_id
+            else:
+                self.skipped += 1
+
+    def _read_jsonl(self, source):
+        for line in source:
+            if not line.strip():
+                continue
+            try:
+                national_id = json.loads(line)[self.column]
+            except (ValueError, KeyError, TypeError):
+                self.skipped += 1
+                continue
+            yield national_id
+
+    def _chunked(self, national_ids, chunk_size):
+        while chunk := list(islice(national_ids, chunk_size)):
+            yield chunk
+
+    def _validate_chunks(self, chunks, workers, language):
+        if workers <= 1:
+            for chunk in chunks:
+                yield _validate_chunk(chunk, language)
+            return
+
+        # keep a bounded number of chunks in flight so memory stays flat on any input size
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_validate_chunk, chunk, language))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
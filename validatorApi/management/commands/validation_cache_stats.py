@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from validatorApi.result_cache import validation_cache
+
+
+class Command(BaseCommand):
+    help = "Show hit / miss counters of the local and shared validation cache tiers and of cached response bodies"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Reset the counters after printing them")
+
+    def handle(self, *args, **options):
+        stats = validation_cache.stats.read()
+
+        for counter, label in (("local", "Local tier"), ("shared", "Shared tier"), ("response", "Response bodies")):
+            hits = stats[f"{counter}_hits"]
+            misses = stats[f"{counter}_misses"]
+            lookups = hits + misses
+            ratio = hits / lookups * 100 if lookups else 0
+            self.stdout.write(f"{label}: {hits} hit(s), {misses} miss(es), hit ratio {ratio:.1f}%")
+
+        self.stdout.write(f"Write-behind: {stats['writes_flushed']} write(s) flushed, {stats['writes_dropped']} dropped")
+
+        if options["reset"]:
+            validation_cache.stats.reset()
+            self.stdout.write(self.style.SUCCESS("Successfully reset validation cache counters"))
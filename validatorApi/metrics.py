@@ -0,0 +1,85 @@
+import atexit
+import os
+import threading
+import time
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+
+
+class SharedCounters:
+    """
+    Counters kept per process and pushed to the shared cache every ``STATS_FLUSH_INTERVAL`` seconds.
+
+    Request paths only bump a local dict, a background thread sends the totals as one pipeline of
+    INCRBYs. Management commands read the cluster wide totals back with ``read``.
+    """
+
+    def __init__(self, key_format, names):
+        self.key_format = key_format
+        self.names = names
+        self._counts = dict.fromkeys(names, 0)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._client = None
+        self._pid = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            # the Redis backend stores integers as is, so ``read`` gets the INCRBY totals back through the cache
+            self._client = redis.Redis.from_url(settings.CACHES["default"]["LOCATION"])
+        return self._client
+
+    def _key(self, name):
+        return self.key_format.format(counter=name)
+
+    def _ensure_process(self):
+        # gunicorn forks workers after preload, the flush thread must belong to this process
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._counts = dict.fromkeys(self.names, 0)
+                    threading.Thread(target=self._run, name="shared_counters", daemon=True).start()
+                    atexit.register(self.flush)
+                    self._pid = os.getpid()
+
+    def add(self, name, amount=1):
+        self._ensure_process()
+        with self._lock:
+            self._counts[name] += amount
+
+    def flush(self):
+        # one flush at a time, a caller must not return while another flush is still sending its counts
+        with self._flush_lock:
+            with self._lock:
+                counts, self._counts = self._counts, dict.fromkeys(self.names, 0)
+
+            counts = {name: amount for name, amount in counts.items() if amount}
+            if not counts:
+                return
+
+            pipe = self.client.pipeline(transaction=False)
+            for name, amount in counts.items():
+                pipe.incrby(cache.make_key(self._key(name)), amount)
+            try:
+                pipe.execute()
+            except redis.RedisError as e:
+                print(f"Error flushing counters: {e}")
+                with self._lock:
+                    for name, amount in counts.items():
+                        self._counts[name] += amount
+
+    def _run(self):
+        while True:
+            time.sleep(settings.STATS_FLUSH_INTERVAL)
+            self.flush()
+
+    def read(self):
+        keys = {self._key(name): name for name in self.names}
+        values = cache.get_many(keys)
+        return {name: values.get(key, 0) for key, name in keys.items()}
+
+    def reset(self):
+        cache.delete_many([self._key(name) for name in self.names])
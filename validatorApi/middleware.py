@@ -0,0 +1,41 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils import translation
+from django.utils.cache import patch_vary_headers
+
+
+class AcceptLanguageMiddleware:
+    """
+    ``LocaleMiddleware`` for the API chain: picks the language the same way, minus the language
+    prefixed URLs and redirects the API never uses. Sync and async, so ASGI requests skip the
+    thread hop a ``MiddlewareMixin`` costs.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        language = self._activate(request)
+        return self._finish(self.get_response(request), language)
+
+    async def __acall__(self, request):
+        language = self._activate(request)
+        return self._finish(await self.get_response(request), language)
+
+    def _activate(self, request):
+        language = translation.get_language_from_request(request)
+        translation.activate(language)
+        request.LANGUAGE_CODE = translation.get_language()
+        return request.LANGUAGE_CODE
+
+    def _finish(self, response, language):
+        patch_vary_headers(response, ("Accept-Language",))
+        response.headers.setdefault("Content-Language", language)
+        return response
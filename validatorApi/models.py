@@ -1,5 +1,6 @@
 from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -10,7 +11,7 @@ class APICallLog(models.Model):
     is_valid = models.BooleanField()
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)
 
     class Meta:
         verbose_name = "API Call Log"
@@ -24,3 +25,65 @@ class APICallLog(models.Model):
     def __str__(self):
         username = self.user.username if self.user else "Anonymous"
         return f"{username} - {self.national_id} - {self.timestamp}"
+
+
+class APICallDailyRollup(models.Model):
+
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name="api_call_rollups")
+    date = models.DateField()
+    valid_count = models.PositiveIntegerField(default=0)
+    invalid_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "API Call Daily Rollup"
+        verbose_name_plural = "API Call Daily Rollups"
+        ordering = ["-date"]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "date"], name="unique_api_call_rollup_user_date"),
+        ]
+        indexes = [
+            models.Index(fields=["-date"]),
+        ]
+
+    @property
+    def total_count(self):
+        return self.valid_count + self.invalid_count
+
+    def __str__(self):
+        username = self.user.username if self.user else "Anonymous"
+        return f"{username} - {self.date} - {self.total_count}"
+
+
+class RollupCheckpoint(models.Model):
+    """Highest id already processed by an incremental job ( rollups, cleanups ), one row per job."""
+
+    name = models.CharField(max_length=100, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} - {self.last_id}"
+
+
+class APIUsageDaily(models.Model):
+    """Per-user daily call counts copied from the Redis usage counters, cache hits included."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="api_usage")
+    date = models.DateField()
+    valid_count = models.PositiveIntegerField(default=0)
+    invalid_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "API Usage"
+        verbose_name_plural = "API Usage"
+        ordering = ["-date"]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "date"], name="unique_api_usage_user_date"),
+        ]
+
+    @property
+    def total_count(self):
+        return self.valid_count + self.invalid_count
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date} - {self.total_count}"
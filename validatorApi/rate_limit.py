@@ -0,0 +1,192 @@
+import threading
+import time
+
+import redis
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+from .async_redis import get_async_client
+from .constants import get_rate_limit_key
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Sliding window counter per window: the previous bucket is weighted by how much of it still
+# overlaps the window ending now. Every window is checked first and only incremented when all
+# allow the request, so a denied request never uses up quota.
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local windows = (#ARGV - 2) / 2
+local keys = {}
+local retry_after = 0
+
+for i = 1, windows do
+    local window = tonumber(ARGV[1 + i * 2])
+    local limit = tonumber(ARGV[2 + i * 2])
+    local bucket = math.floor(now / window)
+    local elapsed = now - bucket * window
+    local current_key = KEYS[1] .. ":" .. window .. ":" .. bucket
+    local current = tonumber(redis.call("GET", current_key) or "0")
+    local previous = tonumber(redis.call("GET", KEYS[1] .. ":" .. window .. ":" .. (bucket - 1)) or "0")
+
+    local wait = 0
+    if current + cost > limit then
+        local target = (limit - cost) / math.max(current, 1)
+        wait = (window - elapsed) + window * math.max(1 - target, 0)
+    elseif previous * (1 - elapsed / window) + current + cost > limit then
+        wait = window * (1 - (limit - cost - current) / previous) - elapsed
+    end
+
+    retry_after = math.max(retry_after, wait)
+    keys[i] = {current_key, window}
+end
+
+if retry_after > 0 then
+    return {0, tostring(retry_after)}
+end
+
+for i = 1, windows do
+    redis.call("INCRBY", keys[i][1], cost)
+    redis.call("EXPIRE", keys[i][1], keys[i][2] * 2)
+end
+
+return {1, "0"}
+"""
+
+
+def parse_rate(rate):
+    """``"300/s"`` -> ``(1, 300)``, periods are s, m, h or d with an optional count ( ``"10/5m"`` )."""
+    count, period = rate.split("/")
+    multiplier = int(period[:-1]) if len(period) > 1 else 1
+    return PERIODS[period[-1]] * multiplier, int(count)
+
+
+class LocalSlidingWindow:
+    """In-process version of ``SLIDING_WINDOW_SCRIPT``, limits apply per worker."""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._next_prune = 0
+
+    def hit(self, key, windows, now, cost=1):
+        with self._lock:
+            if now >= self._next_prune:
+                self._prune(now)
+
+            retry_after = 0
+            buckets = []
+            for window, limit in windows:
+                bucket = int(now // window)
+                elapsed = now - bucket * window
+                current = self._counts.get((key, window, bucket), 0)
+                previous = self._counts.get((key, window, bucket - 1), 0)
+
+                if current + cost > limit:
+                    wait = (window - elapsed) + window * max(1 - (limit - cost) / max(current, 1), 0)
+                elif previous * (1 - elapsed / window) + current + cost > limit:
+                    wait = window * (1 - (limit - cost - current) / previous) - elapsed
+                else:
+                    wait = 0
+
+                retry_after = max(retry_after, wait)
+                buckets.append((key, window, bucket))
+
+            if retry_after > 0:
+                return False, retry_after
+
+            for bucket in buckets:
+                self._counts[bucket] = self._counts.get(bucket, 0) + cost
+            return True, 0
+
+    def _prune(self, now):
+        self._counts = {(key, window, bucket): count for (key, window, bucket), count in self._counts.items() if bucket >= now // window - 1}
+        self._next_prune = now + 60
+
+
+class MultiWindowRateLimiter:
+    """
+    Checks and updates every window of a key in one atomic Lua call ( one Redis round-trip ).
+
+    When Redis is unreachable the limiter falls back to ``LocalSlidingWindow`` for
+    ``RATE_LIMIT_FALLBACK_SECONDS`` before trying Redis again, so an outage costs one timeout
+    per worker instead of one per request.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._script = None
+        self._local = LocalSlidingWindow()
+        self._fallback_until = 0
+
+    @property
+    def script(self):
+        if self._script is None:
+            self._client = redis.Redis.from_url(settings.RATE_LIMIT_URL, socket_timeout=settings.RATE_LIMIT_SOCKET_TIMEOUT)
+            self._script = self._client.register_script(SLIDING_WINDOW_SCRIPT)
+        return self._script
+
+    def hit(self, key, rates, cost=1):
+        """Count one request against ``rates``, return ``(allowed, retry_after_seconds)``."""
+        windows = [parse_rate(rate) for rate in rates]
+        now = time.time()
+
+        if self._use_redis(now):
+            try:
+                allowed, retry_after = self.script(keys=[key], args=self._script_args(windows, now, cost))
+                return bool(allowed), float(retry_after)
+            except redis.RedisError as e:
+                self._fall_back(e, now)
+
+        return self._local.hit(key, windows, now, cost)
+
+    async def ahit(self, key, rates, cost=1):
+        """``hit`` for async views, the Lua call is awaited on the running event loop."""
+        windows = [parse_rate(rate) for rate in rates]
+        now = time.time()
+
+        if self._use_redis(now):
+            client = get_async_client(settings.RATE_LIMIT_URL, socket_timeout=settings.RATE_LIMIT_SOCKET_TIMEOUT)
+            try:
+                allowed, retry_after = await client.register_script(SLIDING_WINDOW_SCRIPT)(keys=[key], args=self._script_args(windows, now, cost))
+                return bool(allowed), float(retry_after)
+            except redis.RedisError as e:
+                self._fall_back(e, now)
+
+        return self._local.hit(key, windows, now, cost)
+
+    def _use_redis(self, now):
+        return settings.RATE_LIMIT_URL and now >= self._fallback_until
+
+    def _script_args(self, windows, now, cost):
+        args = [now, cost]
+        for window, limit in windows:
+            args += [window, limit]
+        return args
+
+    def _fall_back(self, error, now):
+        print(f"Rate limiter falling back to local counters: {error}")
+        self._fallback_until = now + settings.RATE_LIMIT_FALLBACK_SECONDS
+
+
+rate_limiter = MultiWindowRateLimiter()
+
+
+class MultiWindowRateThrottle(BaseThrottle):
+    """
+    DRF throttle over every rate in ``VALIDATION_RATE_LIMITS`` per user and view, DRF answers
+    denied requests with 429 and a ``Retry-After`` header from ``wait``.
+
+    Views counting against another view's quota set ``rate_limit_scope`` to its name, views charging
+    more than one hit per request define ``get_rate_limit_cost(request)``.
+    """
+
+    def allow_request(self, request, view):
+        ident = request.user.pk if request.user.is_authenticated else self.get_ident(request)
+        key = get_rate_limit_key(getattr(view, "rate_limit_scope", view.__class__.__name__), ident)
+        cost = view.get_rate_limit_cost(request) if hasattr(view, "get_rate_limit_cost") else 1
+        allowed, self.retry_after = rate_limiter.hit(key, settings.VALIDATION_RATE_LIMITS, cost)
+        return allowed
+
+    def wait(self):
+        return self.retry_after
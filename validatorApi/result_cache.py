@@ -0,0 +1,348 @@
+import math
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from time import monotonic
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache_writer import WriteBehindCacheWriter
+from .constants import (
+    CACHE_KEY_VALIDATION_CACHE_STATS,
+    CACHE_STATS_COUNTERS,
+    VALIDATION_CACHE_TIMEOUT,
+    VALIDATION_RESPONSE_CACHE_TIMEOUT,
+    get_prefix_cache_id,
+    get_response_cache_id,
+    get_validation_cache_key,
+)
+from .id_validator import TodaySnapshot, id_prefix, prefix_facts
+from .metrics import SharedCounters
+
+INVALIDATE_ALL = "*"
+
+
+class LocalLRUCache:
+    """Bounded LRU with a per entry TTL, lives inside one worker process."""
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at <= monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        """Keep ``value`` for ``timeout`` seconds, at most the cache's own timeout."""
+        if self.max_size <= 0:
+            return
+
+        timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        with self._lock:
+            self._entries[key] = (value, monotonic() + timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class ValidationResultCache:
+    """
+    Validation results cached in two tiers: a per-process LRU in front of the shared django cache ( Redis ).
+    Results are ``NationalIDResult.to_facts()``, nothing in them changes with the date so shared
+    entries live for ``VALIDATION_CACHE_TIMEOUT``. Next to each result the rendered JSON response
+    can be kept per language, see ``get_response``.
+
+    Writes to the shared tier go through a ``WriteBehindCacheWriter`` so request threads never
+    block on Redis. Deletes are published on a Redis channel so every worker drops its local copy
+    and pending writes, the local TTL bounds staleness if a message is ever missed. Hit / miss
+    counters are pushed to the shared cache every few seconds so ``validation_cache_stats`` can
+    report them for the whole cluster.
+    """
+
+    def __init__(self):
+        self._pid = None
+        self._local = None
+        self._lock = threading.Lock()
+        self._listener = None
+        self._publisher = None
+        self._sender = None
+        self._writer = None
+        self.stats = SharedCounters(CACHE_KEY_VALIDATION_CACHE_STATS, CACHE_STATS_COUNTERS)
+        self.today = TodaySnapshot()
+
+    @property
+    def local(self):
+        self._ensure_process()
+        return self._local
+
+    @property
+    def writer(self):
+        self._ensure_process()
+        return self._writer
+
+    def _ensure_process(self):
+        # gunicorn forks workers after preload, local entries and the writer / listener threads must belong to this process
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._local = LocalLRUCache(settings.VALIDATION_LOCAL_CACHE_SIZE, settings.VALIDATION_LOCAL_CACHE_TIMEOUT)
+                    self._publisher = None
+                    self._sender = uuid.uuid4().hex
+                    self._writer = WriteBehindCacheWriter(
+                        capacity=settings.VALIDATION_CACHE_WRITER_CAPACITY,
+                        batch_size=settings.VALIDATION_CACHE_WRITER_BATCH_SIZE,
+                        flush_interval=settings.VALIDATION_CACHE_WRITER_FLUSH_INTERVAL,
+                        drop_policy=settings.VALIDATION_CACHE_WRITER_DROP_POLICY,
+                        on_stats=self.stats.add,
+                    )
+                    self._writer.start()
+                    self._start_listener()
+                    self._pid = os.getpid()
+
+    def _start_listener(self):
+        self._listener = None
+        url = settings.VALIDATION_CACHE_INVALIDATION_URL
+        if not url:
+            return
+
+        try:
+            pubsub = redis.Redis.from_url(url).pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{settings.VALIDATION_CACHE_INVALIDATION_CHANNEL: self._on_invalidation})
+            self._listener = pubsub.run_in_thread(sleep_time=1, daemon=True, exception_handler=self._on_listener_error)
+        except redis.RedisError as e:
+            print(f"Validation cache invalidation listener disabled: {e}")
+
+    def _cache_ids(self, national_id):
+        return [self._facts_id(national_id)] + [get_response_cache_id(national_id, language) for language, _name in settings.LANGUAGES]
+
+    def _on_invalidation(self, message):
+        sender, _, national_id = message["data"].decode().partition(" ")
+        # this worker already dropped its own copies, a late echo would drop entries set since
+        if sender == self._sender:
+            return
+
+        if national_id == INVALIDATE_ALL:
+            self._local.clear()
+            self._writer.clear()
+        else:
+            cache_ids = self._cache_ids(national_id)
+            for cache_id in cache_ids:
+                self._local.delete(cache_id)
+            self._writer.discard([get_validation_cache_key(cache_id) for cache_id in cache_ids])
+
+    def _on_listener_error(self, error, pubsub, thread):
+        # messages may have been lost while disconnected
+        self._local.clear()
+        time.sleep(1)
+
+    def _publish(self, payload):
+        url = settings.VALIDATION_CACHE_INVALIDATION_URL
+        if not url:
+            return
+
+        try:
+            if self._publisher is None:
+                self._publisher = redis.Redis.from_url(url)
+            self._publisher.publish(settings.VALIDATION_CACHE_INVALIDATION_CHANNEL, f"{self._sender} {payload}")
+        except redis.RedisError as e:
+            print(f"Error publishing validation cache invalidation: {e}")
+
+    def _facts_id(self, national_id):
+        # prefix mode: IDs with the same first digits share one entry, NationalIDValidator.derive adds the rest
+        prefix = id_prefix(national_id) if settings.VALIDATION_CACHE_BY_PREFIX else None
+        return national_id if prefix is None else get_prefix_cache_id(prefix)
+
+    def _facts_value(self, facts):
+        return prefix_facts(facts) if settings.VALIDATION_CACHE_BY_PREFIX else facts
+
+    def _get(self, cache_id, counted=True):
+        # counted lookups bump the tier counters, response bodies are counted apart by their callers
+        local = self.local
+
+        result = local.get(cache_id)
+        if result is not None:
+            if counted:
+                self.stats.add("local_hits")
+            return result
+        if counted:
+            self.stats.add("local_misses")
+
+        result = cache.get(get_validation_cache_key(cache_id))
+        if result is None:
+            if counted:
+                self.stats.add("shared_misses")
+            return None
+
+        if counted:
+            self.stats.add("shared_hits")
+        local.set(cache_id, result)
+        return result
+
+    async def _aget(self, cache_id, counted=True):
+        local = self.local
+
+        result = local.get(cache_id)
+        if result is not None:
+            if counted:
+                self.stats.add("local_hits")
+            return result
+        if counted:
+            self.stats.add("local_misses")
+
+        result = await cache.aget(get_validation_cache_key(cache_id))
+        if result is None:
+            if counted:
+                self.stats.add("shared_misses")
+            return None
+
+        if counted:
+            self.stats.add("shared_hits")
+        local.set(cache_id, result)
+        return result
+
+    def get(self, national_id):
+        """
+        Cached facts for ``national_id``, or ``None``. In prefix mode they may belong to another ID
+        with the same prefix, pass ``national_id`` to ``NationalIDValidator.derive``.
+        """
+        return self._get(self._facts_id(national_id))
+
+    async def aget(self, national_id):
+        """``get`` for async views, the shared tier is read with ``cache.aget``."""
+        return await self._aget(self._facts_id(national_id))
+
+    def get_many(self, national_ids):
+        local = self.local
+        facts_ids = {national_id: self._facts_id(national_id) for national_id in national_ids}
+        found = {}
+        missing = []
+
+        for facts_id in dict.fromkeys(facts_ids.values()):
+            result = local.get(facts_id)
+            if result is None:
+                missing.append(facts_id)
+            else:
+                found[facts_id] = result
+
+        self.stats.add("local_hits", len(found))
+        self.stats.add("local_misses", len(missing))
+
+        if missing:
+            cache_keys = {get_validation_cache_key(facts_id): facts_id for facts_id in missing}
+            shared = cache.get_many(cache_keys)
+            for cache_key, result in shared.items():
+                facts_id = cache_keys[cache_key]
+                local.set(facts_id, result)
+                found[facts_id] = result
+
+            self.stats.add("shared_hits", len(shared))
+            self.stats.add("shared_misses", len(missing) - len(shared))
+
+        return {national_id: found[facts_id] for national_id, facts_id in facts_ids.items() if facts_id in found}
+
+    def _write_shared(self, data, timeout=VALIDATION_CACHE_TIMEOUT):
+        # just for run  tests, reads right after the response must see the write
+        if settings.TESTING:
+            cache.set_many(data, timeout=timeout)
+        else:
+            self.writer.set_many(data, timeout=timeout)
+
+    def _set(self, cache_id, value, timeout):
+        self.local.set(cache_id, value, timeout)
+        self._write_shared({get_validation_cache_key(cache_id): value}, timeout)
+
+    async def _aset(self, cache_id, value, timeout):
+        # only the synchronous test mode write goes out through cache.aset
+        self.local.set(cache_id, value, timeout)
+        if settings.TESTING:
+            await cache.aset(get_validation_cache_key(cache_id), value, timeout=timeout)
+        else:
+            self.writer.set(get_validation_cache_key(cache_id), value, timeout=timeout)
+
+    def set(self, national_id, facts):
+        self._set(self._facts_id(national_id), self._facts_value(facts), VALIDATION_CACHE_TIMEOUT)
+
+    async def aset(self, national_id, facts):
+        """``set`` for async views."""
+        await self._aset(self._facts_id(national_id), self._facts_value(facts), VALIDATION_CACHE_TIMEOUT)
+
+    def set_many(self, results):
+        local = self.local
+        data = {self._facts_id(national_id): self._facts_value(facts) for national_id, facts in results.items()}
+        for facts_id, value in data.items():
+            local.set(facts_id, value)
+        self._write_shared({get_validation_cache_key(facts_id): value for facts_id, value in data.items()})
+
+    def flush_writes(self):
+        """Write pending shared tier writes from the calling thread."""
+        self.writer.flush()
+
+    def get_response(self, national_id, language):
+        """``(is_valid, body)`` of the response rendered for ``language``, or ``None``."""
+        return self._count_response(self._get(get_response_cache_id(national_id, language), counted=False))
+
+    def _count_response(self, response):
+        self.stats.add("response_misses" if response is None else "response_hits")
+        return response
+
+    def _response_timeout(self):
+        # bodies hold the age and the future date check, both change at midnight
+        return min(VALIDATION_RESPONSE_CACHE_TIMEOUT, math.ceil(self.today.seconds_left()))
+
+    def set_response(self, national_id, language, is_valid, body):
+        self._set(get_response_cache_id(national_id, language), (is_valid, body), self._response_timeout())
+
+    async def aget_response(self, national_id, language):
+        return self._count_response(await self._aget(get_response_cache_id(national_id, language), counted=False))
+
+    async def aset_response(self, national_id, language, is_valid, body):
+        await self._aset(get_response_cache_id(national_id, language), (is_valid, body), self._response_timeout())
+
+    def delete(self, national_id):
+        cache_ids = self._cache_ids(national_id)
+        cache_keys = [get_validation_cache_key(cache_id) for cache_id in cache_ids]
+        for cache_id in cache_ids:
+            self.local.delete(cache_id)
+        self.writer.discard(cache_keys)
+
+        deleted = cache.delete(cache_keys[0])
+        cache.delete_many(cache_keys[1:])
+        self._publish(national_id)
+        return deleted
+
+    def clear(self):
+        self.local.clear()
+        self.writer.clear()
+        cache.clear()
+        self._publish(INVALIDATE_ALL)
+
+
+validation_cache = ValidationResultCache()
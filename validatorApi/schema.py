@@ -0,0 +1,7 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """Bearer scheme of ``JWTAuthentication`` for ``CachedJWTAuthentication``, drf-spectacular only matches the exact class."""
+
+    target_class = "validatorApi.authentication.CachedJWTAuthentication"
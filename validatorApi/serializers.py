@@ -1,5 +1,10 @@
+import json
+
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
 
 
 class NationalIDSerializer(serializers.Serializer):
@@ -18,6 +23,24 @@ class NationalIDSerializer(serializers.Serializer):
         return value
 
 
+class NationalIDBatchSerializer(serializers.Serializer):
+
+    national_ids = serializers.ListField(
+        child=serializers.CharField(max_length=14, min_length=14),
+        allow_empty=False,
+        help_text=_("List of 14-digit Egyptian National ID numbers"),
+    )
+
+    def validate_national_ids(self, value):
+        if len(value) > settings.VALIDATION_BATCH_MAX_SIZE:
+            raise serializers.ValidationError(_("Ensure this field has no more than %(limit)s elements.") % {"limit": settings.VALIDATION_BATCH_MAX_SIZE})
+
+        value = [str(national_id).strip() for national_id in value]
+        if not all(national_id.isdigit() for national_id in value):
+            raise serializers.ValidationError(_("National ID must contain only digits"))
+        return value
+
+
 class GovernorateSerializer(serializers.Serializer):
 
     code = serializers.CharField()
@@ -46,3 +69,66 @@ class NationalIDResponseSerializer(serializers.Serializer):
     generation = GenerationSerializer(required=False)
     serial_number = serializers.CharField(required=False)
     errors = serializers.ListField(child=serializers.CharField(), required=False, allow_null=True)
+
+
+# NationalIDResponseSerializer's fields in order with their to_representation, for render_validation_result
+RESPONSE_FIELDS = (
+    ("national_id", str),
+    ("is_valid", bool),
+    ("birth_date", str),
+    ("birth_year", int),
+    ("birth_month", int),
+    ("birth_day", int),
+    ("age", int),
+    ("century", str),
+    ("governorate", lambda governorate: {"code": str(governorate["code"]), "name_english": str(governorate["name_english"]), "name_arabic": str(governorate["name_arabic"])}),
+    ("gender", str),
+    ("generation", lambda generation: {"name": str(generation["name"]), "year_range": str(generation["year_range"])}),
+    ("serial_number", str),
+    ("errors", lambda errors: [str(error) for error in errors]),
+)
+
+# fields with allow_null, the serializer renders them as null when the result has no such key
+RESPONSE_NULL_FIELDS = {"errors"}
+
+
+def render_validation_result(result):
+    """
+    The bytes ``JSONRenderer`` renders for ``NationalIDResponseSerializer(result).data``, without building
+    the serializer. Missing keys are left out or ``null`` and ``None`` stays ``null`` like the serializer does.
+    """
+    data = {}
+    for field, to_representation in RESPONSE_FIELDS:
+        if field in result:
+            value = result[field]
+            data[field] = None if value is None else to_representation(value)
+        elif field in RESPONSE_NULL_FIELDS:
+            data[field] = None
+
+    body = json.dumps(
+        data,
+        ensure_ascii=JSONRenderer.ensure_ascii,
+        allow_nan=not api_settings.STRICT_JSON,
+        separators=(",", ":") if JSONRenderer.compact else (", ", ": "),
+    )
+    return body.replace("\u2028", "\\u2028").replace("\u2029", "\\u2029").encode()
+
+
+class NationalIDBatchResponseSerializer(serializers.Serializer):
+
+    results = NationalIDResponseSerializer(many=True)
+
+
+class UsageCountSerializer(serializers.Serializer):
+
+    total = serializers.IntegerField()
+    valid = serializers.IntegerField()
+    invalid = serializers.IntegerField()
+
+
+class UsageSerializer(serializers.Serializer):
+
+    minute = UsageCountSerializer(help_text=_("Calls in the current minute"))
+    hour = UsageCountSerializer(help_text=_("Calls in the current hour"))
+    day = UsageCountSerializer(help_text=_("Calls today"))
+    total = UsageCountSerializer(help_text=_("All calls"))
@@ -1,19 +1,141 @@
+import asyncio
+import json
+import os
 import random
-from datetime import date, timedelta
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from io import StringIO
+from unittest import mock
 
-from django.contrib.auth.models import User
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import Group, User
 from django.core.cache import cache
-from django.test import TestCase, override_settings
+from django.core.management import CommandError, call_command
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone, translation
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from .constants import get_validation_cache_key
-from .id_validator import NationalIDValidator
-from .models import APICallLog
+from core.handlers import RouteScopedASGIHandler, RouteScopedWSGIHandler
 
+from .authentication import token_revocations, user_cache
+from .cache_writer import WriteBehindCacheWriter
+from .constants import (
+    CACHE_KEY_REVOKED_USERS,
+    VALIDATION_CACHE_TIMEOUT,
+    VALIDATION_RESPONSE_CACHE_TIMEOUT,
+    get_auth_user_key,
+    get_prefix_cache_id,
+    get_response_cache_id,
+    get_usage_key,
+    get_validation_cache_key,
+)
+from .id_validator import (
+    FUTURE_BIRTH_DATE,
+    MESSAGES,
+    MessageTable,
+    NationalIDResult,
+    NationalIDValidator,
+    localize_errors,
+    localize_result,
+    prefix_facts,
+)
+from .log_sink import APICallLogSink
+from .log_stream import get_stream_client
+from .metrics import SharedCounters
+from .rate_limit import LocalSlidingWindow, MultiWindowRateLimiter, parse_rate, rate_limiter
+from .models import APICallDailyRollup, APICallLog, APIUsageDaily, RollupCheckpoint
+from .result_cache import LocalLRUCache, validation_cache
+from .serializers import NationalIDResponseSerializer, render_validation_result
+from .usage import usage_counters
 
-class EgyptianIDValidatorTestCase(TestCase):
+
+def forget_token_revocations():
+    # revocations have their own Redis database, clearing the validation cache keeps them
+    token_revocations.client.delete(CACHE_KEY_REVOKED_USERS)
+    token_revocations._revoked = {}
+    token_revocations._refresh_at = 0
+
+
+def reset_rate_limiter():
+    # after a Redis error the shared limiter counts in process, user pks are reused across tests
+    rate_limiter._local = LocalSlidingWindow()
+    rate_limiter._fallback_until = 0
+
+
+class IDGeneratorMixin:
+
+    def id_generator(self, century_prefix=None, year=None, month=None, day=None, governorate=None, serial=None, male=True, check_digit=None):
+        today = date.today()
+
+        if century_prefix is None:
+            if year is not None:
+                century_prefix = 2 if int(year) < 2000 else 3
+            else:
+                century_prefix = random.choice([2, 3])
+
+        if year is None:
+            year = random.randint(0, today.year % 100)
+        else:
+            year = int(str(year)[-2:])
+
+        full_year = (1900 if century_prefix == 2 else 2000) + year
+
+        if full_year > today.year:
+            full_year = today.year
+            year = full_year % 100
+
+        if month is None:
+            max_month = today.month if full_year == today.year else 12
+            month = random.randint(1, max_month)
+        else:
+            month = int(month)
+            if full_year == today.year and month > today.month:
+                month = today.month
+
+        if day is None:
+            if month in {1, 3, 5, 7, 8, 10, 12}:
+                max_range = 31
+            elif month == 2:
+                is_leap = (full_year % 4 == 0 and full_year % 100 != 0) or (full_year % 400 == 0)
+                max_range = 29 if is_leap else 28
+            else:
+                max_range = 30
+
+            if full_year == today.year and month == today.month:
+                max_range = min(max_range, today.day)
+
+            day = random.randint(1, max_range)
+        else:
+            day = int(day)
+            if full_year == today.year and month == today.month and day > today.day:
+                day = today.day
+
+        if governorate is None:
+            governorate = random.choice(list(self.validator.governorates.keys()))
+
+        if serial is None:
+            serial = random.randint(0, 999)
+
+        gender = random.choice([1, 3, 5, 7, 9]) if male else random.choice([2, 4, 6, 8])
+
+        if check_digit is None:
+            check_digit = random.randint(0, 9)
+
+        return f"{century_prefix}" f"{year:02d}" f"{month:02d}" f"{day:02d}" f"{int(governorate):02d}" f"{serial:03d}" f"{gender}" f"{check_digit}"
+
+
+class EgyptianIDValidatorTestCase(IDGeneratorMixin, TestCase):
 
     def setUp(self):
         self.validator = NationalIDValidator()
@@ -95,6 +217,21 @@ class EgyptianIDValidatorTestCase(TestCase):
             self.assertEqual(info["generation"]["name"], expected_name)
             self.assertEqual(info["generation"]["year_range"], expected_range)
 
+    def test_generation_table_boundaries(self):
+        self.assertEqual(self.validator._get_generation(1900)["name"], "Greatest Generation")
+        self.assertEqual(self.validator._get_generation(2025)["name"], "Generation Alpha")
+        self.assertEqual(self.validator._get_generation(2039)["name"], "Generation Beta")
+        self.assertEqual(self.validator._get_generation(2040), {"name": "Unknown", "year_range": "N/A"})
+        self.assertEqual(self.validator._get_generation(1899), {"name": "Unknown", "year_range": "N/A"})
+
+    def test_governorate_table(self):
+        for code, info in self.validator.governorates.items():
+            governorate = self.validator._get_governorate(code)
+            self.assertEqual(governorate["code"], code)
+            self.assertEqual(governorate["name_english"], info["english"])
+        self.assertIsNone(self.validator._get_governorate("99"))
+        self.assertIsNone(self.validator._get_governorate("١٤"))
+
     def test_valid_id_male_20th_century(self):
         national_id = "29801011401891"
         result = self.validator.validate(national_id)
@@ -149,74 +286,951 @@ class EgyptianIDValidatorTestCase(TestCase):
         self.assertIsNone(info)
         self.assertIn("cannot be in the future", str(result["errors"]))
 
-    def id_generator(self, century_prefix=None, year=None, month=None, day=None, governorate=None, serial=None, male=True, check_digit=None):
-        today = date.today()
+    def test_random_id(self):
+        generated_ids = [next(self.random_id()) for _ in range(5000)]
+        for national_id in generated_ids:
+            result = self.validator.validate(national_id)
+            self.assertTrue(result["is_valid"])
 
-        if century_prefix is None:
-            if year is not None:
-                century_prefix = 2 if int(year) < 2000 else 3
-            else:
-                century_prefix = random.choice([2, 3])
+    def random_id(self):
+        while True:
+            yield self.id_generator()
 
-        if year is None:
-            year = random.randint(0, today.year % 100)
-        else:
-            year = int(str(year)[-2:])
 
-        full_year = (1900 if century_prefix == 2 else 2000) + year
+class FixedClockTestCase(TestCase):
 
-        if full_year > today.year:
-            full_year = today.year
-            year = full_year % 100
+    def setUp(self):
+        self.now = datetime(2025, 6, 15, 12, 30)
+        self.clock_calls = 0
+        self.validator = NationalIDValidator(clock=self.clock)
 
-        if month is None:
-            max_month = today.month if full_year == today.year else 12
-            month = random.randint(1, max_month)
-        else:
-            month = int(month)
-            if full_year == today.year and month > today.month:
-                month = today.month
+    def clock(self):
+        self.clock_calls += 1
+        return self.now
 
-        if day is None:
-            if month in {1, 3, 5, 7, 8, 10, 12}:
-                max_range = 31
-            elif month == 2:
-                is_leap = (full_year % 4 == 0 and full_year % 100 != 0) or (full_year % 400 == 0)
-                max_range = 29 if is_leap else 28
-            else:
-                max_range = 30
+    def test_today_is_not_in_the_future(self):
+        self.assertTrue(self.validator.validate("32506151401891")["is_valid"])
+        self.assertEqual(self.validator.extract_info("32506151401891")["age"], 0)
 
-            if full_year == today.year and month == today.month:
-                max_range = min(max_range, today.day)
+    def test_tomorrow_is_in_the_future(self):
+        result = self.validator.validate("32506161401891")
+        self.assertFalse(result["is_valid"])
+        self.assertEqual(str(result["errors"][0]), "Birth date cannot be in the future: 2025-06-16")
 
-            day = random.randint(1, max_range)
-        else:
-            day = int(day)
-            if full_year == today.year and month == today.month and day > today.day:
-                day = today.day
+    def test_age_uses_injected_clock(self):
+        self.assertEqual(self.validator.extract_info("29506151401891")["age"], 30)
+        self.assertEqual(self.validator.extract_info("29506161401891")["age"], 29)
 
-        if governorate is None:
-            governorate = random.choice(list(self.validator.governorates.keys()))
+    def test_invalid_date_messages(self):
+        self.assertEqual(str(self.validator.validate("29813011401891")["errors"][0]), "Invalid date of birth: month must be in 1..12")
+        self.assertEqual(str(self.validator.validate("30002301401891")["errors"][0]), "Invalid date of birth: day is out of range for month")
+        self.assertTrue(self.validator.validate("30002291401891")["is_valid"])
+        self.assertFalse(self.validator.validate("20002291401891")["is_valid"])
 
-        if serial is None:
-            serial = random.randint(0, 999)
+    def test_clock_read_once_per_day(self):
+        self.validator.validate_many(["29801011401891"] * 10)
+        for _ in range(10):
+            self.validator.extract_info("29801011401891")
+        self.assertEqual(self.clock_calls, 1)
 
-        gender = random.choice([1, 3, 5, 7, 9]) if male else random.choice([2, 4, 6, 8])
+    def test_facts_outlive_the_day(self):
+        # tomorrow's birth date with a bad century, a bad governorate and neither
+        national_ids = ["32506161401891", "12506161401891", "32506169901891", "12506169901891", "29506161401891"]
+        facts = [self.validator.decode(national_id).to_facts() for national_id in national_ids]
+        self.assertEqual(facts, [result.to_facts() for result in self.validator.decode_many(national_ids)])
+        self.assertEqual([self.validator.derive(entry) for entry in facts], [self.validator.decode(national_id).to_dict() for national_id in national_ids])
 
-        if check_digit is None:
-            check_digit = random.randint(0, 9)
+        for entry in facts:
+            self.assertNotIn("age", entry)
+            self.assertNotIn("is_valid", entry)
+            self.assertNotIn(FUTURE_BIRTH_DATE, [code for code, _params in entry["errors"]])
 
-        return f"{century_prefix}" f"{year:02d}" f"{month:02d}" f"{day:02d}" f"{int(governorate):02d}" f"{serial:03d}" f"{gender}" f"{check_digit}"
+        self.now = datetime(2026, 6, 16, 0, 0, 1)
+        self.validator.today._expires_at = 0
+        derived = [self.validator.derive(entry) for entry in facts]
+        self.assertEqual(derived, [self.validator.decode(national_id).to_dict() for national_id in national_ids])
+        self.assertEqual((derived[0]["is_valid"], derived[0]["age"], derived[0]["gender"]), (True, 1, "male"))
+        self.assertEqual(derived[4]["age"], 31)
 
-    def test_random_id(self):
-        generated_ids = [next(self.random_id()) for _ in range(5000)]
-        for national_id in generated_ids:
-            result = self.validator.validate(national_id)
-            self.assertTrue(result["is_valid"])
+    def test_prefix_facts_serve_every_suffix(self):
+        # valid, born tomorrow and a bad governorate, each with a male and a female suffix
+        for prefix in ("298010114", "325061614", "298010199"):
+            national_ids = [prefix + "01891", prefix + "01881", prefix + "55570"]
+            facts = prefix_facts(self.validator.decode(national_ids[0]).to_facts())
+            self.assertNotIn("serial_number", facts)
+            for national_id in national_ids:
+                self.assertEqual(self.validator.derive(facts, national_id), self.validator.decode(national_id).to_dict())
 
-    def random_id(self):
-        while True:
-            yield self.id_generator()
+    def test_snapshot_refreshes_after_midnight(self):
+        self.now = datetime(2025, 6, 16, 0, 0, 1)
+        self.validator.today._expires_at = 0
+        self.assertTrue(self.validator.validate("32506161401891")["is_valid"])
+
+
+class DecodeTestCase(TestCase):
+
+    def setUp(self):
+        self.validator = NationalIDValidator()
+
+    def test_decode_valid_id(self):
+        decoded = self.validator.decode("29801011401891")
+        self.assertIsInstance(decoded, NationalIDResult)
+        self.assertTrue(decoded.is_valid)
+        self.assertIsNone(decoded.errors)
+        self.assertEqual(decoded.birth_date, "1998-01-01")
+        self.assertEqual(decoded.governorate["name_english"], "Qalyubia")
+        self.assertEqual((decoded.century, decoded.gender), ("century_20", "male"))
+        self.assertEqual(decoded.localize(), self.validator.extract_info("29801011401891"))
+
+    def test_decode_invalid_id(self):
+        decoded = self.validator.decode("29813329901891")
+        self.assertFalse(decoded.is_valid)
+        self.assertEqual(len(decoded.errors), 2)
+        self.assertIsNone(decoded.birth_date)
+        self.assertEqual(decoded.to_dict(), {"national_id": "29813329901891", "is_valid": False, "errors": decoded.errors})
+
+    def test_errors_are_codes_localized_per_language(self):
+        decoded = self.validator.decode("19813329901891")
+        self.assertEqual(decoded.errors, [("century", {"digit": "1"}), ("month_out_of_range", {}), ("governorate", {"code": "99"})])
+
+        self.assertEqual(
+            localize_errors(decoded.errors, "en"),
+            ["Invalid century digit: 1 (must be 2 or 3)", "Invalid date of birth: month must be in 1..12", "Invalid governorate code: 99"],
+        )
+        self.assertEqual(
+            localize_errors(decoded.errors, "ar"),
+            ["رقم القرن غير صالح: 1 (يجب أن يكون 2 أو 3)", "تاريخ ميلاد غير صالح: يجب أن يكون الشهر من 1 إلى 12", "كود المحافظة غير صالح: 99"],
+        )
+
+        self.assertEqual(localize_result(self.validator.decode("123").to_dict(), "ar")["errors"][0], "يجب أن يتكون الرقم القومي من 14 رقمًا بالضبط (تم إدخال 3)")
+        self.assertEqual(localize_result(self.validator.decode("29801011401891").to_dict(), "ar")["century"], "القرن العشرين (1900-1999)")
+
+    def test_message_table_translates_once_per_language(self):
+        table = MessageTable(MESSAGES)
+        with mock.patch("validatorApi.id_validator.translation.override", wraps=translation.override) as override:
+            for _ in range(3):
+                table.get("en")
+                table.get("ar")
+        self.assertEqual(override.call_count, 2)
+        self.assertIsInstance(table.get("ar")["male"], str)
+
+    def test_result_is_slotted(self):
+        decoded = self.validator.decode("29801011401891")
+        self.assertFalse(hasattr(decoded, "__dict__"))
+
+    def test_home_page_uses_decode(self):
+        response = self.client.post("/", {"national_id": "29801011401891"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["result"], self.validator.extract_info("29801011401891"))
+        self.assertContains(response, "1998-01-01")
+        self.assertContains(response, "20th century (1900-1999)")
+
+
+class BulkValidationTestCase(IDGeneratorMixin, TestCase):
+
+    def setUp(self):
+        self.validator = NationalIDValidator()
+        self.national_ids = [
+            "29801011401891",
+            "31501011401891",
+            "19801011401891",
+            "29813321401891",
+            "29802301401891",
+            "29801019901891",
+            "10013329901891",
+            "123456789",
+            "2980101140189A",
+            " 29801011401891 ",
+            "٢٩٨٠١٠١١٤٠١٨٩١",
+            (date.today() + timedelta(days=1)).strftime("3%y%m%d1401891"),
+        ]
+
+    def test_validate_many_matches_validate(self):
+        expected = [self.validator.validate(national_id) for national_id in self.national_ids]
+        self.assertEqual(self.validator.validate_many(self.national_ids), expected)
+
+    def test_extract_info_many_matches_extract_info(self):
+        expected = [self.validator.extract_info(national_id) for national_id in self.national_ids]
+        self.assertEqual(self.validator.extract_info_many(self.national_ids), expected)
+
+    def test_random_ids_match(self):
+        national_ids = ["".join(random.choices("0123456789", k=14)) for _ in range(2000)]
+        national_ids += [self.id_generator() for _ in range(2000)]
+        self.assertEqual(self.validator.validate_many(national_ids), [self.validator.validate(i) for i in national_ids])
+        self.assertEqual(self.validator.extract_info_many(national_ids), [self.validator.extract_info(i) for i in national_ids])
+
+    def test_empty_input(self):
+        self.assertEqual(self.validator.validate_many([]), [])
+        self.assertEqual(self.validator.extract_info_many([]), [])
+
+
+class ValidateFileCommandTestCase(IDGeneratorMixin, TestCase):
+
+    def setUp(self):
+        self.validator = NationalIDValidator()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.output = os.path.join(self.directory.name, "results.jsonl")
+
+    def write_input(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def run_command(self, path, **options):
+        stdout = StringIO()
+        call_command("validate_file", path, self.output, stdout=stdout, **options)
+        with open(self.output, encoding="utf-8") as f:
+            results = [json.loads(line) for line in f]
+        return results, stdout.getvalue()
+
+    def test_plain_text(self):
+        path = self.write_input("ids.txt", "29801011401891\n\n19801011401891\n")
+        results, output = self.run_command(path, workers=1)
+        self.assertEqual([result["is_valid"] for result in results], [True, False])
+        self.assertEqual(results[0]["governorate"]["name_english"], "Qalyubia")
+        self.assertIn("Valid: 1, Invalid: 1, Skipped rows: 0", output)
+
+    def test_csv_column(self):
+        path = self.write_input("ids.csv", "name,nid\na,29801011401891\nb,\nc,30001011401891\n")
+        results, output = self.run_command(path, workers=1, column="nid")
+        self.assertEqual([result["national_id"] for result in results], ["29801011401891", "30001011401891"])
+        self.assertIn("Skipped rows: 1", output)
+
+    def test_csv_missing_column(self):
+        path = self.write_input("ids.csv", "name\na\n")
+        with self.assertRaises(CommandError):
+            self.run_command(path, workers=1)
+
+    def test_jsonl_with_process_pool(self):
+        national_ids = [self.id_generator() for _ in range(50)] + ["123"]
+        lines = [json.dumps({"national_id": national_id}) for national_id in national_ids] + ["not json"]
+        path = self.write_input("ids.jsonl", "\n".join(lines))
+        results, output = self.run_command(path, workers=2, chunk_size=7)
+        self.assertEqual([result["national_id"] for result in results], national_ids)
+        self.assertIn("Valid: 50, Invalid: 1, Skipped rows: 1", output)
+
+
+class LocalLRUCacheTestCase(TestCase):
+
+    def test_evicts_least_recently_used(self):
+        local = LocalLRUCache(max_size=2, timeout=60)
+        local.set("a", 1)
+        local.set("b", 2)
+        local.get("a")
+        local.set("c", 3)
+        self.assertEqual(local.get("a"), 1)
+        self.assertIsNone(local.get("b"))
+        self.assertEqual(len(local), 2)
+
+    def test_expired_entries_are_dropped(self):
+        local = LocalLRUCache(max_size=2, timeout=-1)
+        local.set("a", 1)
+        self.assertIsNone(local.get("a"))
+        self.assertEqual(len(local), 0)
+
+
+class WriteBehindCacheWriterTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.stats = {}
+
+    def count(self, counter, amount):
+        self.stats[counter] = self.stats.get(counter, 0) + amount
+
+    def make_writer(self, **options):
+        options = {"capacity": 3, "batch_size": 2, "flush_interval": 0.01, "on_stats": self.count, **options}
+        return WriteBehindCacheWriter(**options)
+
+    def test_flush_writes_everything(self):
+        writer = self.make_writer()
+        writer.set_many({"a": 1, "b": 2, "c": 3}, timeout=60)
+        writer.flush()
+        self.assertEqual(cache.get_many(["a", "b", "c"]), {"a": 1, "b": 2, "c": 3})
+        self.assertEqual(self.stats, {"writes_flushed": 3})
+
+    def test_pending_writes_are_coalesced(self):
+        writer = self.make_writer()
+        writer.set("a", 1, timeout=60)
+        writer.set("a", 2, timeout=60)
+        self.assertEqual(len(writer), 1)
+        writer.flush()
+        self.assertEqual(cache.get("a"), 2)
+
+    def test_drop_newest(self):
+        writer = self.make_writer()
+        writer.set_many({"a": 1, "b": 2, "c": 3, "d": 4}, timeout=60)
+        writer.flush()
+        self.assertIsNone(cache.get("d"))
+        self.assertEqual(self.stats["writes_dropped"], 1)
+
+    def test_drop_oldest(self):
+        writer = self.make_writer(drop_policy="oldest")
+        writer.set_many({"a": 1, "b": 2, "c": 3, "d": 4}, timeout=60)
+        writer.flush()
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("d"), 4)
+
+    def test_discarded_writes_never_land(self):
+        writer = self.make_writer()
+        writer.set_many({"a": 1, "b": 2}, timeout=60)
+        writer.discard(["a"])
+        writer.flush()
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), 2)
+
+    def test_background_thread_flushes(self):
+        writer = self.make_writer()
+        writer.start()
+        writer.set("a", 1, timeout=60)
+        deadline = time.monotonic() + 3
+        while cache.get("a") is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(cache.get("a"), 1)
+        writer.close()
+
+    def test_flush_waits_for_the_background_batch(self):
+        writer = self.make_writer()
+        started = threading.Event()
+        write = writer._write
+
+        def slow_write(batch):
+            started.set()
+            time.sleep(0.2)
+            write(batch)
+
+        with mock.patch.object(writer, "_write", side_effect=slow_write):
+            writer.start()
+            writer.set("a", 1, timeout=60)
+            self.assertTrue(started.wait(3))
+            writer.flush()
+        self.assertEqual(cache.get("a"), 1)
+        writer.close()
+
+
+class SharedCountersTestCase(TestCase):
+
+    def setUp(self):
+        self.counters = SharedCounters("test_counters:{counter}", ("hits", "misses"))
+        self.counters.reset()
+        self.addCleanup(self.counters.reset)
+
+    def test_add_does_not_touch_redis(self):
+        with mock.patch.object(SharedCounters, "client", new_callable=mock.PropertyMock) as client:
+            self.counters.add("hits", 3)
+        client.assert_not_called()
+
+        self.counters.add("hits")
+        self.counters.flush()
+        self.assertEqual(self.counters.read(), {"hits": 4, "misses": 0})
+
+    def test_redis_errors_keep_the_counts(self):
+        self.counters.add("misses", 2)
+        with mock.patch("redis.client.Pipeline.execute", side_effect=redis.ConnectionError("down")), mock.patch("builtins.print"):
+            self.counters.flush()
+        self.assertEqual(self.counters.read(), {"hits": 0, "misses": 0})
+
+        self.counters.flush()
+        self.assertEqual(self.counters.read(), {"hits": 0, "misses": 2})
+
+
+class ValidationResultCacheTestCase(TestCase):
+
+    def setUp(self):
+        validation_cache.clear()
+        # a batch queued by an earlier test may still be on its way to Redis
+        validation_cache.flush_writes()
+        validation_cache.stats.flush()
+        validation_cache.stats.reset()
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 3
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    def test_tiers_are_counted(self):
+        result = {"national_id": "29801011401891", "is_valid": True}
+        self.assertIsNone(validation_cache.get("29801011401891"))
+
+        cache.set(get_validation_cache_key("29801011401891"), result)
+        self.assertEqual(validation_cache.get("29801011401891"), result)
+        self.assertEqual(validation_cache.get("29801011401891"), result)
+
+        validation_cache.stats.flush()
+        self.assertEqual(
+            validation_cache.stats.read(),
+            {
+                "local_hits": 1,
+                "local_misses": 2,
+                "shared_hits": 1,
+                "shared_misses": 1,
+                "response_hits": 0,
+                "response_misses": 0,
+                "writes_flushed": 0,
+                "writes_dropped": 0,
+            },
+        )
+
+    def test_response_lookups_are_counted_apart(self):
+        validation_cache.set_response("29801011401891", "en", True, b"{}")
+        validation_cache.get_response("29801011401891", "en")
+        validation_cache.get_response("29801011401891", "ar")
+        validation_cache.get("29801011401891")
+
+        validation_cache.stats.flush()
+        stats = validation_cache.stats.read()
+        self.assertEqual((stats["response_hits"], stats["response_misses"]), (1, 1))
+        self.assertEqual((stats["local_hits"], stats["local_misses"], stats["shared_hits"], stats["shared_misses"]), (0, 1, 0, 1))
+
+    def test_get_many_fills_local_tier(self):
+        validation_cache.set("29801011401891", {"is_valid": True})
+        cache.set(get_validation_cache_key("30001011401891"), {"is_valid": True})
+
+        results = validation_cache.get_many(["29801011401891", "30001011401891", "31501011401891"])
+        self.assertEqual(set(results), {"29801011401891", "30001011401891"})
+        self.assertIsNotNone(validation_cache.local.get("30001011401891"))
+
+    @override_settings(VALIDATION_CACHE_BY_PREFIX=True)
+    def test_prefix_mode_shares_entries(self):
+        validator = NationalIDValidator()
+        validation_cache.set("29801011401891", validator.decode("29801011401891").to_facts())
+
+        validation_cache.flush_writes()
+        facts = validation_cache.get("29801011401882")
+        self.assertIsNotNone(cache.get(get_validation_cache_key(get_prefix_cache_id("298010114"))))
+        self.assertEqual(validator.derive(facts, "29801011401882"), validator.decode("29801011401882").to_dict())
+        self.assertEqual(set(validation_cache.get_many(["29801011401891", "29801011405551", "29801021401891"])), {"29801011401891", "29801011405551"})
+
+        # too short to share: its length error would reach every ID with the prefix
+        self.assertIsNone(validation_cache.get("298010114"))
+
+        validation_cache.delete("29801011405551")
+        self.assertIsNone(validation_cache.get("29801011401891"))
+
+    def test_invalidation_reaches_other_workers(self):
+        # a message published by another process only reaches us through the listener thread
+        publisher = redis.Redis.from_url(settings.VALIDATION_CACHE_INVALIDATION_URL)
+        channel = settings.VALIDATION_CACHE_INVALIDATION_CHANNEL
+
+        validation_cache.local.set("29801011401891", {"is_valid": True})
+        publisher.publish(channel, "other-worker 29801011401891")
+        self.assertTrue(self.wait_for(lambda: validation_cache.local.get("29801011401891") is None))
+
+        validation_cache.local.set("29801011401891", {"is_valid": True})
+        publisher.publish(channel, "other-worker *")
+        self.assertTrue(self.wait_for(lambda: len(validation_cache.local) == 0))
+
+    def test_own_invalidations_are_ignored(self):
+        validation_cache.local.set("29801011401891", {"is_valid": True})
+        validation_cache._publish("*")
+        time.sleep(0.2)
+        self.assertIsNotNone(validation_cache.local.get("29801011401891"))
+
+    def test_clear_command_clears_both_tiers(self):
+        validation_cache.set("29801011401891", {"is_valid": True})
+        call_command("clear_validation_cache", national_id="29801011401891", stdout=StringIO())
+        self.assertIsNone(validation_cache.local.get("29801011401891"))
+        self.assertIsNone(cache.get(get_validation_cache_key("29801011401891")))
+
+    def test_stats_command(self):
+        validation_cache.get("29801011401891")
+        validation_cache.stats.flush()
+        stdout = StringIO()
+        call_command("validation_cache_stats", stdout=stdout)
+        self.assertIn("Local tier: 0 hit(s), 1 miss(es)", stdout.getvalue())
+
+
+@override_settings(TESTING=False, API_CALL_LOG_BUFFER_CAPACITY=3, API_CALL_LOG_BATCH_SIZE=100, API_CALL_LOG_FLUSH_INTERVAL=60)
+class APICallLogSinkTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.sink = APICallLogSink()
+        self.sink.stats.reset()
+
+    def tearDown(self):
+        self.sink.close()
+
+    def test_rows_are_buffered_until_flushed(self):
+        self.sink.add(self.user, "29801011401891", True, "127.0.0.1", "tests")
+        self.sink.add_many(None, [("29801011401892", False), ("29801011401893", True)], "127.0.0.1", "tests")
+        self.assertEqual(len(self.sink), 3)
+        self.assertEqual(APICallLog.objects.count(), 0)
+
+        self.sink.flush()
+        self.assertEqual(len(self.sink), 0)
+        self.assertEqual(APICallLog.objects.count(), 3)
+        self.assertEqual(APICallLog.objects.filter(user=self.user).get().national_id, "29801011401891")
+
+    def test_full_buffer_drops_rows(self):
+        self.sink.add_many(None, [("29801011401891", True)] * 5, "127.0.0.1", "tests")
+        self.sink.flush()
+        self.sink.stats.flush()
+
+        stats = self.sink.stats.read()
+        self.assertEqual(APICallLog.objects.count(), 3)
+        self.assertEqual((stats["rows_added"], stats["rows_flushed"], stats["rows_dropped"], stats["flushes"]), (5, 3, 2, 1))
+
+    def test_timestamp_is_request_time(self):
+        self.sink.add(None, "29801011401891", True, "127.0.0.1", "tests")
+        before_flush = datetime.now().astimezone()
+        self.sink.flush()
+        self.assertLessEqual(APICallLog.objects.get().timestamp, before_flush)
+
+    def test_stats_command(self):
+        self.sink.add(None, "29801011401891", True, "127.0.0.1", "tests")
+        self.sink.flush()
+        self.sink.stats.flush()
+        stdout = StringIO()
+        with mock.patch("validatorApi.management.commands.call_log_stats.api_call_log_sink", self.sink):
+            call_command("call_log_stats", stdout=stdout)
+        self.assertIn("Flushed: 1 row(s) in 1 batch(es)", stdout.getvalue())
+        self.assertIn("Dropped: 0 row(s)", stdout.getvalue())
+
+
+@override_settings(TESTING=True, API_CALL_LOG_BACKEND="stream", API_CALL_LOG_STREAM="test_api_call_logs")
+class ConsumeCallLogsCommandTestCase(TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.redis = get_stream_client()
+        self.redis.delete("test_api_call_logs")
+        self.sink = APICallLogSink()
+
+    def consume(self, **options):
+        stdout = StringIO()
+        call_command("consume_call_logs", once=True, consumer="tests", stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_events_are_saved_and_acknowledged(self):
+        self.sink.add(self.user, "29801011401891", True, "127.0.0.1", "tests")
+        self.sink.add_many(None, [("29801011401892", False)], None, "tests")
+        self.assertEqual(APICallLog.objects.count(), 0)
+        self.assertEqual(self.redis.xlen("test_api_call_logs"), 2)
+
+        self.assertIn("Saved 2 API call log(s)", self.consume())
+        log = APICallLog.objects.get(national_id="29801011401891")
+        self.assertEqual((log.user, log.is_valid, log.ip_address), (self.user, True, "127.0.0.1"))
+        self.assertIsNone(APICallLog.objects.get(national_id="29801011401892").ip_address)
+        self.assertEqual(self.redis.xpending("test_api_call_logs", "api_call_log_writers")["pending"], 0)
+
+        self.assertIn("Saved 0 API call log(s)", self.consume())
+        self.assertEqual(APICallLog.objects.count(), 2)
+
+    def test_unacknowledged_events_are_claimed(self):
+        self.sink.add(self.user, "29801011401891", True, "127.0.0.1", "tests")
+        self.consume()
+        self.sink.add(self.user, "29801011401892", True, "127.0.0.1", "tests")
+
+        # another consumer read the event and died before acknowledging it
+        self.redis.xreadgroup("api_call_log_writers", "crashed", {"test_api_call_logs": ">"})
+        self.assertIn("Saved 1 API call log(s)", self.consume(claim_idle=0))
+        self.assertTrue(APICallLog.objects.filter(national_id="29801011401892").exists())
+
+    def test_stats_command_reports_stream(self):
+        self.sink.add(self.user, "29801011401891", True, "127.0.0.1", "tests")
+        self.consume()
+        self.sink.add(self.user, "29801011401892", True, "127.0.0.1", "tests")
+        stdout = StringIO()
+        call_command("call_log_stats", stdout=stdout)
+        # consumer group lag needs Redis 7
+        self.assertRegex(stdout.getvalue(), r"Stream: 2 event\(s\), 0 pending, (1|unknown) not yet read")
+
+    def test_events_survive_clearing_the_cache(self):
+        self.sink.add(self.user, "29801011401891", True, "127.0.0.1", "tests")
+        call_command("clear_validation_cache", stdout=StringIO())
+        self.assertIn("Saved 1 API call log(s)", self.consume())
+
+    def test_malformed_events_are_reported_and_skipped(self):
+        self.consume()
+        self.redis.xadd("test_api_call_logs", {"national_id": "29801011401891"})
+        self.sink.add(self.user, "29801011401892", True, "127.0.0.1", "tests")
+
+        stderr = StringIO()
+        call_command("consume_call_logs", once=True, consumer="tests", stdout=StringIO(), stderr=stderr)
+        self.assertIn("Skipping malformed API call log event", stderr.getvalue())
+        self.assertEqual(list(APICallLog.objects.values_list("national_id", flat=True)), ["29801011401892"])
+
+    def test_deleted_user_is_nulled(self):
+        self.sink.add(self.user, "29801011401891", True, "127.0.0.1", "tests")
+        self.user.delete()
+        self.consume()
+        self.assertIsNone(APICallLog.objects.get().user)
+
+
+class CallLogRollupTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+
+    def log(self, user, is_valid, days_ago=0):
+        return APICallLog.objects.create(user=user, national_id="29801011401891", is_valid=is_valid, timestamp=timezone.now() - timedelta(days=days_ago))
+
+    def rollup(self):
+        call_command("rollup_call_logs", chunk_size=2, stdout=StringIO())
+        return {(rollup.user_id, rollup.date, rollup.valid_count, rollup.invalid_count) for rollup in APICallDailyRollup.objects.all()}
+
+    def test_counts_per_user_and_day(self):
+        self.log(self.user, True)
+        self.log(self.user, False)
+        self.log(self.user, True, days_ago=1)
+        self.log(None, True)
+
+        today = timezone.localdate()
+        self.assertEqual(
+            self.rollup(),
+            {(self.user.id, today, 1, 1), (self.user.id, today - timedelta(days=1), 1, 0), (None, today, 1, 0)},
+        )
+
+    def test_only_new_rows_are_processed(self):
+        self.log(self.user, True)
+        self.log(None, False)
+        self.rollup()
+        self.log(self.user, True)
+        last = self.log(None, False)
+
+        today = timezone.localdate()
+        self.assertEqual(self.rollup(), {(self.user.id, today, 2, 0), (None, today, 0, 2)})
+        self.assertEqual(RollupCheckpoint.objects.get().last_id, last.id)
+        self.assertEqual(self.rollup(), {(self.user.id, today, 2, 0), (None, today, 0, 2)})
+
+    def test_prune_keeps_recent_and_unrolled_rows(self):
+        old = self.log(self.user, True, days_ago=100)
+        self.log(self.user, True, days_ago=10)
+        self.rollup()
+        unrolled = self.log(self.user, True, days_ago=100)
+
+        stdout = StringIO()
+        call_command("prune_call_logs", days=30, chunk_size=1, pause=0, stdout=stdout)
+        self.assertIn("Deleted 1 API call log(s) older than 30 day(s)", stdout.getvalue())
+        self.assertFalse(APICallLog.objects.filter(pk=old.pk).exists())
+        self.assertTrue(APICallLog.objects.filter(pk=unrolled.pk).exists())
+        self.assertEqual(APICallLog.objects.count(), 2)
+
+
+class APICallLogAdminTestCase(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", password="adminpass")
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.client.force_login(self.admin)
+        self.url = "/admin/validatorApi/apicalllog/"
+
+        now = timezone.now()
+        APICallLog.objects.bulk_create(
+            APICallLog(user=self.user if i % 2 else None, national_id=f"2980101140{i:04d}", is_valid=True, timestamp=now - timedelta(minutes=i))
+            for i in range(150)
+        )
+
+    def test_estimated_count_and_keyset_navigation(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["cl"].result_count, 150)
+
+        seen = [log.national_id for log in response.context["cl"].result_list]
+        next_url = response.context["cl"].next_cursor_url
+        self.assertIsNotNone(next_url)
+
+        response = self.client.get(self.url + next_url)
+        self.assertEqual(response.status_code, 200)
+        seen += [log.national_id for log in response.context["cl"].result_list]
+        self.assertIsNone(response.context["cl"].next_cursor_url)
+        self.assertEqual(seen, [f"2980101140{i:04d}" for i in range(150)])
+
+    def test_user_filter(self):
+        response = self.client.get(self.url, {"user__id__exact": self.user.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({log.user for log in response.context["cl"].result_list}, {self.user})
+        self.assertContains(response, 'data-field-name="user"')
+
+    def test_user_autocomplete(self):
+        response = self.client.get("/admin/autocomplete/", {"term": "test", "app_label": "validatorApi", "model_name": "apicalllog", "field_name": "user"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result["text"] for result in response.json()["results"]], ["testuser"])
+
+
+@override_settings(TESTING=True)
+class UsageAPITestCase(APITestCase):
+
+    def setUp(self):
+        validation_cache.clear()
+        # counters have their own Redis database, clearing the validation cache keeps them
+        usage_keys = list(usage_counters.client.scan_iter(match=get_usage_key("*", "*", "*")))
+        if usage_keys:
+            usage_counters.client.delete(*usage_keys)
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+
+    def test_usage_counts_every_call(self):
+        self.client.post("/api/validate/", {"national_id": "29801011401891"}, format="json")
+        self.client.post("/api/validate/", {"national_id": "29801011401891"}, format="json")
+        self.client.post("/api/validate/batch/", {"national_ids": ["29801011401891", "29813329901891"]}, format="json")
+
+        response = self.client.get("/api/usage/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for window in ("minute", "hour", "day", "total"):
+            self.assertEqual(response.data[window], {"total": 4, "valid": 3, "invalid": 1})
+
+    @override_settings(VALIDATION_CACHE_RESPONSE_BYTES=True)
+    def test_response_bytes_hits_are_counted(self):
+        self.client.post("/api/validate/", {"national_id": "29813329901891"}, format="json")
+        self.client.post("/api/validate/", {"national_id": "29813329901891"}, format="json")
+        self.client.post("/api/validate/", {"national_id": "29801011401891"}, format="json")
+        self.client.post("/api/validate/", {"national_id": "29801011401891"}, format="json")
+        self.assertEqual(self.client.get("/api/usage/").data["day"], {"total": 4, "valid": 2, "invalid": 2})
+
+    def test_totals_survive_clearing_the_cache(self):
+        self.client.post("/api/validate/", {"national_id": "29801011401891"}, format="json")
+        call_command("clear_validation_cache", stdout=StringIO())
+        self.assertEqual(self.client.get("/api/usage/").data["total"], {"total": 1, "valid": 1, "invalid": 0})
+
+    def test_usage_without_auth(self):
+        self.client.credentials()
+        self.assertEqual(self.client.get("/api/usage/").status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_flush_usage_counters(self):
+        self.client.post("/api/validate/batch/", {"national_ids": ["29801011401891", "29813329901891"]}, format="json")
+        call_command("flush_usage_counters", stdout=StringIO())
+        call_command("flush_usage_counters", stdout=StringIO())
+
+        usage = APIUsageDaily.objects.get()
+        self.assertEqual((usage.user, usage.date, usage.valid_count, usage.invalid_count), (self.user, timezone.localdate(), 1, 1))
+
+
+class RateLimitTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate("300/s"), (1, 300))
+        self.assertEqual(parse_rate("3000/m"), (60, 3000))
+        self.assertEqual(parse_rate("10/5m"), (300, 10))
+
+    def test_local_sliding_window(self):
+        limiter = LocalSlidingWindow()
+        windows = [(60, 2), (3600, 3)]
+        self.assertEqual(limiter.hit("a", windows, 30), (True, 0))
+        self.assertEqual(limiter.hit("a", windows, 31), (True, 0))
+        allowed, retry_after = limiter.hit("a", windows, 32)
+        self.assertFalse(allowed)
+        self.assertGreater(retry_after, 28)
+
+        # half of the previous minute still counts, so one more call fits
+        self.assertEqual(limiter.hit("a", windows, 90), (True, 0))
+        allowed, retry_after = limiter.hit("a", windows, 95)
+        self.assertFalse(allowed)
+        self.assertTrue(limiter.hit("b", windows, 95)[0])
+
+    def test_redis_limits_every_window(self):
+        limiter = MultiWindowRateLimiter()
+        self.assertTrue(limiter.hit("tests:a", ["2/m", "3/h"])[0])
+        self.assertTrue(limiter.hit("tests:a", ["2/m", "3/h"])[0])
+        allowed, retry_after = limiter.hit("tests:a", ["2/m", "3/h"])
+        self.assertFalse(allowed)
+        self.assertGreater(retry_after, 0)
+        self.assertTrue(limiter.hit("tests:b", ["2/m", "3/h"])[0])
+
+        # a cost above the limit on an empty bucket must not divide by zero
+        allowed, retry_after = limiter.hit("tests:c", ["2/m"], cost=3)
+        self.assertFalse(allowed)
+        self.assertLess(retry_after, 180)
+
+    @override_settings(RATE_LIMIT_URL="redis://127.0.0.1:1", RATE_LIMIT_FALLBACK_SECONDS=60)
+    def test_falls_back_to_local_counters(self):
+        limiter = MultiWindowRateLimiter()
+        with mock.patch("builtins.print"):
+            self.assertTrue(limiter.hit("tests:a", ["1/m"])[0])
+        self.assertFalse(limiter.hit("tests:a", ["1/m"])[0])
+
+
+@override_settings(TESTING=True, VALIDATION_RATE_LIMITS=["2/m"])
+class RateLimitAPITestCase(APITestCase):
+
+    def setUp(self):
+        reset_rate_limiter()
+        validation_cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+
+    def test_throttled_with_retry_after(self):
+        for _ in range(2):
+            response = self.client.post("/api/validate/", {"national_id": "29801011401891"}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.post("/api/validate/", {"national_id": "29801011401891"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+
+        # the batch endpoint shares the quota
+        response = self.client.post("/api/validate/batch/", {"national_ids": ["29801011401891"]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_batch_over_the_limit_is_throttled(self):
+        response = self.client.post("/api/validate/batch/", {"national_ids": ["29801011401891"] * 3}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+
+    @override_settings(VALIDATION_RATE_LIMITS=["5/m"])
+    def test_batch_costs_one_hit_per_id(self):
+        response = self.client.post("/api/validate/batch/", {"national_ids": ["29801011401891"] * 4}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post("/api/validate/batch/", {"national_ids": ["29801011401891"] * 2}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        response = self.client.post("/api/validate/", {"national_id": "29801011401891"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post("/api/validate/", {"national_id": "29801011401891"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+@override_settings(TESTING=True)
+class CachedJWTAuthenticationTestCase(APITestCase):
+
+    def setUp(self):
+        self.addCleanup(forget_token_revocations)
+        validation_cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        # the saved signal drops cached users on commit, which never comes in a TestCase and pks are reused
+        user_cache.delete(self.user.pk)
+        self.refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.refresh.access_token}")
+
+    def validate(self):
+        return self.client.post("/api/validate/", {"national_id": "29801011401891"}, format="json")
+
+    def test_hot_path_makes_no_queries(self):
+        self.assertEqual(self.validate().status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.validate().status_code, status.HTTP_200_OK)
+
+    def test_revoked_access_token_is_rejected(self):
+        self.assertEqual(self.validate().status_code, status.HTTP_200_OK)
+        call_command("revoke_user_tokens", "testuser", stdout=StringIO())
+        self.assertEqual(self.validate().status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post("/api/validate/", {"national_id": "29801011401891"}, format="json", HTTP_ACCEPT_LANGUAGE="ar")
+        self.assertEqual(response.json()["detail"], "تم إلغاء تأشيرة المرور")
+
+        # tokens issued after the revocation work again
+        time.sleep(1.1)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+        self.assertEqual(self.validate().status_code, status.HTTP_200_OK)
+
+    def test_schema_keeps_bearer_scheme(self):
+        response = self.client.get("/api/schema/?format=json")
+        self.assertEqual(response.json()["components"]["securitySchemes"]["jwtAuth"], {"type": "http", "scheme": "bearer", "bearerFormat": "JWT"})
+
+    def test_inactive_user_is_rejected(self):
+        self.assertEqual(self.validate().status_code, status.HTTP_200_OK)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.validate().status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cached_user_is_dropped_after_commit(self):
+        self.assertEqual(self.validate().status_code, status.HTTP_200_OK)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.save()
+        self.assertIsNotNone(cache.get(get_auth_user_key(self.user.pk)))
+
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(cache.get(get_auth_user_key(self.user.pk)))
+
+    def test_user_saves_survive_redis_errors(self):
+        with mock.patch("validatorApi.authentication.cache.delete", side_effect=redis.ConnectionError("down")), mock.patch("builtins.print") as output:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.save()
+        output.assert_called_once()
+
+
+class RevokeUserTokensCommandTestCase(TestCase):
+
+    def setUp(self):
+        self.addCleanup(forget_token_revocations)
+        self.users = [User.objects.create_user(username=f"user{i}", password="testpass") for i in range(3)]
+        self.group = Group.objects.create(name="services")
+        self.group.user_set.add(self.users[1], self.users[2])
+        for user in self.users:
+            for _ in range(20):
+                RefreshToken.for_user(user)
+
+    def revoke(self, *args, **options):
+        stdout = StringIO()
+        call_command("revoke_user_tokens", *args, stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def blacklisted(self, user):
+        return BlacklistedToken.objects.filter(token__user=user).count()
+
+    def test_queries_do_not_grow_with_tokens(self):
+        with CaptureQueriesContext(connection) as queries:
+            output = self.revoke("user0", "missing")
+        self.assertLess(len(queries), 8)
+        self.assertIn('Successfully revoked 20 token(s) for user "user0"', output)
+        self.assertIn('User "missing" does not exist', output)
+        self.assertEqual(self.blacklisted(self.users[0]), 20)
+        self.assertEqual(self.blacklisted(self.users[1]), 0)
+
+        self.assertIn('No active tokens found for user "user0"', self.revoke("user0"))
+
+    def test_group(self):
+        output = self.revoke(group=["services"])
+        self.assertIn('Successfully revoked 20 token(s) for user "user1"', output)
+        self.assertIn('Successfully revoked 20 token(s) for user "user2"', output)
+        self.assertEqual(self.blacklisted(self.users[0]), 0)
+        self.assertTrue(token_revocations.is_revoked(self.users[2].pk, None))
+
+    def test_revocations_survive_clearing_the_cache(self):
+        self.revoke("user0")
+        call_command("clear_validation_cache", stdout=StringIO())
+
+        with mock.patch.object(token_revocations, "_revoked", {}), mock.patch.object(token_revocations, "_refresh_at", 0):
+            self.assertTrue(token_revocations.is_revoked(self.users[0].pk, None))
+
+    def test_requires_users(self):
+        with self.assertRaises(CommandError):
+            self.revoke()
+
+
+class PruneExpiredTokensCommandTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        for _ in range(10):
+            RefreshToken.for_user(self.user)
+        tokens = OutstandingToken.objects.order_by("pk")
+        self.expired_ids = list(tokens.values_list("pk", flat=True)[:7])
+        OutstandingToken.objects.filter(pk__in=self.expired_ids).update(expires_at=timezone.now() - timedelta(days=1))
+        BlacklistedToken.objects.create(token_id=self.expired_ids[0])
+
+    def prune(self, **options):
+        stdout = StringIO()
+        call_command("prune_expired_tokens", chunk_size=3, pause=0, report_every=1, stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_deletes_only_expired_tokens(self):
+        output = self.prune()
+        self.assertIn("Deleted 7 expired token(s) in", output)
+        self.assertIn("rows/s", output)
+        self.assertFalse(OutstandingToken.objects.filter(pk__in=self.expired_ids).exists())
+        self.assertEqual(OutstandingToken.objects.count(), 3)
+        self.assertEqual(BlacklistedToken.objects.count(), 0)
+
+    def test_resumes_after_interruption(self):
+        with mock.patch("validatorApi.management.commands.prune_expired_tokens.time.sleep", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                self.prune()
+        self.assertEqual(OutstandingToken.objects.filter(pk__in=self.expired_ids).count(), 4)
+        self.assertEqual(RollupCheckpoint.objects.get(name="expired_tokens").last_id, self.expired_ids[2])
+
+        output = self.prune()
+        self.assertIn(f"Resuming after token id {self.expired_ids[2]}", output)
+        self.assertIn("Deleted 4 expired token(s) in", output)
+        self.assertEqual(RollupCheckpoint.objects.get(name="expired_tokens").last_id, 0)
 
 
 @override_settings(TESTING=True)
@@ -259,7 +1273,7 @@ class ValidateNationalIDAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_api_call_logging(self):
-        cache.clear()  # Clear cache to ensure fresh validation
+        validation_cache.clear()  # Clear cache to ensure fresh validation
 
         initial_count = APICallLog.objects.count()
         data = {"national_id": "29801011401891"}
@@ -276,7 +1290,7 @@ class ValidateNationalIDAPITestCase(APITestCase):
         self.assertEqual(APICallLog.objects.count(), initial_count + 1)
 
     def test_cache_hit(self):
-        cache.clear()  # Clear cache before test
+        validation_cache.clear()  # Clear cache before test
 
         data = {"national_id": "29801011401891"}
         self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access_token}")
@@ -295,7 +1309,7 @@ class ValidateNationalIDAPITestCase(APITestCase):
         self.assertIsNotNone(cached_result)
 
     def test_cache_different_ids(self):
-        cache.clear()
+        validation_cache.clear()
 
         self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access_token}")
 
@@ -306,3 +1320,400 @@ class ValidateNationalIDAPITestCase(APITestCase):
         self.assertEqual(response2.status_code, status.HTTP_200_OK)
 
         self.assertNotEqual(response1.data["birth_year"], response2.data["birth_year"])
+
+    def test_cached_facts_leave_out_the_date(self):
+        validation_cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access_token}")
+
+        first = self.client.post(self.url, {"national_id": "29801011401891"}, format="json")
+        facts = cache.get(get_validation_cache_key("29801011401891"))
+        self.assertNotIn("age", facts)
+        self.assertNotIn("is_valid", facts)
+
+        client = redis.Redis.from_url(settings.CACHES["default"]["LOCATION"])
+        ttl = client.ttl(cache.make_key(get_validation_cache_key("29801011401891")))
+        self.assertGreater(ttl, VALIDATION_RESPONSE_CACHE_TIMEOUT)
+        self.assertLessEqual(ttl, VALIDATION_CACHE_TIMEOUT)
+
+        # the age comes from today's date on every hit
+        with mock.patch.object(NationalIDValidator, "_calculate_age", return_value=99):
+            second = self.client.post(self.url, {"national_id": "29801011401891"}, format="json")
+        self.assertEqual(second.data["age"], 99)
+        self.assertEqual({**second.data, "age": first.data["age"]}, first.data)
+
+    def test_one_cache_entry_serves_every_language(self):
+        validation_cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access_token}")
+
+        english = self.client.post(self.url, {"national_id": "29801011401891"}, format="json")
+        with mock.patch.object(NationalIDValidator, "decode") as decode:
+            arabic = self.client.post(self.url, {"national_id": "29801011401891"}, format="json", HTTP_ACCEPT_LANGUAGE="ar")
+        decode.assert_not_called()
+
+        self.assertEqual((english.data["gender"], english.data["century"]), ("Male", "20th century (1900-1999)"))
+        self.assertEqual((arabic.data["gender"], arabic.data["century"]), ("ذكر", "القرن العشرين (1900-1999)"))
+        self.assertEqual(cache.get(get_validation_cache_key("29801011401891"))["gender"], "male")
+        self.assertEqual(APICallLog.objects.count(), 1)
+
+
+@override_settings(TESTING=True)
+class ValidateNationalIDBatchAPITestCase(APITestCase):
+
+    def setUp(self):
+        validation_cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.url = "/api/validate/batch/"
+
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def test_results_follow_input_order(self):
+        national_ids = ["29801011401891", "19801011401891", "30001011401891", "29801011401891"]
+        response = self.client.post(self.url, {"national_ids": national_ids}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual([result["national_id"] for result in results], national_ids)
+        self.assertEqual([result["is_valid"] for result in results], [True, False, True, True])
+        self.assertEqual(results[0]["generation"]["name"], "Generation Z")
+
+    def test_only_misses_are_decoded_and_logged(self):
+        self.client.post("/api/validate/", {"national_id": "29801011401891"}, format="json")
+        self.assertEqual(APICallLog.objects.count(), 1)
+
+        response = self.client.post(self.url, {"national_ids": ["29801011401891", "30001011401891", "30001011401891"]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(APICallLog.objects.count(), 2)
+        self.assertIsNotNone(cache.get(get_validation_cache_key("30001011401891")))
+
+        self.client.post(self.url, {"national_ids": ["29801011401891", "30001011401891"]}, format="json")
+        self.assertEqual(APICallLog.objects.count(), 2)
+
+    @override_settings(VALIDATION_CACHE_BY_PREFIX=True)
+    def test_prefix_hits_log_ids_without_their_own_entry(self):
+        def logged():
+            return list(APICallLog.objects.order_by("id").values_list("national_id", flat=True))
+
+        self.client.post("/api/validate/", {"national_id": "29801011401891"}, format="json")
+        self.client.post("/api/validate/", {"national_id": "29801011401891"}, format="json")
+        self.assertEqual(logged(), ["29801011401891"])
+
+        # served from the entry cached for 29801011401891, logged on every lookup
+        self.client.post("/api/validate/", {"national_id": "29801011405551"}, format="json")
+        self.client.post(self.url, {"national_ids": ["29801011401891", "29801011405551"]}, format="json")
+        self.assertEqual(logged(), ["29801011401891", "29801011405551", "29801011405551"])
+
+    @override_settings(VALIDATION_BATCH_MAX_SIZE=2)
+    def test_batch_size_limit(self):
+        response = self.client.post(self.url, {"national_ids": ["29801011401891"] * 3}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(self.url, {"national_ids": ["29801011401891"] * 3}, format="json", HTTP_ACCEPT_LANGUAGE="ar")
+        self.assertEqual(response.json()["national_ids"], ["تأكد من أن هذا الحقل لا يحتوي على أكثر من 2 عنصر."])
+
+    def test_malformed_ids_rejected(self):
+        for national_ids in ([], ["123"], ["2980101140189A"]):
+            response = self.client.post(self.url, {"national_ids": national_ids}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_request_without_auth(self):
+        self.client.credentials()
+        response = self.client.post(self.url, {"national_ids": ["29801011401891"]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(TESTING=True, VALIDATION_CACHE_RESPONSE_BYTES=True)
+class ResponseBytesCacheAPITestCase(APITestCase):
+
+    def setUp(self):
+        validation_cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.url = "/api/validate/"
+        self.data = {"national_id": "29801011401891"}
+
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def test_response_expires_by_midnight(self):
+        self.client.post(self.url, self.data, format="json")
+
+        client = redis.Redis.from_url(settings.CACHES["default"]["LOCATION"])
+        ttl = client.ttl(cache.make_key(get_validation_cache_key(get_response_cache_id("29801011401891", "en"))))
+        self.assertGreater(ttl, 0)
+        self.assertLessEqual(ttl, min(VALIDATION_RESPONSE_CACHE_TIMEOUT, validation_cache.today.seconds_left() + 1))
+
+    def test_hit_skips_serializer(self):
+        response1 = self.client.post(self.url, self.data, format="json")
+        self.assertEqual(response1.status_code, status.HTTP_200_OK)
+        self.assertEqual(response1.json()["birth_year"], 1998)
+
+        with mock.patch("validatorApi.views.NationalIDResponseSerializer") as serializer:
+            response2 = self.client.post(self.url, self.data, format="json")
+            serializer.assert_not_called()
+
+        self.assertEqual(response2.status_code, status.HTTP_200_OK)
+        self.assertEqual(response2["Content-Type"], "application/json")
+        self.assertEqual(response1.content, response2.content)
+
+    def test_hits_count_validity_cached_with_the_body(self):
+        # usage reads validity from the cache entry, never from the rendered bytes
+        validation_cache.set_response("29801011401891", "en", False, b'{"is_valid":true}')
+        before = usage_counters.read(self.user.pk)["total"]
+        self.client.post(self.url, self.data, format="json")
+        after = usage_counters.read(self.user.pk)["total"]
+        self.assertEqual((after["valid"] - before["valid"], after["invalid"] - before["invalid"]), (0, 1))
+
+    def test_bytes_are_cached_per_language(self):
+        english = self.client.post(self.url, self.data, format="json")
+        arabic = self.client.post(self.url, self.data, format="json", HTTP_ACCEPT_LANGUAGE="ar")
+
+        self.assertEqual(english.json()["gender"], "Male")
+        self.assertEqual(arabic.json()["gender"], "ذكر")
+        self.assertIsNotNone(validation_cache.get_response("29801011401891", "ar"))
+
+    def test_clear_drops_cached_bytes(self):
+        self.client.post(self.url, self.data, format="json")
+        validation_cache.delete("29801011401891")
+        self.assertIsNone(validation_cache.get_response("29801011401891", "en"))
+
+    def test_browsable_api_is_rendered(self):
+        response = self.client.post(self.url, self.data, format="json", HTTP_ACCEPT="text/html")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["is_valid"])
+        self.assertIsNone(validation_cache.get_response("29801011401891", "en"))
+
+
+@override_settings(TESTING=True)
+class FastLaneAPITestCase(IDGeneratorMixin, APITestCase):
+
+    def setUp(self):
+        validation_cache.clear()
+        self.validator = NationalIDValidator()
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.url = "/api/validate/fast/"
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+
+    def test_contract_matches_validate_endpoint(self):
+        national_ids = [self.id_generator(male=index % 2 == 0) for index in range(40)]
+        national_ids += ["29801011401891", "12345678901234", "29813011401891", "39901011401891", " 29801011401891 "]
+
+        for language in ("en", "ar"):
+            for national_id in national_ids:
+                fast = self.client.post(self.url, {"national_id": national_id}, format="json", HTTP_ACCEPT_LANGUAGE=language)
+                drf = self.client.post("/api/validate/", {"national_id": national_id}, format="json", HTTP_ACCEPT_LANGUAGE=language)
+
+                self.assertEqual(fast.status_code, status.HTTP_200_OK)
+                self.assertEqual(fast["Content-Type"], drf["Content-Type"])
+                self.assertEqual(fast.content, drf.content, national_id)
+
+    def test_render_matches_serializer(self):
+        results = [
+            self.validator.decode("29801011401891").to_dict(),
+            self.validator.decode("12345678901234").to_dict(),
+            {"national_id": "29801011401891", "is_valid": False, "errors": None},
+        ]
+        for result in results:
+            self.assertEqual(render_validation_result(result), JSONRenderer().render(NationalIDResponseSerializer(result).data))
+
+    def test_errors_match_validate_endpoint(self):
+        for data in ({"national_id": "123"}, {"national_id": "2980101140189A"}, {}, {"national_id": 29801011401891}):
+            fast = self.client.post(self.url, data, format="json")
+            drf = self.client.post("/api/validate/", data, format="json")
+            self.assertEqual(fast.status_code, drf.status_code, data)
+            self.assertEqual(fast.content, drf.content, data)
+
+        self.assertEqual(self.client.post(self.url, "national_id=29801011401891", content_type="text/plain").status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        self.assertEqual(self.client.post(self.url, "{", content_type="application/json").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_request_without_auth(self):
+        self.client.credentials()
+        response = self.client.post(self.url, {"national_id": "29801011401891"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn("Bearer", response["WWW-Authenticate"])
+
+    def test_only_misses_are_logged(self):
+        self.client.post(self.url, {"national_id": "29801011401891"}, format="json")
+        self.client.post(self.url, {"national_id": "29801011401891"}, format="json")
+        self.assertEqual(APICallLog.objects.count(), 1)
+
+    @override_settings(VALIDATION_CACHE_RESPONSE_BYTES=True)
+    def test_shares_cached_bytes_with_validate_endpoint(self):
+        drf = self.client.post("/api/validate/", {"national_id": "29801011401891"}, format="json")
+        self.assertIsNotNone(validation_cache.get_response("29801011401891", "en"))
+
+        with mock.patch("validatorApi.views.render_validation_result") as render:
+            fast = self.client.post(self.url, {"national_id": "29801011401891"}, format="json")
+            render.assert_not_called()
+        self.assertEqual(fast.content, drf.content)
+
+
+@override_settings(TESTING=True)
+class AsyncValidateNationalIDAPITestCase(TestCase):
+
+    def setUp(self):
+        reset_rate_limiter()
+        self.addCleanup(forget_token_revocations)
+        validation_cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.url = "/api/validate/async/"
+        self.headers = {"Authorization": f"Bearer {RefreshToken.for_user(self.user).access_token}"}
+
+    async def post(self, data, **headers):
+        return await self.async_client.post(self.url, data, content_type="application/json", headers={**self.headers, **headers})
+
+    async def test_matches_sync_endpoint(self):
+        response = await self.post({"national_id": "29801011401891"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/json")
+
+        sync_response = await sync_to_async(self.client.post)("/api/validate/", {"national_id": "29801011401891"}, content_type="application/json", headers=self.headers)
+        self.assertEqual(response.json(), sync_response.json())
+        self.assertEqual(response.json()["generation"]["name"], "Generation Z")
+
+    async def test_request_without_auth(self):
+        self.headers = {}
+        response = await self.post({"national_id": "29801011401891"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.json(), {"detail": "Authentication credentials were not provided."})
+        self.assertIn("Bearer", response["WWW-Authenticate"])
+
+        self.headers = {"Authorization": "Bearer invalid-token"}
+        response = await self.post({"national_id": "29801011401891"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.json()["code"], "token_not_valid")
+
+    async def test_invalid_national_id(self):
+        response = await self.post({"national_id": "123"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("national_id", response.json())
+
+        response = await self.async_client.post(self.url, "{", content_type="application/json", headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_only_misses_are_logged(self):
+        await self.post({"national_id": "29801011401891"})
+        await self.post({"national_id": "29801011401891"})
+
+        self.assertEqual(await APICallLog.objects.acount(), 1)
+        self.assertIsNotNone(await cache.aget(get_validation_cache_key("29801011401891")))
+
+    async def test_language_from_header(self):
+        response = await self.post({"national_id": "29801011401891"}, **{"Accept-Language": "ar"})
+        self.assertEqual(response.json()["gender"], "ذكر")
+
+    @override_settings(VALIDATION_RATE_LIMITS=["2/m"])
+    async def test_throttled_with_retry_after(self):
+        for _ in range(2):
+            response = await self.post({"national_id": "29801011401891"})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = await self.post({"national_id": "29801011401891"})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+
+    async def test_revoked_token_rejected(self):
+        with mock.patch.object(token_revocations, "_revoked", {}):
+            await sync_to_async(token_revocations.revoke)([self.user.pk])
+            response = await self.post({"national_id": "29801011401891"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.json()["code"], "token_revoked")
+
+
+@override_settings(TESTING=True)
+class RouteScopedMiddlewareTestCase(TestCase):
+
+    def setUp(self):
+        validation_cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.token = f"Bearer {RefreshToken.for_user(self.user).access_token}"
+        self.factory = RequestFactory()
+        # like the test client: keep the test transaction's connection open across requests
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+
+    def wsgi(self, request):
+        started = {}
+
+        def start_response(status, headers):
+            started["status"] = int(status.split()[0])
+            started["headers"] = {name.lower(): value for name, value in headers}
+
+        response = RouteScopedWSGIHandler()(request.environ, start_response)
+        body = b"".join(response)
+        response.close()
+        return started["status"], started["headers"], body
+
+    def test_api_runs_minimal_chain(self):
+        request = self.factory.post("/api/validate/", {"national_id": "29801011401891"}, content_type="application/json", HTTP_AUTHORIZATION=self.token, HTTP_ACCEPT_LANGUAGE="ar")
+        status_code, headers, body = self.wsgi(request)
+
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(body)["gender"], "ذكر")
+        self.assertEqual(headers["content-language"], "ar")
+        self.assertIn("Accept-Language", headers["vary"])
+        self.assertNotIn("Cookie", headers["vary"])
+        self.assertNotIn("set-cookie", headers)
+
+    def test_api_html_pages_keep_frame_options(self):
+        for path in ("/api/schema/swagger-ui/", "/api/schema/redoc/"):
+            status_code, headers, _body = self.wsgi(self.factory.get(path))
+            self.assertEqual(status_code, status.HTTP_200_OK)
+            self.assertEqual(headers["x-frame-options"], "DENY")
+
+        request = self.factory.post("/api/validate/", {"national_id": "29801011401891"}, content_type="application/json", HTTP_AUTHORIZATION=self.token, HTTP_ACCEPT="text/html")
+        status_code, headers, _body = self.wsgi(request)
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(headers["x-frame-options"], "DENY")
+
+    def test_site_keeps_full_chain(self):
+        for path in ("/", "/admin/login/"):
+            status_code, headers, _body = self.wsgi(self.factory.get(path))
+            self.assertEqual(status_code, status.HTTP_200_OK)
+            self.assertEqual(headers["x-frame-options"], "DENY")
+            self.assertIn("Accept-Language", headers["vary"])
+
+        # the admin login form still gets its CSRF cookie
+        self.assertIn("csrftoken", headers["set-cookie"])
+
+    async def test_asgi_api_runs_minimal_chain(self):
+        messages = []
+        body = json.dumps({"national_id": "29801011401891"}).encode()
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": "/api/validate/async/",
+            "raw_path": b"/api/validate/async/",
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"host", b"testserver"), (b"content-type", b"application/json"), (b"authorization", self.token.encode())],
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+        }
+
+        requests = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            # the client never disconnects, the handler stops listening once it has responded
+            await asyncio.Future()
+
+        async def send(message):
+            messages.append(message)
+
+        # ASGIHandler runs sync code on its own thread, outside the test transaction's connection
+        with mock.patch("validatorApi.views.api_call_log_sink.aadd") as aadd:
+            await RouteScopedASGIHandler()(scope, receive, send)
+        aadd.assert_awaited_once()
+
+        start = messages[0]
+        headers = {name.decode().lower(): value.decode() for name, value in start["headers"]}
+        self.assertEqual(start["status"], status.HTTP_200_OK)
+        self.assertEqual(json.loads(b"".join(message.get("body", b"") for message in messages[1:]))["is_valid"], True)
+        self.assertEqual(headers["content-language"], "en")
+        self.assertNotIn("Cookie", headers["vary"])
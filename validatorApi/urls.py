@@ -1,7 +1,11 @@
 from django.urls import path
 
-from .views import ValidateNationalIDView
+from .views import AsyncValidateNationalIDView, UsageView, ValidateNationalIDBatchView, ValidateNationalIDView, validate_national_id_fast
 
 urlpatterns = [
     path("validate/", ValidateNationalIDView.as_view(), name="validate-national-id"),
+    path("validate/async/", AsyncValidateNationalIDView.as_view(), name="validate-national-id-async"),
+    path("validate/fast/", validate_national_id_fast, name="validate-national-id-fast"),
+    path("validate/batch/", ValidateNationalIDBatchView.as_view(), name="validate-national-id-batch"),
+    path("usage/", UsageView.as_view(), name="usage"),
 ]
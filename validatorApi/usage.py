@@ -0,0 +1,113 @@
+import redis
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .async_redis import get_async_client
+from .constants import USAGE_WINDOWS, get_usage_key
+
+# buckets outlive their window so the last one can still be read / flushed after it closes
+MINUTE_TTL = 2 * 60
+HOUR_TTL = 2 * 60 * 60
+DAY_TTL = 3 * 24 * 60 * 60
+
+
+class UsageCounters:
+    """
+    Per-user call counters in Redis, one hash per user and window bucket with ``valid`` / ``invalid`` fields.
+
+    Buckets are the current minute, hour and ( local ) day plus a lifetime ``total``. ``record`` updates
+    all of them in one pipelined round-trip, reading never touches ``APICallLog``. Day buckets are
+    copied to ``APIUsageDaily`` by ``flush_usage_counters``.
+    """
+
+    def __init__(self):
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = redis.Redis.from_url(settings.USAGE_COUNTERS_URL)
+        return self._client
+
+    def _buckets(self, now):
+        seconds = int(now.timestamp())
+        return (
+            ("minute", seconds // 60, MINUTE_TTL),
+            ("hour", seconds // 3600, HOUR_TTL),
+            ("day", timezone.localdate(now).isoformat(), DAY_TTL),
+            ("total", "all", None),
+        )
+
+    def record(self, user_id, valid, invalid):
+        if not settings.USAGE_COUNTERS_URL or user_id is None:
+            return
+
+        pipe = self._record_pipeline(self.client, user_id, valid, invalid)
+        try:
+            pipe.execute()
+        except redis.RedisError as e:
+            print(f"Error recording usage: {e}")
+
+    async def arecord(self, user_id, valid, invalid):
+        """``record`` for async views, the pipeline is awaited on the running event loop."""
+        if not settings.USAGE_COUNTERS_URL or user_id is None:
+            return
+
+        pipe = self._record_pipeline(get_async_client(settings.USAGE_COUNTERS_URL), user_id, valid, invalid)
+        try:
+            await pipe.execute()
+        except redis.RedisError as e:
+            print(f"Error recording usage: {e}")
+
+    def _record_pipeline(self, client, user_id, valid, invalid):
+        pipe = client.pipeline(transaction=False)
+        for window, bucket, timeout in self._buckets(timezone.now()):
+            key = get_usage_key(user_id, window, bucket)
+            if valid:
+                pipe.hincrby(key, "valid", valid)
+            if invalid:
+                pipe.hincrby(key, "invalid", invalid)
+            if timeout:
+                pipe.expire(key, timeout)
+        return pipe
+
+    def read(self, user_id):
+        if not settings.USAGE_COUNTERS_URL:
+            raise redis.ConnectionError("Usage counters are disabled")
+
+        pipe = self.client.pipeline(transaction=False)
+        for window, bucket, _timeout in self._buckets(timezone.now()):
+            pipe.hgetall(get_usage_key(user_id, window, bucket))
+
+        usage = {}
+        for window, counts in zip(USAGE_WINDOWS, pipe.execute()):
+            valid = int(counts.get(b"valid", 0))
+            invalid = int(counts.get(b"invalid", 0))
+            usage[window] = {"total": valid + invalid, "valid": valid, "invalid": invalid}
+        return usage
+
+    def iter_days(self, batch_size=1000):
+        """Yield ``(user_id, date, valid, invalid)`` for every day bucket still in Redis."""
+        keys = []
+        for key in self.client.scan_iter(match=get_usage_key("*", "day", "*"), count=batch_size):
+            keys.append(key)
+            if len(keys) >= batch_size:
+                yield from self._read_days(keys)
+                keys = []
+        if keys:
+            yield from self._read_days(keys)
+
+    def _read_days(self, keys):
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hgetall(key)
+
+        for key, counts in zip(keys, pipe.execute()):
+            if not counts:
+                continue
+            _prefix, user_id, _window, day = key.decode().split(":")
+            yield int(user_id), parse_date(day), int(counts.get(b"valid", 0)), int(counts.get(b"invalid", 0))
+
+
+usage_counters = UsageCounters()
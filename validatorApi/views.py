@@ -1,25 +1,99 @@
-from concurrent.futures import ThreadPoolExecutor
+import json
 
-from django.core.cache import cache
-from rest_framework import generics, status
+import redis
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.decorators import method_decorator
+from django.utils.translation import get_language
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import exceptions, generics, status
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
-from .constants import get_validation_cache_key
-from .id_validator import NationalIDValidator
-from .models import APICallLog
-from .serializers import NationalIDResponseSerializer, NationalIDSerializer
-from django_ratelimit.decorators import ratelimit
-from django.utils.decorators import method_decorator
-
-_logging_executor = ThreadPoolExecutor(max_workers=10, thread_name_prefix="api_logger")
+from .authentication import CachedJWTAuthentication
+from .constants import get_rate_limit_key
+from .id_validator import NationalIDValidator, localize_result
+from .log_sink import api_call_log_sink
+from .rate_limit import MultiWindowRateThrottle, rate_limiter
+from .result_cache import validation_cache
+from .serializers import (
+    NationalIDBatchResponseSerializer,
+    NationalIDBatchSerializer,
+    NationalIDResponseSerializer,
+    NationalIDSerializer,
+    UsageSerializer,
+    render_validation_result,
+)
+from .usage import usage_counters
 
 CACHE_ON = True
 
+# bearer token checks of the views that run without DRF's request / authentication machinery
+bearer_authentication = CachedJWTAuthentication()
+
+
+def _is_new_id(facts, national_id):
+    # a call is logged when its ID had no cache entry of its own, prefix entries also serve IDs they weren't cached for
+    return facts is None or facts.get("national_id") != national_id
+
+
+def _get_client_info(request):
+    user = request.user if request.user.is_authenticated else None
+    ip_address, user_agent = _get_client_address(request)
+    return user, ip_address, user_agent
+
+
+def _get_client_address(request):
+    x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
+    if x_forwarded_for:
+        ip_address = x_forwarded_for.split(",")[0]
+    else:
+        ip_address = request.META.get("REMOTE_ADDR")
+
+    user_agent = request.META.get("HTTP_USER_AGENT", "")
+
+    return ip_address, user_agent
+
+
+def _error_response(request, exc):
+    # the bodies and headers DRF's exception handler would send
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+    response = HttpResponse(JSONRenderer().render(data), status=exc.status_code, content_type=JSONRenderer.media_type)
+
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        response["WWW-Authenticate"] = bearer_authentication.authenticate_header(request)
+    if getattr(exc, "wait", None):
+        response["Retry-After"] = "%d" % exc.wait
+    return response
+
+
+def _read_national_id(request):
+    if request.content_type != "application/json":
+        raise exceptions.UnsupportedMediaType(request.content_type)
+
+    try:
+        data = json.loads(request.body)
+    except ValueError as e:
+        raise exceptions.ParseError(f"JSON parse error - {e}")
+
+    # well-formed IDs skip the serializer, anything else gets its validation and error messages
+    national_id = data.get("national_id") if isinstance(data, dict) else None
+    if isinstance(national_id, str) and len(national_id) == 14 and national_id.isdigit():
+        return national_id
+
+    serializer = NationalIDSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data["national_id"]
+
+
 class ValidateNationalIDView(generics.CreateAPIView):
 
     serializer_class = NationalIDSerializer
     permission_classes = [IsAuthenticated]
+    throttle_classes = [MultiWindowRateThrottle]
 
     _validator = None
 
@@ -29,73 +103,258 @@ class ValidateNationalIDView(generics.CreateAPIView):
             cls._validator = NationalIDValidator()
         return cls._validator
     
-    @method_decorator(ratelimit(key='user', rate='30000/h'))
-    @method_decorator(ratelimit(key='user', rate='3000/m'))
-    @method_decorator(ratelimit(key='user', rate='300/s'))
     def post(self, request, *args, **kwargs):
 
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
         national_id = serializer.validated_data["national_id"]
-        
+
+        cache_response = CACHE_ON and settings.VALIDATION_CACHE_RESPONSE_BYTES and self._accepts_plain_json(request)
+        if cache_response:
+            language = get_language()
+            cached = validation_cache.get_response(national_id, language)
+            if cached is not None:
+                is_valid, body = cached
+                usage_counters.record(request.user.id, int(is_valid), int(not is_valid))
+                return HttpResponse(body, content_type=JSONRenderer.media_type)
+
+        validator = self.get_validator()
+        cached_facts = None
         if CACHE_ON and national_id:
-            cache_key = get_validation_cache_key(national_id)
-            cached_result = cache.get(cache_key)
+            cached_facts = validation_cache.get(national_id)
 
-        if CACHE_ON and cached_result != None:
-            result = cached_result
+        if CACHE_ON and cached_facts != None:
+            result = validator.derive(cached_facts, national_id)
         else:
-            validator = self.get_validator()
-            validation_result = validator.validate(national_id)
-
-            if validation_result["is_valid"]:
-                result = validator.extract_info(national_id)
-            else:
-                result = {
-                    "national_id": national_id,
-                    "is_valid": False,
-                    "errors": validation_result["errors"],
-                }
+            decoded = validator.decode(national_id)
+            result = decoded.to_dict()
             if CACHE_ON:
-                _logging_executor.submit(cache.set(cache_key, result, timeout=3600))
+                validation_cache.set(national_id, decoded.to_facts())
 
+        if _is_new_id(cached_facts, national_id):
             self._log_api_call(
                 request=request,
                 national_id=national_id,
                 is_valid=result["is_valid"],
             )
 
-        response_serializer = NationalIDResponseSerializer(result)
+        usage_counters.record(request.user.id, int(result["is_valid"]), int(not result["is_valid"]))
+
+        response_serializer = NationalIDResponseSerializer(localize_result(result))
+
+        if cache_response:
+            body = JSONRenderer().render(response_serializer.data)
+            validation_cache.set_response(national_id, language, result["is_valid"], body)
+            return HttpResponse(body, content_type=JSONRenderer.media_type)
+
         return Response(response_serializer.data, status=status.HTTP_200_OK)
 
+    def _accepts_plain_json(self, request):
+        # pre-rendered bytes only fit the default JSON renderer, not the browsable API or indented output
+        return isinstance(request.accepted_renderer, JSONRenderer) and request.accepted_media_type == JSONRenderer.media_type
+
     def _log_api_call(self, request, national_id, is_valid):
-        from django.conf import settings
+        user, ip_address, user_agent = _get_client_info(request)
+        api_call_log_sink.add(user, national_id, is_valid, ip_address, user_agent)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncValidateNationalIDView(View):
+    """
+    ``ValidateNationalIDView`` as a native async view for ASGI workers, same request and response bodies.
+
+    DRF views are sync only, so authentication, throttling and error bodies are done here with the
+    async variants of the same building blocks: Redis is awaited on the event loop, the shared cache
+    through ``cache.aget`` / ``cache.aset`` and API call logs are only buffered. Quota is shared with
+    ``/api/validate/``.
+    """
+
+    http_method_names = ["post", "options"]
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            user = await self._authenticate(request)
+
+            key = get_rate_limit_key(ValidateNationalIDView.__name__, user.pk)
+            allowed, retry_after = await rate_limiter.ahit(key, settings.VALIDATION_RATE_LIMITS)
+            if not allowed:
+                raise exceptions.Throttled(retry_after)
+
+            serializer = NationalIDSerializer(data=self._parse(request))
+            serializer.is_valid(raise_exception=True)
+        except exceptions.APIException as e:
+            return _error_response(request, e)
+
+        national_id = serializer.validated_data["national_id"]
+        language = get_language()
+
+        cache_response = CACHE_ON and settings.VALIDATION_CACHE_RESPONSE_BYTES
+        if cache_response:
+            cached = await validation_cache.aget_response(national_id, language)
+            if cached is not None:
+                is_valid, body = cached
+                await usage_counters.arecord(user.id, int(is_valid), int(not is_valid))
+                return HttpResponse(body, content_type=JSONRenderer.media_type)
+
+        validator = ValidateNationalIDView.get_validator()
+        facts = await validation_cache.aget(national_id) if CACHE_ON else None
+        if facts is not None:
+            result = validator.derive(facts, national_id)
+        else:
+            decoded = validator.decode(national_id)
+            result = decoded.to_dict()
+            if CACHE_ON:
+                await validation_cache.aset(national_id, decoded.to_facts())
+
+        if _is_new_id(facts, national_id):
+            ip_address, user_agent = _get_client_address(request)
+            await api_call_log_sink.aadd(user, national_id, result["is_valid"], ip_address, user_agent)
+
+        await usage_counters.arecord(user.id, int(result["is_valid"]), int(not result["is_valid"]))
 
-        def log_in_background():
+        body = render_validation_result(localize_result(result))
+        if cache_response:
+            await validation_cache.aset_response(national_id, language, result["is_valid"], body)
+        return HttpResponse(body, content_type=JSONRenderer.media_type)
+
+    async def _authenticate(self, request):
+        user_auth = await bearer_authentication.aauthenticate(request)
+        if user_auth is None:
+            raise exceptions.NotAuthenticated()
+        return user_auth[0]
+
+    def _parse(self, request):
+        if request.content_type == "application/json":
             try:
-                user = request.user if request.user.is_authenticated else None
-
-                x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
-                if x_forwarded_for:
-                    ip_address = x_forwarded_for.split(",")[0]
-                else:
-                    ip_address = request.META.get("REMOTE_ADDR")
-
-                user_agent = request.META.get("HTTP_USER_AGENT", "")
-
-                APICallLog.objects.create(
-                    user=user,
-                    national_id=national_id,
-                    is_valid=is_valid,
-                    ip_address=ip_address,
-                    user_agent=user_agent,
-                )
-            except Exception as e:
-                print(f"Error logging API call: {e}")
-
-        # just for run  tests
-        if settings.TESTING:
-            log_in_background()
+                return json.loads(request.body or b"{}")
+            except ValueError as e:
+                raise exceptions.ParseError(f"JSON parse error - {e}")
+
+        if request.content_type in ("application/x-www-form-urlencoded", "multipart/form-data"):
+            return request.POST
+
+        raise exceptions.UnsupportedMediaType(request.content_type)
+
+
+@csrf_exempt
+@require_POST
+def validate_national_id_fast(request):
+    """
+    Lean ``/api/validate/`` for machine clients: JSON body in, pre-built JSON bytes out.
+
+    No DRF view, content negotiation, renderer selection or serializers on the way, the response
+    bytes match ``NationalIDResponseSerializer`` rendered by ``JSONRenderer``. Authentication, quota,
+    caching, usage counters and call logs are the same as ``ValidateNationalIDView``.
+    """
+    try:
+        user_auth = bearer_authentication.authenticate(request)
+        if user_auth is None:
+            raise exceptions.NotAuthenticated()
+        user = user_auth[0]
+
+        key = get_rate_limit_key(ValidateNationalIDView.__name__, user.pk)
+        allowed, retry_after = rate_limiter.hit(key, settings.VALIDATION_RATE_LIMITS)
+        if not allowed:
+            raise exceptions.Throttled(retry_after)
+
+        national_id = _read_national_id(request)
+    except exceptions.APIException as e:
+        return _error_response(request, e)
+
+    language = get_language()
+    cache_response = CACHE_ON and settings.VALIDATION_CACHE_RESPONSE_BYTES
+    cached = validation_cache.get_response(national_id, language) if cache_response else None
+
+    if cached is None:
+        validator = ValidateNationalIDView.get_validator()
+        facts = validation_cache.get(national_id) if CACHE_ON else None
+        if facts is not None:
+            result = validator.derive(facts, national_id)
         else:
-            _logging_executor.submit(log_in_background)
+            decoded = validator.decode(national_id)
+            result = decoded.to_dict()
+            if CACHE_ON:
+                validation_cache.set(national_id, decoded.to_facts())
+
+        if _is_new_id(facts, national_id):
+            ip_address, user_agent = _get_client_address(request)
+            api_call_log_sink.add(user, national_id, result["is_valid"], ip_address, user_agent)
+
+        is_valid = result["is_valid"]
+        body = render_validation_result(localize_result(result))
+        if cache_response:
+            validation_cache.set_response(national_id, language, is_valid, body)
+    else:
+        is_valid, body = cached
+
+    usage_counters.record(user.id, int(is_valid), int(not is_valid))
+    return HttpResponse(body, content_type=JSONRenderer.media_type)
+
+
+class ValidateNationalIDBatchView(generics.CreateAPIView):
+
+    serializer_class = NationalIDBatchSerializer
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [MultiWindowRateThrottle]
+    # every ID is one hit against the quota of /api/validate/, batching is no way around it
+    rate_limit_scope = ValidateNationalIDView.__name__
+
+    def get_rate_limit_cost(self, request):
+        # throttles run before validation, an oversized list costs what the largest batch would
+        national_ids = request.data.get("national_ids") if isinstance(request.data, dict) else None
+        if not isinstance(national_ids, list):
+            return 1
+        return max(1, min(len(national_ids), settings.VALIDATION_BATCH_MAX_SIZE))
+
+    def post(self, request, *args, **kwargs):
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        national_ids = serializer.validated_data["national_ids"]
+        unique_ids = list(dict.fromkeys(national_ids))
+        cached = validation_cache.get_many(unique_ids) if CACHE_ON else {}
+
+        validator = ValidateNationalIDView.get_validator()
+        results = {national_id: validator.derive(facts, national_id) for national_id, facts in cached.items()}
+
+        misses = [national_id for national_id in unique_ids if national_id not in results]
+
+        if misses:
+            decoded = dict(zip(misses, validator.decode_many(misses)))
+            results.update({national_id: result.to_dict() for national_id, result in decoded.items()})
+
+            if CACHE_ON:
+                validation_cache.set_many({national_id: result.to_facts() for national_id, result in decoded.items()})
+
+        new_ids = [national_id for national_id in unique_ids if _is_new_id(cached.get(national_id), national_id)]
+        if new_ids:
+            self._log_api_calls(request, [results[national_id] for national_id in new_ids])
+
+        localized = {national_id: localize_result(result) for national_id, result in results.items()}
+        batch_results = [localized[national_id] for national_id in national_ids]
+        valid = sum(result["is_valid"] for result in batch_results)
+        usage_counters.record(request.user.id, valid, len(batch_results) - valid)
+
+        response_serializer = NationalIDBatchResponseSerializer({"results": batch_results})
+        return Response(response_serializer.data, status=status.HTTP_200_OK)
+
+    def _log_api_calls(self, request, results):
+        user, ip_address, user_agent = _get_client_info(request)
+        api_call_log_sink.add_many(user, [(result["national_id"], result["is_valid"]) for result in results], ip_address, user_agent)
+
+
+class UsageView(generics.GenericAPIView):
+
+    serializer_class = UsageSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            usage = usage_counters.read(request.user.id)
+        except redis.RedisError as e:
+            print(f"Error reading usage: {e}")
+            return Response({"detail": "Usage counters are unavailable"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        return Response(self.get_serializer(usage).data, status=status.HTTP_200_OK)